@@ -1,72 +1,348 @@
+import atexit
 import logging
-import os
+import queue
 import asyncpg
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import time
+from logging.handlers import QueueHandler, QueueListener
+from threading import Thread, Event, Lock
 from datetime import datetime
 
+from app.metrics import LOG_RECORDS_DROPPED
+from app.models.database import db_params
 
-db_params = {
-    "database": os.getenv("dbname"),
-    "user": os.getenv("user"),
-    "password": os.getenv("password"),
-    "host": os.getenv("host"),
-    "port": "5432",
-}
+LOG_COLUMNS = ["log_level", "log_message", "log_time"]
 
 
 # Custom logging handler to log to PostgreSQL
 class PostgresHandler(logging.Handler):
-    def __init__(self, db_params):
+    """
+    Ships log records to the ``logs`` table in batches.
+
+    ``emit`` only formats the record and puts it on a bounded queue, so the
+    calling thread never touches the database. A single writer thread owns one
+    persistent asyncpg connection and COPYs the queued rows every
+    ``batch_size`` records or ``flush_interval`` seconds. When the queue is full
+    records are dropped and counted; the count is written as a WARNING row with
+    the next batch.
+
+    Attributes:
+        db_params (dict): asyncpg connection parameters
+        capacity (int): maximum number of queued records
+        batch_size (int): records per COPY
+        flush_interval (float): maximum seconds a record waits in the queue
+    """
+
+    def __init__(self, db_params, capacity=10000, batch_size=500, flush_interval=0.5):
         logging.Handler.__init__(self)
         self.db_params = db_params
-        self.loop = asyncio.get_event_loop()
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=capacity)
+        self.dropped = 0
+        self.written = 0
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, name="postgres-log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        try:
+            row = (record.levelname, self.format(record), datetime.utcnow())
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.labels("postgres").inc()
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        logging.Handler.close(self)
+
+    def _run(self):
+        asyncio.run(self._write_logs())
+
+    def _next_batch(self):
+        """Collect up to batch_size rows, waiting at most flush_interval for the batch to fill."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            batch.append(
+                (
+                    "WARNING",
+                    f"PostgresHandler queue full, dropped {dropped} log records",
+                    datetime.utcnow(),
+                )
+            )
+        return batch
+
+    async def _write_logs(self):
+        conn = None
+        batch = []
+        while not (self._stopped.is_set() and self.queue.empty() and not batch):
+            if not batch:
+                # Blocking is fine: this loop runs nothing but the writer
+                batch = self._next_batch()
+                if not batch:
+                    continue
+            try:
+                if conn is None or conn.is_closed():
+                    conn = await asyncpg.connect(**self.db_params)
+                await conn.copy_records_to_table(
+                    "logs", records=batch, columns=LOG_COLUMNS
+                )
+                self.written += len(batch)
+                batch = []
+            except Exception:
+                # The database is unreachable: keep the batch, but never block emitters
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+                conn = None
+                if self._stopped.is_set():
+                    break
+                await asyncio.sleep(1)
+        if conn is not None and not conn.is_closed():
+            await conn.close()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most ``rate`` records per call site every ``per`` seconds.
+
+    Suppressed records are counted and replaced by one summary record per call
+    site once its window is over, so a message logged on every Kafka batch shows
+    up as a periodic "suppressed N similar messages" line instead.
+    """
+
+    def __init__(self, logger, rate=10, per=60.0):
+        super().__init__()
+        self.logger = logger
+        self.rate = rate
+        self.per = per
+        self._windows = {}
+        self._lock = Lock()
+
+    def filter(self, record):
+        if getattr(record, "rate_limit_summary", False):
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window["start"] >= self.per:
+                if window is not None and window["suppressed"]:
+                    summaries = [self._summary(window)]
+                else:
+                    summaries = []
+                self._windows[key] = {
+                    "start": now,
+                    "count": 1,
+                    "suppressed": 0,
+                    "last": None,
+                }
+                allowed = True
+            else:
+                summaries = []
+                window["count"] += 1
+                allowed = window["count"] <= self.rate
+                if not allowed:
+                    window["suppressed"] += 1
+                    window["last"] = record
+        for summary in summaries:
+            self.logger.handle(summary)
+        return allowed
+
+    def flush(self):
+        """Emit summaries for windows that have ended; called periodically."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key
+                for key, window in self._windows.items()
+                if now - window["start"] >= self.per
+            ]
+            summaries = [
+                self._summary(self._windows[key])
+                for key in expired
+                if self._windows[key]["suppressed"]
+            ]
+            for key in expired:
+                del self._windows[key]
+        for summary in summaries:
+            self.logger.handle(summary)
+
+    def _summary(self, window):
+        last = window["last"]
+        summary = logging.makeLogRecord(last.__dict__)
+        summary.msg = (
+            f"Suppressed {window['suppressed']} similar messages in the last "
+            f"{self.per:.0f}s, last one: {last.getMessage()}"
+        )
+        summary.args = None
+        summary.exc_info = None
+        summary.exc_text = None
+        summary.rate_limit_summary = True
+        return summary
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that counts and drops records when the queue is full instead of blocking.
+
+    Drops are exported as ``log_records_dropped_total`` and reported as a
+    WARNING record about once a second while logging is configured. Until
+    :func:`configure_logging` has run, as in the command-line scripts, records
+    go straight to stderr instead.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.fallback = logging.StreamHandler()
+        self.fallback.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        )
 
     def emit(self, record):
-        log_entry = self.format(record)
-        self.loop.run_in_executor(
-            self.executor, self._write_log, record.levelname, log_entry
+        if _queue_listener is None:
+            self.fallback.handle(record)
+            return
+        super().emit(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.labels("listener").inc()
+
+
+LOG_QUEUE_SIZE = 10000
+
+_config_lock = Lock()
+# Loggers hold this handler from the start; it writes to stderr until configure_logging
+_queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+_queue_listener = None
+_rate_limit_filters = []
+
+
+def configure_logging(log_file="app.log"):
+    """
+    Start the shared logging pipeline; called once at startup by the entry point.
+
+    Every logger returned by :func:`get_logger` has the same
+    :class:`DroppingQueueHandler`; a :class:`QueueListener` thread drains it into
+    the console, the file handler and the :class:`PostgresHandler`, so request
+    handlers and Kafka listener threads never do log I/O themselves.
+    """
+    global _queue_listener
+    with _config_lock:
+        if _queue_listener is not None:
+            return
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
         )
 
-    def _write_log(self, levelname, log_entry):
-        asyncio.run(self._async_write_log(levelname, log_entry))
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+
+        pg_handler = PostgresHandler(db_params)
+        pg_handler.setLevel(logging.INFO)
+        pg_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        _queue_listener = QueueListener(
+            _queue_handler.queue,
+            console_handler,
+            file_handler,
+            pg_handler,
+            respect_handler_level=True,
+        )
+        _queue_listener.start()
+        Thread(target=_maintain, name="log-maintenance", daemon=True).start()
+        atexit.register(shutdown_logging)
+
 
-    async def _async_write_log(self, levelname, log_entry):
-        conn = await asyncpg.connect(**self.db_params)
-        query = """
-            INSERT INTO logs (log_level, log_message, log_time)
-            VALUES ($1, $2, $3)
-        """
-        await conn.execute(query, levelname, log_entry, datetime.utcnow())
-        await conn.close()
+def shutdown_logging():
+    """Drain the queue into the handlers and close them."""
+    global _queue_listener
+    with _config_lock:
+        listener, _queue_listener = _queue_listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _maintain(interval=1.0):
+    """Flush rate-limit summaries and report records dropped by the queue handler."""
+    while True:
+        time.sleep(interval)
+        for rate_limit_filter in list(_rate_limit_filters):
+            rate_limit_filter.flush()
+        listener = _queue_listener
+        if _queue_handler.dropped and listener is not None:
+            dropped, _queue_handler.dropped = _queue_handler.dropped, 0
+            # Straight to the handlers: the queue that dropped them may still be full
+            listener.handle(
+                logging.makeLogRecord(
+                    {
+                        "name": __name__,
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": f"Log queue full, dropped {dropped} log records",
+                    }
+                )
+            )
 
 
 # Initialize logger
-def get_logger(logger_name="my_app_logger"):
+def get_logger(logger_name="my_app_logger", rate_limit=None):
+    """
+    Return a logger wired to the shared queue handler.
+
+    Only fetches the logger: records go to stderr until :func:`configure_logging`
+    starts the pipeline. Calling it repeatedly for the same name is safe:
+    handlers and filters are only attached once. ``rate_limit`` is an optional
+    ``(records, seconds)`` pair applied per call site, for loggers used on
+    per-batch hot paths.
+    """
+    handler = _queue_handler
     logger = logging.getLogger(logger_name)
     logger.setLevel(logging.INFO)
-
-    # File handler
-    file_handler = logging.FileHandler("app.log")
-    file_handler.setLevel(logging.INFO)
-    file_formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-
-    # PostgreSQL handler
-    pg_handler = PostgresHandler(db_params)
-    pg_handler.setLevel(logging.INFO)
-    pg_formatter = logging.Formatter("%(message)s")
-    pg_handler.setFormatter(pg_formatter)
-    logger.addHandler(pg_handler)
-
+    # The listener already writes to the console; the root handlers would do it inline
+    logger.propagate = False
+    with _config_lock:
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+        if rate_limit and not any(
+            isinstance(f, RateLimitFilter) for f in logger.filters
+        ):
+            rate_limit_filter = RateLimitFilter(logger, *rate_limit)
+            logger.addFilter(rate_limit_filter)
+            _rate_limit_filters.append(rate_limit_filter)
     return logger
 
 
 # Example usage
 if __name__ == "__main__":
+    configure_logging()
     logger = get_logger()
     logger.info("This is an info log message.")
@@ -1,19 +1,86 @@
 from jose import jwt, JWTError
 from dotenv import load_dotenv
+from cachetools import TLRUCache
+from fastapi import Depends, HTTPException, WebSocket, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+import hashlib
 import os
+import time
 
 # Load environment variables
 load_dotenv()
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "720"))
+
+# Verified claims by token hash; entries expire with the token they came from
+_verified_tokens = TLRUCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttu=lambda _key, claims, _now: claims["exp"],
+    timer=time.time,
+)
+_verified_tokens_lock = Lock()
+
+bearer_scheme = HTTPBearer(auto_error=False)
 
 def create_access_token(data: dict):
-    return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+    now = datetime.now(timezone.utc)
+    claims = {
+        **data,
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
-    except JWTError:
-        return None
+    """
+    Return the ``sub`` claim of a valid, unexpired token, or None.
+
+    A reconnect storm presents the same tokens many times in a few seconds, so
+    the claims of every verified token are kept until the token expires and
+    later checks skip the signature and JSON decoding.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    with _verified_tokens_lock:
+        claims = _verified_tokens.get(key)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        if "exp" not in claims:
+            # Tokens issued before expiry was added are not accepted anymore
+            return None
+        with _verified_tokens_lock:
+            _verified_tokens[key] = claims
+    return claims.get("sub")
+
+def require_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """Dependency resolving the bearer token to the user's email."""
+    email = verify_token(credentials.credentials) if credentials else None
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return email
+
+def websocket_user(websocket: WebSocket):
+    """
+    Email of the user opening ``websocket``, or None.
+
+    Browsers cannot set headers on a WebSocket handshake, so the token is also
+    accepted as the ``token`` query parameter.
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            return None
+    return verify_token(token)
@@ -1,9 +1,71 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+import asyncio
+import os
+import time
+
+from app.metrics import (
+    PASSWORD_HASH_IN_FLIGHT,
+    PASSWORD_HASH_QUEUE_SECONDS,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_SECONDS,
+)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a few threads hash in parallel without stalling the event loop
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Requests beyond this many waiting hashes are turned away instead of queueing for seconds
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = asyncio.Semaphore(HASH_WORKERS)
+_pending = 0
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
+
+def _timed_call(operation, fn, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+async def _run_in_pool(operation, fn, *args):
+    global _pending
+    if _pending >= HASH_MAX_PENDING:
+        PASSWORD_HASH_REJECTED.labels(operation).inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    queued = time.perf_counter()
+    try:
+        async with _slots:
+            PASSWORD_HASH_QUEUE_SECONDS.labels(operation).observe(
+                time.perf_counter() - queued
+            )
+            PASSWORD_HASH_IN_FLIGHT.inc()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    _executor, _timed_call, operation, fn, *args
+                )
+            finally:
+                PASSWORD_HASH_IN_FLIGHT.dec()
+    finally:
+        _pending -= 1
+
+async def get_password_hash_async(password):
+    """Hash on the bcrypt pool; use this from request handlers."""
+    return await _run_in_pool("hash", get_password_hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify on the bcrypt pool; use this from request handlers."""
+    return await _run_in_pool("verify", verify_password, plain_password, hashed_password)
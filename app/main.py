@@ -1,27 +1,58 @@
 from fastapi import FastAPI
+from app.application_logger import configure_logging
 from app.routers import user
 from app.routers import nasdaq
-from app.models.user import create_users_table, create_user_settings_table
-
+from app.routers import order_book
+from app.routers import quotes
+from app.routers import analytics
+from app.routers import replay
+from app.routers import metrics
+from app.routers import admin
+from app.models.database import close_pool
+from app.services.holiday_calendar import refresh_holidays_periodically
+from app.services.ticker_cache import refresh_tickers_periodically
+
+import asyncio
 import logging
+import os
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-app = FastAPI()
+# First startup handler, ahead of those the routers add, so their logging is written
+app = FastAPI(on_startup=[configure_logging])
 
 app.include_router(user.router)
 app.include_router(nasdaq.router)
+app.include_router(order_book.router)
+app.include_router(quotes.router)
+app.include_router(analytics.router)
+app.include_router(replay.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
 
 
 @app.on_event("startup")
 async def startup_event():
-    await create_users_table()
-    logging.info("users tables checked/created on startup")
-
-    await create_user_settings_table()
-    logging.info("users tables checked/created on startup")
+    # Tables are created by "python -m app.migrations" once per deploy, not per worker
+    app.state.holiday_refresh_task = asyncio.create_task(
+        refresh_holidays_periodically()
+    )
+
+    app.state.ticker_refresh_task = asyncio.create_task(
+        refresh_tickers_periodically(
+            float(os.getenv("TICKER_MV_REFRESH_SECONDS", "900")),
+            float(os.getenv("TICKER_MV_CHECK_SECONDS", "30")),
+        )
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.holiday_refresh_task.cancel()
+    app.state.ticker_refresh_task.cancel()
+    await close_pool()
 
 
 @app.get("/")
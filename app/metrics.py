@@ -0,0 +1,164 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytz
+from prometheus_client import Counter, Gauge, Histogram
+
+eastern = pytz.timezone("America/New_York")
+
+# Stage timings of the Kafka -> WebSocket hot path, one series per NCDS topic
+STAGE_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+)
+
+KAFKA_CONSUME_SECONDS = Histogram(
+    "nasdaq_kafka_consume_seconds",
+    "Time spent in consumer.consume, including broker wait and decoding",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+AVRO_DECODE_SECONDS = Histogram(
+    "nasdaq_avro_decode_seconds",
+    "Time spent decoding one consumed batch with AvroDeserializer.decode",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+RESPONSE_BUILD_SECONDS = Histogram(
+    "nasdaq_response_build_seconds",
+    "Time spent in makeRespFromKafkaMessages per batch",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+SYMBOL_FILTER_SECONDS = Histogram(
+    "nasdaq_symbol_filter_seconds",
+    "Time spent filtering a batch for one subscriber's symbols",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "nasdaq_websocket_send_seconds",
+    "Time spent sending one frame to one subscriber, with send_text for pre-serialized frames or send_json",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+MESSAGES_CONSUMED = Counter(
+    "nasdaq_messages_consumed_total", "Kafka messages consumed", ["topic"]
+)
+RECORDS_SENT = Counter(
+    "nasdaq_records_sent_total", "Records sent to WebSocket subscribers", ["topic"]
+)
+ORDER_BOOK_APPLY_SECONDS = Histogram(
+    "nasdaq_order_book_apply_seconds",
+    "Time spent applying one batch to the order books and building depth deltas",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+ORDER_BOOK_ORDERS = Gauge(
+    "nasdaq_order_book_orders", "Live orders indexed by the order book engine"
+)
+QUOTE_APPLY_SECONDS = Histogram(
+    "nasdaq_quote_apply_seconds",
+    "Time spent applying one QBBO batch to the consolidated quotes",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+ARCHIVE_APPEND_SECONDS = Histogram(
+    "nasdaq_archive_append_seconds",
+    "Time spent appending one batch of trades to the tick archive",
+    ["topic"],
+    buckets=STAGE_BUCKETS,
+)
+REPLAY_SESSIONS = Gauge("nasdaq_replay_sessions", "Historical replays streaming")
+REPLAY_FEEDS = Gauge("nasdaq_replay_feeds", "Sources shared by the historical replays")
+FEED_LAG_SECONDS = Gauge(
+    "nasdaq_feed_lag_seconds",
+    "Wall clock minus the trackingID time of the newest consumed message",
+    ["topic"],
+)
+
+TICK_SINK_REWINDS = Counter(
+    "tick_sink_rewinds_total",
+    "Times a tick sink gave up a write and re-consumed from its committed offsets",
+    ["topic"],
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because a logging queue was full",
+    ["queue"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Time spent executing a database query", ["query"]
+)
+DB_POOL_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=STAGE_BUCKETS,
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections opened by the pool")
+DB_POOL_IDLE = Gauge("db_pool_idle", "Idle connections in the pool")
+USER_CACHE_REQUESTS = Counter(
+    "user_cache_requests_total",
+    "Lookups of the in-process user and settings caches",
+    ["cache", "result"],
+)
+
+PASSWORD_HASH_QUEUE_SECONDS = Histogram(
+    "password_hash_queue_seconds",
+    "Time a bcrypt hash or verify waited for a free worker",
+    ["operation"],
+    buckets=STAGE_BUCKETS,
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time spent inside bcrypt on a worker thread",
+    ["operation"],
+)
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    "password_hash_in_flight", "bcrypt operations running on the worker pool"
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "bcrypt operations refused because too many were already waiting",
+    ["operation"],
+)
+
+
+@contextmanager
+def timed(histogram, *labels):
+    """Observe the duration of the block; cheaper than Histogram.time() with labels."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        child = histogram.labels(*labels) if labels else histogram
+        child.observe(time.perf_counter() - started)
+
+
+def observe_feed_lag(topic, tracking_id):
+    """trackingID counts nanoseconds since midnight Eastern; compare it to now."""
+    now = datetime.now(eastern)
+    since_midnight = (
+        now - now.replace(hour=0, minute=0, second=0, microsecond=0)
+    ).total_seconds()
+    FEED_LAG_SECONDS.labels(topic).set(since_midnight - tracking_id / 1e9)
+
+
+def track_pool(pool):
+    DB_POOL_SIZE.set_function(pool.get_size)
+    DB_POOL_IDLE.set_function(pool.get_idle_size)
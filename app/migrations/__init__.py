@@ -0,0 +1,58 @@
+import time
+
+from app.application_logger import get_logger
+from app.migrations.versions import MIGRATIONS
+
+logger = get_logger(__name__)
+
+# Arbitrary key shared by every process that may run migrations
+MIGRATION_LOCK_KEY = 0x736368656D61
+
+CREATE_SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+"""
+
+
+async def applied_versions(conn):
+    await conn.execute(CREATE_SCHEMA_VERSION_TABLE)
+    rows = await conn.fetch("SELECT version FROM schema_version")
+    return {row["version"] for row in rows}
+
+
+async def apply_migrations(conn):
+    """
+    Apply every pending migration, each in its own transaction.
+
+    Runs under a session advisory lock, so concurrent deploys or scripts wait
+    for the first one and then find nothing left to do.
+
+    Returns:
+        list: versions applied by this call
+    """
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_KEY)
+    try:
+        done = await applied_versions(conn)
+        applied = []
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            started = time.monotonic()
+            async with conn.transaction():
+                for statement in statements:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES ($1, $2)",
+                    version,
+                    description,
+                )
+            logger.info(
+                f"Applied migration {version} ({description}) in {time.monotonic() - started:.2f}s"
+            )
+            applied.append(version)
+        return applied
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_KEY)
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+import logging
+
+import asyncpg
+
+from app.migrations import MIGRATIONS, applied_versions, apply_migrations
+from app.models.database import db_params
+
+# Run once per deploy, before the workers restart: python -m app.migrations
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+async def main(status_only):
+    conn = await asyncpg.connect(**db_params)
+    try:
+        if status_only:
+            done = await applied_versions(conn)
+            for version, description, _ in MIGRATIONS:
+                state = "applied" if version in done else "pending"
+                logging.info(f"{version:>4} {state:<8} {description}")
+            return
+        applied = await apply_migrations(conn)
+        if applied:
+            logging.info(f"Applied migrations {applied}")
+        else:
+            logging.info("Schema is up to date")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument(
+        "--status", action="store_true", help="list migrations without applying them"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.status))
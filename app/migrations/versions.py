@@ -0,0 +1,142 @@
+from app.models.stock_data import (
+    CREATE_STOCK_DATA_INDEXES,
+    CREATE_STOCK_DATA_TABLE,
+    STOCK_DATA_TABLE,
+)
+
+# (version, description, statements). Append new migrations; never edit applied ones.
+# The first versions use IF NOT EXISTS because older deployments created these
+# objects at boot or by hand before migrations existed.
+MIGRATIONS = [
+    (
+        1,
+        "users and user_settings",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                email TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                first_name TEXT,
+                last_name TEXT,
+                company_name TEXT,
+                address_1 TEXT,
+                address_2 TEXT,
+                city TEXT,
+                state TEXT,
+                postal_code TEXT,
+                country TEXT,
+                region TEXT,
+                phone TEXT,
+                hashed_password TEXT NOT NULL,
+                trading_experience JSONB
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_settings (
+                email TEXT PRIMARY KEY,
+                settings JSONB NOT NULL DEFAULT '{}'
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "logs shipped by PostgresHandler",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS logs (
+                id BIGSERIAL PRIMARY KEY,
+                log_level TEXT NOT NULL,
+                log_message TEXT,
+                log_time TIMESTAMP NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS logs_log_time_brin ON logs USING brin (log_time)",
+        ],
+    ),
+    (
+        3,
+        "day-partitioned stock_data_partitioned",
+        [
+            # IF NOT EXISTS would accept a legacy heap table of the same name and
+            # build the parent's indexes on it; that conversion copies data and
+            # is left to the script
+            f"""
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM pg_class
+                    WHERE oid = to_regclass('{STOCK_DATA_TABLE}') AND relkind <> 'p'
+                ) THEN
+                    RAISE EXCEPTION '{STOCK_DATA_TABLE} is not partitioned'
+                        USING HINT = 'Run "python migrate_stock_data_partitioned.py migrate", then migrate again';
+                END IF;
+            END
+            $$
+            """,
+            CREATE_STOCK_DATA_TABLE,
+            *CREATE_STOCK_DATA_INDEXES,
+        ],
+    ),
+    (
+        4,
+        "mv_stock_data_symbol_count rollup",
+        [
+            """
+            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_stock_data_symbol_count AS
+            SELECT symbol, count(*) AS count
+            FROM stock_data_partitioned
+            WHERE msgType IN ('T', 'h')
+            GROUP BY symbol
+            """,
+            # REFRESH ... CONCURRENTLY needs a unique index
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS mv_stock_data_symbol_count_symbol_idx
+            ON mv_stock_data_symbol_count (symbol)
+            """,
+        ],
+    ),
+    (
+        5,
+        "dynamodb_backfill_checkpoint",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS dynamodb_backfill_checkpoint (
+                source_table TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                total_segments INTEGER NOT NULL,
+                last_evaluated_key JSONB,
+                done BOOLEAN NOT NULL DEFAULT FALSE,
+                rows_copied BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT now(),
+                PRIMARY KEY (source_table, segment)
+            )
+            """
+        ],
+    ),
+    (
+        6,
+        "materialized view refresh times",
+        [
+            # Lets every worker see when another one refreshed a view
+            """
+            CREATE TABLE IF NOT EXISTS materialized_view_refresh (
+                view_name TEXT PRIMARY KEY,
+                refreshed_at TIMESTAMPTZ NOT NULL
+            )
+            """
+        ],
+    ),
+    (
+        7,
+        "dates copied by the dynamodb backfill",
+        [
+            # Bounds a backfill reset, since the table also holds the live ticks
+            """
+            ALTER TABLE dynamodb_backfill_checkpoint
+                ADD COLUMN IF NOT EXISTS first_date TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS last_date TIMESTAMP
+            """
+        ],
+    ),
+]
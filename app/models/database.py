@@ -0,0 +1,53 @@
+import os
+import time
+import asyncio
+import dotenv
+import asyncpg
+from contextlib import asynccontextmanager
+
+from app.metrics import DB_POOL_ACQUIRE_SECONDS, track_pool
+
+dotenv.load_dotenv()
+
+db_params = {
+    "database": os.getenv("dbname"),
+    "user": os.getenv("user"),
+    "password": os.getenv("password"),
+    "host": os.getenv("host"),
+    "port": "5432",
+}
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool():
+    """Connection pool bound to the application event loop, created on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    **db_params,
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                )
+                track_pool(_pool)
+    return _pool
+
+
+@asynccontextmanager
+async def acquire():
+    """Borrow a pooled connection, recording how long the borrow waited."""
+    pool = await get_pool()
+    started = time.perf_counter()
+    async with pool.acquire() as conn:
+        DB_POOL_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+        yield conn
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -1,35 +1,14 @@
-import os
-import dotenv
-import asyncpg
 import asyncio
 from datetime import datetime
 
-from app.application_logger import get_logger
-
-dotenv.load_dotenv()
+from app.application_logger import configure_logging, get_logger
+from app.metrics import DB_QUERY_SECONDS, timed
+from app.models.database import acquire
 
 logger = get_logger(__name__)
 
-db_params = {
-    "dbname": os.getenv("dbname"),
-    "user": os.getenv("user"),
-    "password": os.getenv("password"),
-    "host": os.getenv("host"),
-    "port": "5432",
-}
-
 
 async def fetch_all_data(symbol=None, start_datetime=None):
-    conn = await asyncpg.connect(
-        database=db_params["dbname"],
-        user=db_params["user"],
-        password=db_params["password"],
-        host=db_params["host"],
-        port=db_params["port"],
-    )
-
-    logger.info("Connected to DB")
-
     # Convert start_datetime to a datetime object if provided
     if start_datetime:
         start_datetime = datetime.strptime(start_datetime, "%Y-%m-%dT%H:%M")
@@ -55,25 +34,17 @@ async def fetch_all_data(symbol=None, start_datetime=None):
 
     try:
         # Execute the query with the values
-        records = await conn.fetch(query, *values)
+        async with acquire() as conn:
+            with timed(DB_QUERY_SECONDS, "fetch_all_data"):
+                records = await conn.fetch(query, *values)
     except Exception as e:
         logger.error(f"Error executing query: {e}", exc_info=True)
         raise
-    finally:
-        await conn.close()
 
     return records
 
 
 async def fetch_all_tickers():
-    conn = await asyncpg.connect(
-        database=db_params["dbname"],
-        user=db_params["user"],
-        password=db_params["password"],
-        host=db_params["host"],
-        port=db_params["port"],
-    )
-
     # Base query
     query = "select * from mv_stock_data_symbol_count"
 
@@ -81,16 +52,17 @@ async def fetch_all_tickers():
 
     try:
         # Execute the query with the values
-        records = await conn.fetch(query)
+        async with acquire() as conn:
+            with timed(DB_QUERY_SECONDS, "fetch_all_tickers"):
+                records = await conn.fetch(query)
     except Exception as e:
         logger.error(f"Error executing query: {e}", exc_info=True)
         raise
-    finally:
-        await conn.close()
 
     return records
 
 
 # Example usage
 if __name__ == "__main__":
+    configure_logging()
     asyncio.run(fetch_all_data(symbol=None, start_datetime="2023-06-19 14:30:00"))
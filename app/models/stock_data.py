@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta
+
+import asyncpg
+
+STOCK_DATA_TABLE = "stock_data_partitioned"
+
+# Prices and sizes are kept in the feed's integer units (price is 1/10000 of a dollar)
+CREATE_STOCK_DATA_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {STOCK_DATA_TABLE} (
+        trackingID BIGINT NOT NULL,
+        date TIMESTAMP NOT NULL,
+        msgType CHAR(1) NOT NULL,
+        symbol VARCHAR(10) NOT NULL,
+        price BIGINT,
+        size INTEGER
+    ) PARTITION BY RANGE (date)
+"""
+
+# Indexes declared on the parent are created on every partition, present and future
+CREATE_STOCK_DATA_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS {STOCK_DATA_TABLE}_date_brin ON {STOCK_DATA_TABLE} USING brin (date)",
+    f"CREATE INDEX IF NOT EXISTS {STOCK_DATA_TABLE}_symbol_date_idx ON {STOCK_DATA_TABLE} (symbol, date)",
+]
+
+
+def partition_name(day: date) -> str:
+    return f"{STOCK_DATA_TABLE}_{day:%Y%m%d}"
+
+
+def trading_days(first_day: date, last_day: date):
+    """Every day in [first_day, last_day]; weekend partitions stay empty but keep late prints insertable."""
+    day = first_day
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
+
+async def create_stock_data_table(conn):
+    await conn.execute(CREATE_STOCK_DATA_TABLE)
+    for query in CREATE_STOCK_DATA_INDEXES:
+        await conn.execute(query)
+
+
+async def is_partitioned(conn, table=STOCK_DATA_TABLE):
+    relkind = await conn.fetchval(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", table
+    )
+    return relkind == "p"
+
+
+async def ensure_stock_data_partitions(conn, first_day: date, last_day: date):
+    """Create the daily range partitions covering [first_day, last_day] that are missing."""
+    created = []
+    for day in trading_days(first_day, last_day):
+        name = partition_name(day)
+        exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name)
+        if exists:
+            continue
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        try:
+            await conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {STOCK_DATA_TABLE} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            )
+        except (asyncpg.DuplicateTableError, asyncpg.UniqueViolationError):
+            # Another writer created the same partition concurrently
+            continue
+        created.append(name)
+    return created
@@ -1,137 +1,102 @@
 import os
-import dotenv
-import asyncpg
+
+from cachetools import TTLCache
 from fastapi import HTTPException
 from app.application_logger import get_logger
-
-dotenv.load_dotenv()
+from app.metrics import DB_QUERY_SECONDS, USER_CACHE_REQUESTS, timed
+from app.models.database import acquire
 
 logger = get_logger(__name__)
 
-db_params = {
-    "database": os.getenv("dbname"),
-    "user": os.getenv("user"),
-    "password": os.getenv("password"),
-    "host": os.getenv("host"),
-    "port": "5432",
-}
+# Rows written through by this worker are exact; the TTL bounds how long another
+# worker's writes can go unseen. Only existing rows are cached, so a signup is
+# visible to every worker immediately.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+_users = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_user_settings = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
 
-async def create_user_settings_table():
-    conn = await asyncpg.connect(**db_params)
+def _cached(cache, name, email):
+    row = cache.get(email)
+    USER_CACHE_REQUESTS.labels(name, "hit" if row is not None else "miss").inc()
+    # Hand out copies so callers cannot modify the cached row
+    return dict(row) if row is not None else None
 
-    try:
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS user_settings (
-            email TEXT PRIMARY KEY,
-            settings JSONB NOT NULL DEFAULT '{}'
-        );
-        """
-        await conn.execute(create_table_query)
-        logger.info("user_settings table created successfully")
-    except Exception as e:
-        logger.error(f"Error creating user_settings table: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
 
-
-async def create_users_table():
-    conn = await asyncpg.connect(**db_params)
-
-    try:
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS users (
-            email TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            first_name TEXT,
-            last_name TEXT,
-            company_name TEXT,
-            address_1 TEXT,
-            address_2 TEXT,
-            city TEXT,
-            state TEXT,
-            postal_code TEXT,
-            country TEXT,
-            region TEXT,
-            phone TEXT,
-            hashed_password TEXT NOT NULL,
-            trading_experience JSONB
-        );
-        """
-        await conn.execute(create_table_query)
-        logger.info("Users table created successfully")
-    except Exception as e:
-        logger.error(f"Error creating users table: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
+def invalidate_user(email):
+    """Drop the cached user and settings rows, e.g. after changing them outside this module."""
+    _users.pop(email, None)
+    _user_settings.pop(email, None)
 
 
 async def save_user(user_data):
-    conn = await asyncpg.connect(**db_params)
-
     try:
-        # Check if the user already exists
-        exists = await check_user_exists(user_data["email"], conn)
-        if exists:
-            raise Exception("User already exists")
-
-        # Save the user
-        query = """
-            INSERT INTO users (
-                email,
-                user_id,
-                first_name,
-                last_name,
-                company_name,
-                address_1,
-                address_2,
-                city,
-                state,
-                postal_code,
-                country,
-                region,
-                phone,
-                hashed_password,
-                trading_experience
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15
-            )
-        """
-        await conn.execute(
-            query,
-            user_data["email"],
-            user_data["user_id"],
-            user_data.get("first_name"),
-            user_data.get("last_name"),
-            user_data.get("company_name"),
-            user_data.get("address_1"),
-            user_data.get("address_2"),
-            user_data.get("city"),
-            user_data.get("state"),
-            user_data.get("postal_code"),
-            user_data.get("country"),
-            user_data.get("region"),
-            user_data.get("phone"),
-            user_data["hashed_password"],
-            user_data.get("trading_experience"),
-        )
-        logger.info("User saved successfully")
+        async with acquire() as conn:
+            # One statement: an existing email inserts nothing and returns no row
+            query = """
+                INSERT INTO users (
+                    email,
+                    user_id,
+                    first_name,
+                    last_name,
+                    company_name,
+                    address_1,
+                    address_2,
+                    city,
+                    state,
+                    postal_code,
+                    country,
+                    region,
+                    phone,
+                    hashed_password,
+                    trading_experience
+                ) VALUES (
+                    $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15
+                )
+                ON CONFLICT (email) DO NOTHING
+                RETURNING *
+            """
+            with timed(DB_QUERY_SECONDS, "save_user"):
+                row = await conn.fetchrow(
+                    query,
+                    user_data["email"],
+                    user_data["user_id"],
+                    user_data.get("first_name"),
+                    user_data.get("last_name"),
+                    user_data.get("company_name"),
+                    user_data.get("address_1"),
+                    user_data.get("address_2"),
+                    user_data.get("city"),
+                    user_data.get("state"),
+                    user_data.get("postal_code"),
+                    user_data.get("country"),
+                    user_data.get("region"),
+                    user_data.get("phone"),
+                    user_data["hashed_password"],
+                    user_data.get("trading_experience"),
+                )
+            if row is None:
+                raise Exception("User already exists")
+            _users[user_data["email"]] = dict(row)
+            logger.info("User saved successfully")
     except Exception as e:
         logger.error(f"Error saving user: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
 
 
 async def check_user_exists(email, conn=None):
+    if email in _users:
+        USER_CACHE_REQUESTS.labels("users", "hit").inc()
+        return True
     if conn is None:
-        conn = await asyncpg.connect(**db_params)
+        async with acquire() as conn:
+            return await check_user_exists(email, conn)
 
     try:
         query = "SELECT 1 FROM users WHERE email = $1"
-        result = await conn.fetchval(query, email)
+        with timed(DB_QUERY_SECONDS, "check_user_exists"):
+            result = await conn.fetchval(query, email)
         logger.info("Checked if user exists")
         return result is not None
     except Exception as e:
@@ -140,86 +105,89 @@ async def check_user_exists(email, conn=None):
 
 
 async def get_user(email):
-    conn = await asyncpg.connect(**db_params)
-
+    user = _cached(_users, "users", email)
+    if user is not None:
+        return user
     try:
-        query = "SELECT * FROM users WHERE email = $1"
-        result = await conn.fetchrow(query, email)
-        logger.info("User retrieved successfully")
-        return dict(result) if result else None
+        async with acquire() as conn:
+            query = "SELECT * FROM users WHERE email = $1"
+            with timed(DB_QUERY_SECONDS, "get_user"):
+                result = await conn.fetchrow(query, email)
+            logger.info("User retrieved successfully")
+            if result is None:
+                return None
+            _users[email] = dict(result)
+            return dict(result)
     except Exception as e:
         logger.error(f"Error retrieving user: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
 
 
 async def update_user_settings(email, settings):
-    conn = await asyncpg.connect(**db_params)
-
     try:
-        # Check if the email exists to update the settings
-        exists = await check_user_exists(email, conn)
-        if not exists:
-            raise Exception("User does not exist")
-
-        # Upsert query to insert or update the user settings
-        query = """
-                INSERT INTO user_settings (email, settings)
-                VALUES ($1, $2)
-                ON CONFLICT (email)
-                DO UPDATE SET
-                    settings = EXCLUDED.settings
-            """
-        await conn.execute(query, email, settings)
-        logger.info("User settings updated successfully")
+        async with acquire() as conn:
+            # Upsert only for existing users, checked in the same statement
+            query = """
+                    INSERT INTO user_settings (email, settings)
+                    SELECT $1, $2
+                    WHERE EXISTS (SELECT 1 FROM users WHERE email = $1)
+                    ON CONFLICT (email)
+                    DO UPDATE SET
+                        settings = EXCLUDED.settings
+                    RETURNING *
+                """
+            with timed(DB_QUERY_SECONDS, "update_user_settings"):
+                row = await conn.fetchrow(query, email, settings)
+            if row is None:
+                raise Exception("User does not exist")
+            _user_settings[email] = dict(row)
+            logger.info("User settings updated successfully")
     except Exception as e:
+        _user_settings.pop(email, None)
         logger.error(f"Error updating user settings: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
 
 
 async def get_user_settings(email):
-    conn = await asyncpg.connect(**db_params)
-
+    settings = _cached(_user_settings, "user_settings", email)
+    if settings is not None:
+        return settings
     try:
-        query = "SELECT * FROM user_settings WHERE email = $1"
-        result = await conn.fetchrow(query, email)
-        logger.info("User settings retrieved successfully")
-        return dict(result) if result else None
+        async with acquire() as conn:
+            query = "SELECT * FROM user_settings WHERE email = $1"
+            with timed(DB_QUERY_SECONDS, "get_user_settings"):
+                result = await conn.fetchrow(query, email)
+            logger.info("User settings retrieved successfully")
+            if result is None:
+                return None
+            _user_settings[email] = dict(result)
+            return dict(result)
     except Exception as e:
         logger.error(f"Error retrieving user settings: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
 
 
 async def get_all_users():
-    conn = await asyncpg.connect(**db_params)
-
     try:
-        query = "SELECT * FROM users"
-        results = await conn.fetch(query)
-        logger.info("All users retrieved successfully")
-        return [dict(result) for result in results]
+        async with acquire() as conn:
+            query = "SELECT * FROM users"
+            with timed(DB_QUERY_SECONDS, "get_all_users"):
+                results = await conn.fetch(query)
+            logger.info("All users retrieved successfully")
+            return [dict(result) for result in results]
     except Exception as e:
         logger.error(f"Error retrieving all users: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
 
 
 async def get_all_user_settings():
-    conn = await asyncpg.connect(**db_params)
-
     try:
-        query = "SELECT * FROM user_settings"
-        results = await conn.fetch(query)
-        logger.info("All user settings retrieved successfully")
-        return [dict(result) for result in results]
+        async with acquire() as conn:
+            query = "SELECT * FROM user_settings"
+            with timed(DB_QUERY_SECONDS, "get_all_user_settings"):
+                results = await conn.fetch(query)
+            logger.info("All user settings retrieved successfully")
+            return [dict(result) for result in results]
     except Exception as e:
         logger.error(f"Error retrieving all user settings: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await conn.close()
@@ -0,0 +1,47 @@
+import asyncio
+import hmac
+import os
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.application_logger import get_logger
+from app.services.profiler import MAX_PROFILE_SECONDS, profile
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        # Admin endpoints are disabled unless a token is configured
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def get_profile(seconds: float = 10, hz: int = 100):
+    """
+    Sample all thread stacks, including the per-topic ingest threads, for
+    ``seconds`` and return them as a collapsed-stack file for flamegraph.pl or
+    speedscope.
+    """
+    if seconds <= 0 or seconds > MAX_PROFILE_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}",
+        )
+    logger.info(f"Profiling all threads for {seconds}s at {hz} Hz")
+    # Sample from a worker thread so the event loop keeps serving during the profile
+    output = await asyncio.to_thread(profile, seconds, hz)
+    if output is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    filename = f"profile-{datetime.utcnow():%Y%m%dT%H%M%S}.collapsed"
+    return PlainTextResponse(
+        output,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
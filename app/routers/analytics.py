@@ -0,0 +1,106 @@
+import asyncio
+import os
+from typing import Optional
+
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+
+from app.application_logger import get_logger
+from app.auth.authentication import require_user
+from app.metrics import RECORDS_SENT, WEBSOCKET_SEND_SECONDS, timed
+from app.routers.nasdaq import WebSocketManager
+from app.services.analytics import ANALYTICS_HEADERS, trade_analytics_store
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+router = APIRouter(prefix="/nasdaq", tags=["analytics"])
+
+# Statistics change with every trade; send each symbol at most once per interval
+publish_interval = float(os.getenv("ANALYTICS_PUBLISH_INTERVAL_SECONDS", "1"))
+
+managers_analytics = {"NLSUTP": WebSocketManager(), "NLSCTA": WebSocketManager()}
+publish_task = None
+
+
+@router.websocket("/stream/analytics")
+async def websocket_endpoint_analytics(websocket: WebSocket, topic: str = "NLSUTP"):
+    """
+    Running VWAP, volume, trade count and high/low, plus the same over the
+    moving window. Send ``Add:SYM`` to receive the current values and then
+    updates, ``Remove:SYM`` to stop.
+    """
+    manager = managers_analytics.get(topic)
+    if manager is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not await manager.connect(websocket):
+        return
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if not manager.update_symbols(symbol=data, websocket=websocket):
+                await manager.send_personal_message(f"Rejected:{data}", websocket)
+                continue
+            await manager.send_personal_message(f"Received:{data}", websocket)
+            action, symbol = data.split(":", 1)
+            rows = (
+                trade_analytics_store(topic).snapshot([symbol])
+                if action == "Add"
+                else []
+            )
+            if rows:
+                await websocket.send_json({"headers": ANALYTICS_HEADERS, "data": rows})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(websocket)
+
+
+@router.get("/analytics", dependencies=[Depends(require_user)])
+async def get_analytics(topic: str = "NLSUTP", symbols: Optional[str] = None):
+    """Current statistics; ``symbols`` is comma-separated, every traded symbol if omitted."""
+    if topic not in managers_analytics:
+        raise HTTPException(status_code=404, detail=f"No analytics for {topic}")
+    wanted = [symbol.strip() for symbol in symbols.split(",")] if symbols else None
+    return {
+        "headers": ANALYTICS_HEADERS,
+        "data": trade_analytics_store(topic).snapshot(wanted),
+    }
+
+
+async def publish_analytics():
+    """Send the statistics of symbols that traded since the last round."""
+    while True:
+        await asyncio.sleep(publish_interval)
+        for topic, manager in managers_analytics.items():
+            if not manager.active_connections:
+                continue
+            ids, rows = trade_analytics_store(topic).drain()
+            if not rows:
+                continue
+            for connection in list(manager.active_connections):
+                mask = np.isin(ids, connection["symbol_ids"])
+                if not mask.any():
+                    continue
+                data = [row for row, wanted in zip(rows, mask.tolist()) if wanted]
+                try:
+                    with timed(WEBSOCKET_SEND_SECONDS, topic):
+                        await connection["socket"].send_json(
+                            {"headers": ANALYTICS_HEADERS, "data": data}
+                        )
+                    RECORDS_SENT.labels(topic).inc(len(data))
+                except Exception as e:
+                    logger.error(f"Error sending analytics to client: {e}")
+
+
+@router.on_event("startup")
+async def startup_event():
+    global publish_task
+    publish_task = asyncio.create_task(publish_analytics())
@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint for the hot-path and database metrics."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,24 +1,53 @@
+from collections import Counter
 from typing import Optional
 from app.schemas.nasdaq import Nasdaq
-from app.models.nasdaq import fetch_all_data, fetch_all_tickers
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.models.nasdaq import fetch_all_data
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+import threading
 from threading import Thread
-from app.application_logger import get_logger
-from ncdssdk import NCDSClient
+from app.application_logger import configure_logging, get_logger
+from app.auth.authentication import require_user, websocket_user
+from app.metrics import (
+    ARCHIVE_APPEND_SECONDS,
+    AVRO_DECODE_SECONDS,
+    KAFKA_CONSUME_SECONDS,
+    MESSAGES_CONSUMED,
+    RECORDS_SENT,
+    RESPONSE_BUILD_SECONDS,
+    SYMBOL_FILTER_SECONDS,
+    WEBSOCKET_SEND_SECONDS,
+    observe_feed_lag,
+    timed,
+)
+from app.services.analytics import trade_analytics_store
+from app.services.last_trade import SNAPSHOT_HEADERS, last_trade_store, last_trades
+from app.services.tick_sink import TickSink, market_midnight, seek_to_committed
+from app.services.dummy_feed import dummy_price_table
+from app.services.holiday_calendar import holiday_calendar
+from app.services.market_calendar import session_calendar
+from app.services.stream_filters import FilterBatch, parse_filter
+from app.services.symbols import symbol_table
+from app.services.tick_archive import tick_archive
+from app.services.ticker_cache import COUNTED_MSG_TYPES, ticker_cache
 import pytz
 import os
 import dotenv
 from datetime import timedelta, datetime
-import pandas as pd
 import time
-import random
 import asyncio
-from fastapi import HTTPException
-from bs4 import BeautifulSoup
-import requests
+import numpy as np
 
 dotenv.load_dotenv()
-logger = get_logger(__name__)
+logger = get_logger(__name__, rate_limit=(10, 60))
 
 router = APIRouter(prefix="/nasdaq", tags=["nasdaq"])
 
@@ -28,82 +57,26 @@ desired_timezone = pytz.timezone("America/New_York")
 # Convert the UTC time to the desired timezone
 localized_datetime = utc_datetime.replace(tzinfo=pytz.utc).astimezone(desired_timezone)
 midnight_time = datetime.combine(localized_datetime, datetime.min.time())
-dummy_symbols_price_range = pd.read_csv("app/routers/dummy_data.csv")
+dummy_rng = np.random.default_rng()
 send_dummy_data = os.getenv("SEND_DUMMY_DATA", "true") == "true"
+persist_live_ticks = os.getenv("PERSIST_LIVE_TICKS", "true") == "true"
+archive_live_ticks = os.getenv("ARCHIVE_LIVE_TICKS", "true") == "true"
+# Topics whose trades /get_data returns, as stored by the tick sinks and the archive
+ARCHIVE_TOPICS = ("NLSUTP", "NLSCTA")
+max_connections_per_user = int(os.getenv("WS_MAX_CONNECTIONS_PER_USER", "5"))
+max_symbols_per_connection = int(os.getenv("WS_MAX_SYMBOLS_PER_CONNECTION", "500"))
 
-HOLIDAY_URL = "https://www.nyse.com/markets/hours-calendars"
+# Open stream connections per user across all stream endpoints
+connections_per_user = Counter()
 
 
-def fetch_holidays():
-    try:
-        response = requests.get(HOLIDAY_URL)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching data: {e}")
-
-    # Parse the content using BeautifulSoup
-    soup = BeautifulSoup(response.content, "html.parser")
-
-    holidays = []
-    try:
-        # Locate the holiday table using the provided class name
-        holiday_table = soup.find(
-            "table", {"class": "table-data w-full table-fixed table-border-rows"}
-        )
-
-        if not holiday_table:
-            raise HTTPException(
-                status_code=500, detail="Holiday table not found on the page."
-            )
-
-        # Extract header and rows
-        headers = holiday_table.find("thead").find_all("td")
-        years = [
-            header.get_text(strip=True) for header in headers[1:]
-        ]  # Skip the first header, which is "Holiday"
-
-        rows = holiday_table.find("tbody").find_all("tr")
-
-        for row in rows:
-            columns = row.find_all("td")
-            holiday_name = columns[0].get_text(strip=True)
-            dates = [col.get_text(strip=True) for col in columns[1:]]
-
-            # Create a dictionary for each year with its corresponding holiday name and date
-            for year, date_str in zip(years, dates):
-                # Parse the date into a datetime object
-                date_parts = date_str.split(",")
-                month_day = (
-                    date_parts[1].strip().split("*")[0].split("(")[0]
-                ).strip()  # Clean extra symbols like *, ()
-                month, day = month_day.split(" ")
-
-                # Construct the full date string
-                full_date_str = f"{year} {month} {day.strip()}"
-                # Parse the full date string
-                date_time = datetime.strptime(full_date_str, "%Y %B %d")
-
-                # Format the datetime object
-                formatted_date_time = date_time.strftime("%Y-%m-%d")
-
-                holidays.append(
-                    {
-                        "year": year,
-                        "holiday_name": holiday_name,
-                        "date": date_str,
-                        "date_time": formatted_date_time,
-                    }
-                )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error parsing data: {e}")
-
-    return holidays
-
-
-@router.get("/holidays", response_model=list)
-def get_holidays():
-    holidays = fetch_holidays()
-    return holidays
+@router.get("/holidays", response_model=list, dependencies=[Depends(require_user)])
+async def get_holidays(request: Request):
+    body, etag = holiday_calendar.get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 class WebSocketManager:
@@ -113,13 +86,34 @@ class WebSocketManager:
         """init method, keeping track of connections"""
         self.active_connections = []
         self.isRunning = False
+        # Set while any connection is streaming; the off-hours listener waits on it
+        self.has_running = threading.Event()
 
     async def connect(self, websocket: WebSocket):
-        """connect event"""
+        """connect event, refused without a valid token or over the user's limit"""
+        user = websocket_user(websocket)
+        if not user:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return False
+        if connections_per_user[user] >= max_connections_per_user:
+            logger.warning(f"Refusing stream connection for {user}: connection limit")
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return False
+        connections_per_user[user] += 1
         await websocket.accept()
         self.active_connections.append(
-            {"isRunning": False, "socket": websocket, "symbols": []}
+            {
+                "isRunning": False,
+                "socket": websocket,
+                "symbols": [],
+                # IDs of "symbols" in the symbol table, for filtering batches
+                "symbol_ids": np.empty(0, dtype=np.int64),
+                # Parsed "Filter:" predicate, None to receive every record
+                "filter": None,
+                "user": user,
+            }
         )
+        return True
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Direct Message"""
@@ -129,6 +123,7 @@ class WebSocketManager:
         for idx, connection in enumerate(self.active_connections):
             if connection["socket"] == websocket:
                 self.active_connections[idx]["isRunning"] = True
+                self.has_running.set()
                 break
 
     def stopStream(self, websocket: WebSocket):
@@ -136,18 +131,38 @@ class WebSocketManager:
             if connection["socket"] == websocket:
                 self.active_connections[idx]["isRunning"] = False
                 break
+        self._update_has_running()
 
     def update_symbols(self, symbol: str, websocket: WebSocket):
+        """Apply an ``Add:SYM`` or ``Remove:SYM`` command; False for anything else."""
+        action, _, sym = symbol.partition(":")
+        if action not in ("Add", "Remove") or not sym:
+            return False
         for connection in self.active_connections:
             if connection["socket"] == websocket:
-                action, sym = symbol.split(":", 1)
                 symbols = connection["symbols"]
                 if action == "Add" and sym not in symbols:
+                    if len(symbols) >= max_symbols_per_connection:
+                        return False
                     symbols.append(sym)
                 elif action == "Remove" and sym in symbols:
                     symbols.remove(sym)
+                connection["symbol_ids"] = symbol_table.ids(symbols)
                 print("All connections:", symbols)
                 break
+        return True
+
+    def update_filter(self, expression: str, websocket: WebSocket):
+        """Set the connection's record filter; an empty expression removes it."""
+        try:
+            predicate = parse_filter(expression)
+        except ValueError:
+            return False
+        for connection in self.active_connections:
+            if connection["socket"] == websocket:
+                connection["filter"] = predicate
+                break
+        return True
 
     def disconnect(self, websocket: WebSocket):
         """disconnect event"""
@@ -155,7 +170,32 @@ class WebSocketManager:
             if connection["socket"] == websocket:
                 print("found")
                 self.active_connections.remove(connection)
+                connections_per_user[connection["user"]] -= 1
+                if connections_per_user[connection["user"]] <= 0:
+                    del connections_per_user[connection["user"]]
                 break
+        self._update_has_running()
+
+    def _update_has_running(self):
+        if not any(connection["isRunning"] for connection in self.active_connections):
+            self.has_running.clear()
+
+
+async def send_snapshot(topic, websocket, symbols=None):
+    """Last trade of each of ``symbols`` (all if empty), so a new subscriber starts with state."""
+    rows = last_trade_store(topic).snapshot(symbols or None)
+    if rows:
+        await websocket.send_json(
+            {"type": "snapshot", "headers": SNAPSHOT_HEADERS, "data": rows}
+        )
+        RECORDS_SENT.labels(topic).inc(len(rows))
+
+
+def subscribed_symbols(manager, websocket):
+    for connection in manager.active_connections:
+        if connection["socket"] == websocket:
+            return connection["symbols"]
+    return []
 
 
 # Existing manager for NLSUTP
@@ -167,7 +207,8 @@ manager_cta = WebSocketManager()
 
 @router.websocket("/get_real_data_utp")
 async def websocket_endpoint_utp(websocket: WebSocket):
-    await manager_utp.connect(websocket)
+    if not await manager_utp.connect(websocket):
+        return
     try:
         while True:
             data = await websocket.receive_text()
@@ -176,18 +217,34 @@ async def websocket_endpoint_utp(websocket: WebSocket):
                 manager_utp.startStream(websocket)
             elif data == "stop":
                 manager_utp.stopStream(websocket)
-            else:
-                manager_utp.update_symbols(symbol=data, websocket=websocket)
+            elif data.startswith("Filter:"):
+                if not manager_utp.update_filter(data[len("Filter:") :], websocket):
+                    await manager_utp.send_personal_message(
+                        f"Rejected:{data}", websocket
+                    )
+                    continue
+            elif not manager_utp.update_symbols(symbol=data, websocket=websocket):
+                await manager_utp.send_personal_message(f"Rejected:{data}", websocket)
+                continue
             await manager_utp.send_personal_message(f"Received:{data}", websocket)
+            # Start from the last trades instead of waiting for the next ones
+            if data == "start":
+                await send_snapshot(
+                    "NLSUTP", websocket, subscribed_symbols(manager_utp, websocket)
+                )
+            elif data.startswith("Add:"):
+                await send_snapshot("NLSUTP", websocket, [data[len("Add:") :]])
     except WebSocketDisconnect:
         print("disconnected")
-        manager_utp.disconnect(websocket)
         # await manager_utp.send_personal_message("Bye!!!", websocket)
+    finally:
+        manager_utp.disconnect(websocket)
 
 
 @router.websocket("/get_real_data_cta")
 async def websocket_endpoint_cta(websocket: WebSocket):
-    await manager_cta.connect(websocket)
+    if not await manager_cta.connect(websocket):
+        return
     try:
         while True:
             data = await websocket.receive_text()
@@ -195,28 +252,65 @@ async def websocket_endpoint_cta(websocket: WebSocket):
                 manager_cta.startStream(websocket)
             elif data == "stop":
                 manager_cta.stopStream(websocket)
-            else:
-                manager_cta.update_symbols(symbol=data, websocket=websocket)
+            elif data.startswith("Filter:"):
+                if not manager_cta.update_filter(data[len("Filter:") :], websocket):
+                    await manager_cta.send_personal_message(
+                        f"Rejected:{data}", websocket
+                    )
+                    continue
+            elif not manager_cta.update_symbols(symbol=data, websocket=websocket):
+                await manager_cta.send_personal_message(f"Rejected:{data}", websocket)
+                continue
             await manager_cta.send_personal_message(f"Received:{data}", websocket)
+            # Start from the last trades instead of waiting for the next ones
+            if data == "start":
+                await send_snapshot(
+                    "NLSCTA", websocket, subscribed_symbols(manager_cta, websocket)
+                )
+            elif data.startswith("Add:"):
+                await send_snapshot("NLSCTA", websocket, [data[len("Add:") :]])
     except WebSocketDisconnect:
         print("disconnected")
-        manager_cta.disconnect(websocket)
         # await manager_cta.send_personal_message("Bye!!!", websocket)
+    finally:
+        manager_cta.disconnect(websocket)
 
 
-@router.post("/get_data")
+@router.post("/get_data", dependencies=[Depends(require_user)])
 async def get_nasdaq_data_by_date(request: Optional[Nasdaq]):
+    if request.start_datetime:
+        start = datetime.strptime(request.start_datetime, "%Y-%m-%dT%H:%M")
+        # Days the archive holds in full are read from its memory-mapped columns
+        if tick_archive.covers(ARCHIVE_TOPICS, start.date()):
+            return await asyncio.to_thread(
+                tick_archive.trades_since, ARCHIVE_TOPICS, start, request.symbol
+            )
     records = await fetch_all_data(request.symbol, request.start_datetime)
     return records
 
 
-@router.get("/get_tickers")
-async def get_tickers():
-    records = await fetch_all_tickers()
-    return records
+@router.get("/snapshot", dependencies=[Depends(require_user)])
+async def get_snapshot(topic: str = "NLSUTP", symbols: Optional[str] = None):
+    """Last trade and volume per symbol; ``symbols`` is comma-separated, all traded symbols if omitted."""
+    if topic not in last_trades:
+        raise HTTPException(status_code=404, detail=f"No trades for {topic}")
+    wanted = [symbol.strip() for symbol in symbols.split(",")] if symbols else None
+    return {
+        "headers": SNAPSHOT_HEADERS,
+        "data": last_trade_store(topic).snapshot(wanted),
+    }
+
 
+@router.get("/get_tickers", dependencies=[Depends(require_user)])
+async def get_tickers(request: Request):
+    body, etag = await ticker_cache.get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-@router.get("/get_connections_utp")
+
+@router.get("/get_connections_utp", dependencies=[Depends(require_user)])
 async def get_connections_utp():
     connections = []
     for idx, connection in enumerate(manager_utp.active_connections):
@@ -224,7 +318,7 @@ async def get_connections_utp():
     return connections
 
 
-@router.get("/get_connections_cta")
+@router.get("/get_connections_cta", dependencies=[Depends(require_user)])
 async def get_connections_cta():
     connections = []
     for idx, connection in enumerate(manager_cta.active_connections):
@@ -251,8 +345,14 @@ def makeRespFromKafkaMessages(messages):
         ],
         "data": [],
     }
+    symbol_ids = []
     for message in messages:
         msg = message.value()
+        symbol_ids.append(
+            msg["symbolId"]
+            if "symbolId" in msg
+            else symbol_table.id(msg["symbol"] if "symbol" in msg else "")
+        )
         resp["data"].append(
             (
                 [
@@ -272,6 +372,8 @@ def makeRespFromKafkaMessages(messages):
                 ]
             )
         )
+    # IDs of the "symbol" column, for filtering and the trade stores
+    resp["symbol_ids"] = np.array(symbol_ids, dtype=np.int64)
     return resp
 
 
@@ -299,7 +401,13 @@ def convert_tracking_id_to_timestamp(tracking_id: str) -> datetime:
     return timestamp
 
 
-def init_nasdaq_kafka_connection(topic):
+def init_nasdaq_kafka_connection(topic, timestamp=None, persist=persist_live_ticks):
+    """
+    Consumer for ``topic``, or one consumer for all partitions of a list of
+    topics. With ``timestamp`` (ms since the epoch) it starts there instead of
+    at the latest offset; with ``persist`` it resumes from the offsets the tick
+    sink committed. No consumer auto-commits.
+    """
     print(os.getenv("NASDAQ_KAFKA_ENDPOINT"))
     security_cfg = {
         "oauth.token.endpoint.uri": os.getenv("NASDAQ_KAFKA_ENDPOINT"),
@@ -310,28 +418,49 @@ def init_nasdaq_kafka_connection(topic):
         "bootstrap.servers": os.getenv("NASDAQ_KAFKA_BOOTSTRAP_URL"),
         "auto.offset.reset": "latest",
         "socket.keepalive.enable": True,
+        # Every consumer shares the client ID as group.id; only the tick sink
+        # commits on it, once the rows are in Postgres. A replay or quote
+        # consumer committing would move where the live listener resumes.
+        "enable.auto.commit": False,
     }
 
-    ncds_client = NCDSClient(security_cfg, kafka_cfg)
-    consumer = ncds_client.ncds_kafka_consumer(topic)
+    # Pulls in confluent_kafka and avro; only the live feed needs them
+    from ncdssdk import NCDSClient
+
+    # The decoder tags each message with its symbol's ID as "symbolId"
+    ncds_client = NCDSClient(security_cfg, kafka_cfg, symbol_table.id)
+    if isinstance(topic, list):
+        consumer = ncds_client.ncds_multi_topic_kafka_consumer(topic, timestamp)
+    else:
+        consumer = ncds_client.ncds_kafka_consumer(topic, timestamp)
+    if persist:
+        seek_to_committed(consumer, topic)
     logger.info(f"Success to connect NASDAQ Kafka server for topic {topic}.")
     return consumer
 
 
 def is_market_open():
-    """Check if the market is open based on EST time."""
-    est = pytz.timezone("America/New_York")
-    now_est = datetime.now(est)
+    """Check if a Nasdaq session (pre-market through post-market) is in progress."""
+    return session_calendar().is_open(time.time())
+
 
-    # Check if today is a weekend
-    if now_est.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
-        return False
+def seconds_until_next_transition(now, max_wait=3600):
+    """Capped so a refreshed holiday calendar is picked up within the hour."""
+    transition = session_calendar(now).next_transition(now)
+    if transition is None:
+        return max_wait
+    return min(max(transition[0] - now, 0.01), max_wait)
 
-    # Market hours are from 4 AM to 8 PM EST
-    market_open_time = now_est.replace(hour=4, minute=0, second=0, microsecond=0)
-    market_close_time = now_est.replace(hour=20, minute=0, second=0, microsecond=0)
-    return True
-    return market_open_time <= now_est < market_close_time
+
+def close_consumer(consumer, sink):
+    if sink:
+        # Wait for the last batch so its offsets are in the final commit
+        sink.flush(wait=True)
+        sink.commit(consumer)
+    try:
+        consumer.close()
+    except Exception as e:
+        logger.error(f"Error closing Kafka consumer: {e}")
 
 
 def generate_dummy_data():
@@ -359,6 +488,16 @@ def generate_dummy_data():
     # Format the adjusted datetime to the desired format
     current_timestamp = current_datetime.strftime("%Y-%m-%d %H:%M:%S.%f")
 
+    # Draw every symbol's random fields in one vectorized pass instead of row by row
+    table = dummy_price_table()
+    count = len(table.symbols)
+    tracking_ids = dummy_rng.integers(
+        10000000000000, 99999999999999, count, endpoint=True
+    )
+    prices = dummy_rng.integers(table.lower_price, table.higher_price, endpoint=True)
+    sizes = dummy_rng.integers(table.lower_size, table.higher_size, endpoint=True)
+    volumes = dummy_rng.integers(1000, 1000000, count, endpoint=True)
+
     return {
         "headers": [
             "trackingID",
@@ -377,78 +516,149 @@ def generate_dummy_data():
         ],
         "data": [
             [
-                random.randint(
-                    10000000000000, 99999999999999
-                ),  # dummy trackingID (14-digit)
+                tracking_id,  # dummy trackingID (14-digit)
                 current_timestamp,
                 "T",  # example message type
-                row["symbol"],  # symbol from DataFrame
-                random.randint(
-                    int(row["lower_price"]), int(row["higher_price"])
-                ),  # price in dollars
+                symbol,
+                price,
                 "0",  # dummy soup_partition
                 "0",  # dummy soup_sequence
                 "Q",  # dummy market_center
                 "Q",  # dummy security_class
                 "001",  # dummy control_number
-                random.randint(int(row["lower_size"]), int(row["higher_size"])),  # size
+                size,
                 "@",  # dummy sale_condition
-                random.randint(1000, 1000000),  # dummy consolidated_volume
+                volume,  # dummy consolidated_volume
             ]
-            for index, row in dummy_symbols_price_range.iterrows()
+            for tracking_id, symbol, price, size, volume in zip(
+                tracking_ids.tolist(),
+                table.symbols,
+                prices.tolist(),
+                sizes.tolist(),
+                volumes.tolist(),
+            )
         ],
     }
 
 
 async def listen_message_from_nasdaq_kafka(manager, topic):
     consumer = None
+    sink = TickSink(topic).start() if persist_live_ticks else None
+    store = last_trade_store(topic)
+    analytics = trade_analytics_store(topic)
+    archive = tick_archive.writer(topic) if archive_live_ticks else None
+    # Whether the next consumer starts at the session open, with nothing missed
+    at_session_open = False
     logger.info(f"Starting listening messages from nasdaq kafka for topic {topic}!")
     while True:
         try:
-            if send_dummy_data and not is_market_open():
-                if not any(
-                    connection["isRunning"] for connection in manager.active_connections
-                ):
-                    time.sleep(0.5)
+            now = time.time()
+            if not session_calendar(now).is_open(now):
+                at_session_open = True
+                if archive and archive.day is not None:
+                    # Complete only if a consumer was still feeding it at the close
+                    archive.close(session_ended=consumer is not None)
+                if consumer:
+                    close_consumer(consumer, sink)
+                    consumer = None
+                    logger.info(f"Market closed. Stopped consuming {topic}.")
+                until_transition = seconds_until_next_transition(now)
+                if not send_dummy_data:
+                    time.sleep(until_transition)
+                    continue
+                if not manager.has_running.wait(timeout=until_transition):
                     continue
-                time.sleep(0.5)
+                time.sleep(min(0.5, until_transition))
                 # Market is closed; send dummy data
                 response = generate_dummy_data()
-                logger.info("Market closed. Sending dummy data.")
+                logger.debug("Market closed. Sending dummy data.")
             else:
                 # Market is open; consume real data
                 if not consumer:
-                    consumer = init_nasdaq_kafka_connection(topic)
+                    consumer = init_nasdaq_kafka_connection(topic, persist=False)
+                    resumed = sink is not None and seek_to_committed(consumer, topic)
+                    store.start_day(market_midnight().date())
+                    analytics.start_day(market_midnight().date())
+                    trading_day = market_midnight().date()
+                    if archive:
+                        archive.start_session(trading_day, at_session_open or resumed)
+                    at_session_open = False
                     logger.info("Market open. Listening for real data.")
-                messages = consumer.consume(num_messages=1000000, timeout=0.25)
+                with timed(KAFKA_CONSUME_SECONDS, topic):
+                    messages = consumer.consume(num_messages=1000000, timeout=0.25)
+                if sink:
+                    # Messages consumed again after a rewind are only persisted
+                    messages = sink.add(messages)
+                    sink.commit(consumer)
+                    sink.throttle(consumer)
                 if messages:
-                    logger.info(f"Received {len(messages)} messages from Kafka topic {topic}.")
-                    response = makeRespFromKafkaMessages(messages)
+                    logger.debug(
+                        "Received %d messages from Kafka topic %s.",
+                        len(messages),
+                        topic,
+                    )
+                    MESSAGES_CONSUMED.labels(topic).inc(len(messages))
+                    symbol_table.seed_from_directory(
+                        message.value() for message in messages
+                    )
+                    AVRO_DECODE_SECONDS.labels(topic).observe(
+                        consumer.last_decode_seconds
+                    )
+                    with timed(RESPONSE_BUILD_SECONDS, topic):
+                        response = makeRespFromKafkaMessages(messages)
+                    observe_feed_lag(topic, response["data"][-1][0])
+                    traded = [
+                        i for i, d in enumerate(response["data"]) if d[5] is not None
+                    ]
+                    trades = [response["data"][i] for i in traded]
+                    ticker_cache.observe(
+                        d[3] for d in trades if d[2] in COUNTED_MSG_TYPES
+                    )
+                    columns = (
+                        [d[3] for d in trades],
+                        [d[4] for d in trades],
+                        [d[5] for d in trades],
+                        [d[0] for d in trades],
+                    )
+                    trade_ids = response["symbol_ids"][traded]
+                    store.update(*columns, ids=trade_ids)
+                    analytics.update(*columns, ids=trade_ids)
+                    if archive:
+                        with timed(ARCHIVE_APPEND_SECONDS, topic):
+                            archive.append(
+                                trading_day,
+                                columns[3],
+                                [d[2] for d in trades],
+                                *columns[:3],
+                            )
                 else:
                     continue
+            batch = FilterBatch(response)
+            # Connections with the same symbols and filter share one encoded frame
+            frames = {}
             for idx, connection in enumerate(manager.active_connections):
                 if connection["isRunning"]:
                     webSocket = connection["socket"]
                     try:
-                        if connection["symbols"]:
-                            temp_response = {
-                                "headers": response["headers"],
-                                "data": [
-                                    d
-                                    for d in response["data"]
-                                    if d[3] in connection["symbols"]
-                                ],
-                            }
-                            if temp_response["data"]:
-                                logger.info(
-                                    f"Sending {len(temp_response['data'])} / {len(response['data'])} records to WebSocket connection for symbols {connection['symbols']} from Kafka topic {topic}.."
+                        key = (tuple(connection["symbols"]), connection["filter"])
+                        frame = frames.get(key)
+                        if frame is None:
+                            with timed(SYMBOL_FILTER_SECONDS, topic):
+                                frame = frames[key] = batch.frame(
+                                    connection["symbol_ids"], connection["filter"]
                                 )
-                                await webSocket.send_json(temp_response)
-                        else:
-                            logger.info(
-                                f"Sending {len(response['data'])} records to WebSocket connection {idx}."
+                        body, records = frame
+                        if records:
+                            logger.debug(
+                                "Sending %d / %d records to WebSocket connection %d from Kafka topic %s.",
+                                records,
+                                len(response["data"]),
+                                idx,
+                                topic,
                             )
-                            await webSocket.send_json(response)
+                            with timed(WEBSOCKET_SEND_SECONDS, topic):
+                                await webSocket.send_text(body)
+                            RECORDS_SENT.labels(topic).inc(records)
                     except RuntimeError as re:
                         if "Unexpected ASGI message" in str(re):
                             pass  # WebSocket already closed
@@ -458,23 +668,39 @@ async def listen_message_from_nasdaq_kafka(manager, topic):
                             f"Error occurred while sending data to client: {e}",
                             exc_info=True,
                         )
-                        logger.info(f"In except, this is the response: {response}")
+                        logger.info(
+                            f"In except, the response had {len(response['data'])} records"
+                        )
         except Exception as e:
             logger.error(f"Error in consuming: {e}", exc_info=True)
+            if consumer:
+                try:
+                    close_consumer(consumer, sink)
+                except Exception as close_error:
+                    logger.error(f"Error closing consumer for {topic}: {close_error}")
             consumer = None
 
 
 @router.on_event("startup")
 async def startup_event():
+    # The listeners follow the session calendar, which is built from the holidays
+    holiday_calendar.load()
+    # Give the known symbols their IDs up front; the feeds' directories add the rest
+    symbol_table.seed(dummy_price_table().symbols)
+
     # Start thread for NLSUTP
     nasdaq_kafka_thread_utp = Thread(
-        target=between_callback, args=(manager_utp, "NLSUTP")
+        target=between_callback,
+        args=(manager_utp, "NLSUTP"),
+        name="nasdaq-ingest-NLSUTP",
     )
     nasdaq_kafka_thread_utp.start()
 
     # Start thread for NLSCTA
     nasdaq_kafka_thread_cta = Thread(
-        target=between_callback, args=(manager_cta, "NLSCTA")
+        target=between_callback,
+        args=(manager_cta, "NLSCTA"),
+        name="nasdaq-ingest-NLSCTA",
     )
     nasdaq_kafka_thread_cta.start()
 
@@ -489,5 +715,6 @@ def between_callback(manager, topic):
 
 
 if __name__ == "__main__":
-    output = fetch_holidays()
-    print(output)
+    configure_logging()
+    asyncio.run(holiday_calendar.refresh())
+    print(holiday_calendar.holidays)
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from threading import Thread
+
+import pytz
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+
+from app.application_logger import get_logger
+from app.auth.authentication import require_user
+from app.metrics import (
+    KAFKA_CONSUME_SECONDS,
+    MESSAGES_CONSUMED,
+    ORDER_BOOK_APPLY_SECONDS,
+    ORDER_BOOK_ORDERS,
+    RECORDS_SENT,
+    timed,
+)
+from app.routers.nasdaq import (
+    WebSocketManager,
+    close_consumer,
+    init_nasdaq_kafka_connection,
+    seconds_until_next_transition,
+)
+from app.services.market_calendar import session_calendar
+from app.services.order_book import OrderBookEngine
+from app.services.symbols import symbol_table
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+router = APIRouter(prefix="/nasdaq", tags=["order_book"])
+
+ORDER_BOOK_TOPIC = "TOTALVIEW"
+stream_order_book = os.getenv("STREAM_ORDER_BOOK", "false") == "true"
+# Frames waiting for one subscriber; a subscriber that falls further behind is resynced
+max_pending_frames = int(os.getenv("ORDER_BOOK_MAX_PENDING_FRAMES", "1000"))
+
+order_book = OrderBookEngine(depth=int(os.getenv("ORDER_BOOK_DEPTH", "10")))
+
+eastern = pytz.timezone("America/New_York")
+
+
+class BookSubscriber:
+    """
+    One depth stream connection.
+
+    Frames are queued on the application loop and written by a per-connection
+    task, so a snapshot and the deltas that follow it always leave in ``seq``
+    order. ``since`` holds the snapshot ``seq`` per symbol; older deltas are
+    already part of the snapshot and are skipped.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=max_pending_frames)
+        self.since = {}
+
+    def subscribe(self, symbol):
+        seq, view = order_book.snapshot(symbol)
+        self.since[symbol] = seq
+        self.queue.put_nowait(
+            {"type": "snapshot", "symbol": symbol, "seq": seq, **view}
+        )
+
+    def unsubscribe(self, symbol):
+        self.since.pop(symbol, None)
+
+    def offer(self, seq, deltas):
+        frames = [
+            {"type": "delta", "seq": seq, **delta}
+            for delta in deltas
+            if self.since.get(delta["symbol"], seq) < seq
+        ]
+        if len(frames) > self.queue.maxsize - self.queue.qsize():
+            # Too far behind: drop the backlog and start over from fresh snapshots
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            for symbol in list(self.since):
+                self.subscribe(symbol)
+            return
+        for frame in frames:
+            self.queue.put_nowait(frame)
+
+    async def write(self):
+        while True:
+            frame = await self.queue.get()
+            await self.websocket.send_json(frame)
+            RECORDS_SENT.labels(ORDER_BOOK_TOPIC).inc()
+
+
+manager_book = WebSocketManager()
+book_subscribers = {}
+
+
+def fan_out(seq, deltas):
+    """Runs on the application loop for every applied batch."""
+    for subscriber in book_subscribers.values():
+        subscriber.offer(seq, deltas)
+
+
+@router.websocket("/stream/book")
+async def websocket_endpoint_book(websocket: WebSocket):
+    """
+    Top-of-book depth stream. Send ``Add:SYM`` to receive a snapshot of the
+    top levels followed by deltas (quantity 0 removes a level), ``Remove:SYM``
+    to stop.
+    """
+    if not await manager_book.connect(websocket):
+        return
+    subscriber = BookSubscriber(websocket)
+    book_subscribers[websocket] = subscriber
+    writer = asyncio.create_task(subscriber.write())
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if not manager_book.update_symbols(symbol=data, websocket=websocket):
+                await manager_book.send_personal_message(f"Rejected:{data}", websocket)
+                continue
+            action, symbol = data.split(":", 1)
+            if action == "Add":
+                subscriber.subscribe(symbol)
+            elif action == "Remove":
+                subscriber.unsubscribe(symbol)
+            await manager_book.send_personal_message(f"Received:{data}", websocket)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        writer.cancel()
+        book_subscribers.pop(websocket, None)
+        manager_book.disconnect(websocket)
+
+
+@router.get("/book/{symbol}", dependencies=[Depends(require_user)])
+async def get_order_book(symbol: str, depth: int = 10):
+    snapshot = order_book.depth_snapshot(symbol, min(max(depth, 1), 1000))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No order book for {symbol}")
+    return snapshot
+
+
+def market_midnight_ms():
+    now = datetime.now(eastern)
+    return int(
+        now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000
+    )
+
+
+def listen_order_book(loop):
+    """
+    Rebuild the books from the start of the trading day and keep them current.
+    Runs on its own thread; subscribers are fed through ``loop``.
+    """
+    consumer = None
+    logger.info(f"Starting order book engine for {ORDER_BOOK_TOPIC}")
+    while True:
+        try:
+            now = time.time()
+            if not session_calendar(now).is_open(now):
+                if consumer:
+                    close_consumer(consumer, None)
+                    consumer = None
+                    logger.info("Market closed. Stopped the order book engine.")
+                time.sleep(seconds_until_next_transition(now))
+                continue
+            if not consumer:
+                # Replay from midnight so orders placed before a restart are in the book
+                with order_book.lock:
+                    order_book.clear_books()
+                consumer = init_nasdaq_kafka_connection(
+                    ORDER_BOOK_TOPIC, timestamp=market_midnight_ms(), persist=False
+                )
+            with timed(KAFKA_CONSUME_SECONDS, ORDER_BOOK_TOPIC):
+                messages = consumer.consume(num_messages=100000, timeout=0.25)
+            if not messages:
+                continue
+            MESSAGES_CONSUMED.labels(ORDER_BOOK_TOPIC).inc(len(messages))
+            values = [message.value() for message in messages]
+            symbol_table.seed_from_directory(values)
+            with timed(ORDER_BOOK_APPLY_SECONDS, ORDER_BOOK_TOPIC):
+                seq, deltas = order_book.apply_batch(values)
+            ORDER_BOOK_ORDERS.set(len(order_book.orders))
+            if deltas:
+                loop.call_soon_threadsafe(fan_out, seq, deltas)
+        except Exception as e:
+            logger.error(f"Error in order book engine: {e}", exc_info=True)
+            if consumer:
+                try:
+                    close_consumer(consumer, None)
+                except Exception as close_error:
+                    logger.error(f"Error closing order book consumer: {close_error}")
+            consumer = None
+
+
+@router.on_event("startup")
+async def startup_event():
+    if not stream_order_book:
+        return
+    Thread(
+        target=listen_order_book,
+        args=(asyncio.get_running_loop(),),
+        name=f"nasdaq-ingest-{ORDER_BOOK_TOPIC}",
+    ).start()
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from threading import Thread
+
+import numpy as np
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+
+from app.application_logger import get_logger
+from app.auth.authentication import require_user
+from app.metrics import (
+    KAFKA_CONSUME_SECONDS,
+    MESSAGES_CONSUMED,
+    QUOTE_APPLY_SECONDS,
+    RECORDS_SENT,
+    WEBSOCKET_SEND_SECONDS,
+    timed,
+)
+from app.routers.nasdaq import (
+    WebSocketManager,
+    close_consumer,
+    init_nasdaq_kafka_connection,
+    seconds_until_next_transition,
+)
+from app.services.market_calendar import session_calendar
+from app.services.quotes import QUOTE_HEADERS, quote_engine
+from app.services.symbols import symbol_table
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+router = APIRouter(prefix="/nasdaq", tags=["quotes"])
+
+QUOTES_LABEL = "QBBO"
+# e.g. QBBO-A-CORE,QBBO-B-CORE,QBBO-C-CORE; empty leaves the quote engine off
+qbbo_topics = [
+    topic.strip() for topic in os.getenv("QBBO_TOPICS", "").split(",") if topic.strip()
+]
+# Quotes are conflated: each changed symbol is sent at most once per interval
+publish_interval = float(os.getenv("QUOTE_PUBLISH_INTERVAL_SECONDS", "0.1"))
+
+manager_quotes = WebSocketManager()
+publish_task = None
+
+
+@router.websocket("/stream/quotes")
+async def websocket_endpoint_quotes(websocket: WebSocket):
+    """
+    Consolidated best bid and offer. Send ``Add:SYM`` to receive the current
+    quote and then every change, ``Remove:SYM`` to stop.
+    """
+    if not await manager_quotes.connect(websocket):
+        return
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if not manager_quotes.update_symbols(symbol=data, websocket=websocket):
+                await manager_quotes.send_personal_message(
+                    f"Rejected:{data}", websocket
+                )
+                continue
+            await manager_quotes.send_personal_message(f"Received:{data}", websocket)
+            action, symbol = data.split(":", 1)
+            rows = quote_engine.snapshot([symbol]) if action == "Add" else []
+            if rows:
+                await websocket.send_json({"headers": QUOTE_HEADERS, "data": rows})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager_quotes.disconnect(websocket)
+
+
+@router.get("/quotes", dependencies=[Depends(require_user)])
+async def get_quotes(symbols: str = Query(..., description="Comma-separated symbols")):
+    return {
+        "headers": QUOTE_HEADERS,
+        "data": quote_engine.snapshot(
+            [symbol.strip() for symbol in symbols.split(",")]
+        ),
+    }
+
+
+async def publish_quotes():
+    """Send the quotes changed since the last round to their subscribers."""
+    while True:
+        await asyncio.sleep(publish_interval)
+        ids, rows = quote_engine.drain()
+        if not rows:
+            continue
+        for connection in list(manager_quotes.active_connections):
+            websocket = connection["socket"]
+            mask = np.isin(ids, connection["symbol_ids"])
+            if not mask.any():
+                continue
+            data = [row for row, wanted in zip(rows, mask.tolist()) if wanted]
+            try:
+                with timed(WEBSOCKET_SEND_SECONDS, QUOTES_LABEL):
+                    await websocket.send_json({"headers": QUOTE_HEADERS, "data": data})
+                RECORDS_SENT.labels(QUOTES_LABEL).inc(len(data))
+            except Exception as e:
+                logger.error(f"Error sending quotes to client: {e}")
+
+
+def listen_quotes(topics):
+    """
+    Feed the QBBO topics into the quote engine from one consumer, so the venues
+    share its broker connections and buffers; runs on its own thread.
+    """
+    consumer = None
+    logger.info(f"Starting quote engine for {', '.join(topics)}")
+    while True:
+        try:
+            now = time.time()
+            if not session_calendar(now).is_open(now):
+                if consumer:
+                    close_consumer(consumer, None)
+                    consumer = None
+                    logger.info(f"Market closed. Stopped consuming {QUOTES_LABEL}.")
+                time.sleep(seconds_until_next_transition(now))
+                continue
+            if not consumer:
+                consumer = init_nasdaq_kafka_connection(topics, persist=False)
+            with timed(KAFKA_CONSUME_SECONDS, QUOTES_LABEL):
+                messages = consumer.consume(num_messages=100000, timeout=0.25)
+            if not messages:
+                continue
+            # Messages arrive as <topic>.stream; each topic is one venue
+            by_topic = {}
+            for message in messages:
+                by_topic.setdefault(message.topic(), []).append(message.value())
+            for stream, values in by_topic.items():
+                topic = stream.removesuffix(".stream")
+                MESSAGES_CONSUMED.labels(topic).inc(len(values))
+                symbol_table.seed_from_directory(values)
+                with timed(QUOTE_APPLY_SECONDS, topic):
+                    quote_engine.apply_batch(topic, values)
+        except Exception as e:
+            logger.error(f"Error in quote engine: {e}", exc_info=True)
+            if consumer:
+                try:
+                    close_consumer(consumer, None)
+                except Exception as close_error:
+                    logger.error(f"Error closing quote consumer: {close_error}")
+            consumer = None
+
+
+@router.on_event("startup")
+async def startup_event():
+    global publish_task
+    if not qbbo_topics:
+        return
+    Thread(
+        target=listen_quotes, args=(qbbo_topics,), name=f"nasdaq-ingest-{QUOTES_LABEL}"
+    ).start()
+    publish_task = asyncio.create_task(publish_quotes())
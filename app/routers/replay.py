@@ -0,0 +1,197 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+
+from app.application_logger import get_logger
+from app.metrics import (
+    RECORDS_SENT,
+    REPLAY_FEEDS,
+    REPLAY_SESSIONS,
+    WEBSOCKET_SEND_SECONDS,
+    timed,
+)
+from app.routers.nasdaq import (
+    WebSocketManager,
+    init_nasdaq_kafka_connection,
+    makeRespFromKafkaMessages,
+)
+from app.services.replay import (
+    ArchiveReplaySource,
+    ReplayRegistry,
+    eastern,
+    epoch_ns,
+    pace_chunks,
+    parse_start,
+    tracking_day,
+)
+from app.services.stream_filters import FilterBatch
+from app.services.tick_archive import tick_archive
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+router = APIRouter(prefix="/nasdaq", tags=["replay"])
+
+REPLAY_TOPICS = ("NLSUTP", "NLSCTA")
+
+
+class KafkaReplaySource:
+    """A consumer seeked to the replay start."""
+
+    def __init__(self, topic, start_ms):
+        self._consumer = init_nasdaq_kafka_connection(
+            topic, timestamp=start_ms, persist=False
+        )
+
+    def read(self):
+        messages = self._consumer.consume(num_messages=10000, timeout=1)
+        if not messages:
+            return None
+        response = makeRespFromKafkaMessages(messages)
+        data = response["data"]
+        tracking_ids = np.fromiter(
+            (row[0] for row in data), dtype=np.int64, count=len(data)
+        )
+        days = [
+            tracking_day(message.timestamp()[1], row[0])
+            for message, row in zip(messages, data)
+        ]
+        midnights = {day: int(epoch_ns(day, 0)) for day in set(days)}
+        response["times"] = tracking_ids + np.fromiter(
+            (midnights[day] for day in days), dtype=np.int64, count=len(days)
+        )
+        # The live stream dates trackingIDs today; a replay knows their day
+        dates = (
+            np.array([np.datetime64(day.isoformat(), "us") for day in days])
+            + tracking_ids // 1000
+        )
+        for row, moment in zip(data, dates.tolist()):
+            row[1] = str(moment)
+        return response
+
+    def close(self):
+        self._consumer.close()
+
+
+def open_replay_source(topic, start_ms):
+    """The tick archive when it holds every trade from the start day on, Kafka otherwise."""
+    day = datetime.fromtimestamp(start_ms / 1000, eastern).date()
+    if tick_archive.covers([topic], day):
+        return ArchiveReplaySource(tick_archive, topic, start_ms)
+    return KafkaReplaySource(topic, start_ms)
+
+
+manager_replay = WebSocketManager()
+replays = ReplayRegistry(open_replay_source)
+REPLAY_SESSIONS.set_function(lambda: replays.sessions)
+REPLAY_FEEDS.set_function(lambda: len(replays.feeds))
+
+
+@router.websocket("/stream/replay")
+async def websocket_endpoint_replay(
+    websocket: WebSocket, topic: str = "NLSUTP", start: str = "", speed: str = "1"
+):
+    """
+    Replay ``topic`` from ``start`` (epoch milliseconds or an ISO datetime,
+    Eastern when naive) at ``speed`` times real time, or as fast as the client
+    reads with ``speed=max``. ``Add:``/``Remove:`` and ``Filter:`` narrow the
+    records as on the live streams, ``start`` begins the replay and ``stop``
+    ends it. ``Replay:end`` follows the last record of the retained data.
+    Starts the tick archive covers are read from it and carry trades only.
+    """
+    try:
+        start_ms = parse_start(start)
+        rate = None if speed == "max" else float(speed)
+        if topic not in REPLAY_TOPICS or (rate is not None and rate <= 0):
+            raise ValueError(f"Invalid replay of {topic} at {speed}")
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not await manager_replay.connect(websocket):
+        return
+    task = None
+    feed = None
+    # Identifies one start..stop run, so a stopped run cannot release the next one
+    session = None
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "start":
+                if task is None:
+                    session = object()
+                    feed = replays.acquire(session, topic, start_ms)
+                    if feed is None:
+                        # Every replay slot is taken; the client may retry later
+                        await manager_replay.send_personal_message(
+                            f"Rejected:{data}", websocket
+                        )
+                        continue
+                    task = asyncio.create_task(
+                        run_replay(websocket, session, feed, start_ms, rate)
+                    )
+            elif data == "stop":
+                if task is not None:
+                    task.cancel()
+                    replays.release(session, feed)
+                    task = None
+            elif data.startswith("Filter:"):
+                if not manager_replay.update_filter(data[len("Filter:") :], websocket):
+                    await manager_replay.send_personal_message(
+                        f"Rejected:{data}", websocket
+                    )
+                    continue
+            elif not manager_replay.update_symbols(symbol=data, websocket=websocket):
+                await manager_replay.send_personal_message(
+                    f"Rejected:{data}", websocket
+                )
+                continue
+            await manager_replay.send_personal_message(f"Received:{data}", websocket)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if task is not None:
+            task.cancel()
+            replays.release(session, feed)
+        manager_replay.disconnect(websocket)
+
+
+async def run_replay(websocket, session, feed, start_ms, speed):
+    """Stream the feed to one client, sleeping so records leave at ``speed`` times their feed pace."""
+    loop = asyncio.get_running_loop()
+    connection = next(
+        c for c in manager_replay.active_connections if c["socket"] == websocket
+    )
+    # Epoch nanoseconds: trackingIDs start over every midnight
+    origin = start_ms * 10**6
+    started = loop.time()
+    try:
+        while (response := await feed.next_batch(session)) is not None:
+            data = response["data"]
+            times = response["times"]
+            if times[0] < origin:
+                # The shared feed started before this replay did
+                keep = times >= origin
+                data = [row for row, wanted in zip(data, keep.tolist()) if wanted]
+                times = times[keep]
+            if speed is None:
+                chunks = [(0, len(data), None)] if data else []
+            else:
+                chunks = pace_chunks(times, speed)
+            for first, last, moment in chunks:
+                if speed is not None:
+                    due = started + (moment - origin) / 10**9 / speed
+                    if due > loop.time():
+                        await asyncio.sleep(due - loop.time())
+                body, records = FilterBatch(
+                    {"headers": response["headers"], "data": data[first:last]}
+                ).frame(connection["symbol_ids"], connection["filter"])
+                if records:
+                    with timed(WEBSOCKET_SEND_SECONDS, f"replay-{feed.topic}"):
+                        await websocket.send_text(body)
+                    RECORDS_SENT.labels(f"replay-{feed.topic}").inc(records)
+        await websocket.send_text("Replay:end")
+    except Exception as e:
+        logger.error(f"Error replaying {feed.topic}: {e}", exc_info=True)
+    finally:
+        replays.release(session, feed)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
-from app.auth.hashing import get_password_hash, verify_password
-from app.auth.authentication import create_access_token
+from app.auth.hashing import get_password_hash_async, verify_password_async
+from app.auth.authentication import create_access_token, require_user
 from app.models.user import (
     save_user,
     get_user,
@@ -36,7 +36,7 @@ async def email_existence(request: UserLogout):
 
 @router.post("/signup/")
 async def signup(user_in: UserSignUp):
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await get_password_hash_async(user_in.password)
     user_data = {
         "user_id": user_in.user_id,
         "email": user_in.email,
@@ -76,7 +76,7 @@ async def login(user_login: UserLogin):
         logger.error(f"User {user_login.email} not found", exc_info=True)
         raise HTTPException(status_code=400, detail="User not found")
 
-    if not verify_password(user_login.password, user["hashed_password"]):
+    if not await verify_password_async(user_login.password, user["hashed_password"]):
         logger.error(f"User {user_login.email} incorrect password", exc_info=True)
         raise HTTPException(status_code=400, detail="Incorrect Password")
 
@@ -85,8 +85,18 @@ async def login(user_login: UserLogin):
     return {"access_token": access_token, "token_type": "bearer", "message": message}
 
 
+def require_same_user(email: str, token_email: str):
+    if email != token_email:
+        raise HTTPException(
+            status_code=403, detail="Token does not belong to this user"
+        )
+
+
 @router.post("/settings/")
-async def update_settings(request: UpdateUserSettingsRequest):
+async def update_settings(
+    request: UpdateUserSettingsRequest, token_email: str = Depends(require_user)
+):
+    require_same_user(request.email, token_email)
     try:
         await update_user_settings(
             request.email, json.dumps(request.settings.model_dump())
@@ -102,7 +112,8 @@ async def update_settings(request: UpdateUserSettingsRequest):
 
 
 @router.post("/logout/")
-async def logout(request: UserLogout):
+async def logout(request: UserLogout, token_email: str = Depends(require_user)):
+    require_same_user(request.email, token_email)
     # check if user is in database (simple for now)
     user = await get_user(request.email)
 
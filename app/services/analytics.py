@@ -0,0 +1,181 @@
+import os
+from threading import Lock
+
+import numpy as np
+
+from app.services.symbols import grow, symbol_table
+
+ANALYTICS_HEADERS = [
+    "symbol",
+    "trackingID",
+    "volume",
+    "count",
+    "vwap",
+    "high",
+    "low",
+    "windowVolume",
+    "windowCount",
+    "windowVwap",
+]
+NANOSECONDS_PER_MINUTE = 60 * 10**9
+NO_LOW = np.iinfo(np.int64).max
+
+
+class TradeAnalytics:
+    """
+    Running per-symbol trade statistics for one topic.
+
+    Session totals (volume, trade count, price x size for the VWAP, high and
+    low) are arrays indexed by symbol ID. The moving window is a ring of
+    ``window_minutes`` one-minute buckets per symbol, bucket ``m % window``
+    holding minute ``m`` of the trading day; a bucket is zeroed when a newer
+    minute takes its slot. Memory grows with the number of symbols and the
+    window length, not with the message rate, and a batch is folded in with
+    ``ufunc.at`` calls instead of a loop over trades.
+
+    Minutes come from the ``trackingID``, nanoseconds since midnight, so the
+    window follows feed time and a replay computes the same values as live.
+    """
+
+    def __init__(self, window_minutes=5, capacity=1024):
+        self.window_minutes = window_minutes
+        self.lock = Lock()
+        self.day = None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.volume = np.zeros(capacity, dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.notional = np.zeros(capacity, dtype=np.float64)
+        self.high = np.zeros(capacity, dtype=np.int64)
+        self.low = np.full(capacity, NO_LOW, dtype=np.int64)
+        self.tracking_id = np.zeros(capacity, dtype=np.int64)
+        window_shape = (self.window_minutes, capacity)
+        self.window_volume = np.zeros(window_shape, dtype=np.int64)
+        self.window_count = np.zeros(window_shape, dtype=np.int64)
+        self.window_notional = np.zeros(window_shape, dtype=np.float64)
+        # Minute of the day held by each bucket, -1 while unused
+        self.bucket_minute = np.full(self.window_minutes, -1, dtype=np.int64)
+        self.dirty = np.zeros(capacity, dtype=bool)
+
+    def _reserve(self, size):
+        for name in (
+            "volume",
+            "count",
+            "notional",
+            "high",
+            "tracking_id",
+            "window_volume",
+            "window_count",
+            "window_notional",
+            "dirty",
+        ):
+            setattr(self, name, grow(getattr(self, name), size))
+        self.low = grow(self.low, size, fill=NO_LOW)
+
+    def start_day(self, day):
+        """Reset every statistic when ``day`` is a new trading day."""
+        with self.lock:
+            if day != self.day:
+                self.day = day
+                self._allocate(len(self.volume))
+
+    def update(self, symbols, prices, sizes, tracking_ids, ids=None):
+        """
+        Fold one batch of trades into the statistics. ``ids`` are the symbols' IDs
+        when the decoder already assigned them.
+        """
+        if not symbols:
+            return
+        if ids is None:
+            ids = symbol_table.ids(symbols)
+        prices = np.asarray(prices, dtype=np.int64)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        tracking_ids = np.asarray(tracking_ids, dtype=np.int64)
+        notional = prices * sizes.astype(np.float64)
+        minutes = tracking_ids // NANOSECONDS_PER_MINUTE
+        with self.lock:
+            self._reserve(len(symbol_table))
+            np.add.at(self.volume, ids, sizes)
+            np.add.at(self.count, ids, 1)
+            np.add.at(self.notional, ids, notional)
+            np.maximum.at(self.high, ids, prices)
+            np.minimum.at(self.low, ids, prices)
+            np.maximum.at(self.tracking_id, ids, tracking_ids)
+
+            slots = minutes % self.window_minutes
+            for minute in np.unique(minutes).tolist():
+                slot = minute % self.window_minutes
+                if minute > self.bucket_minute[slot]:
+                    self.window_volume[slot] = 0
+                    self.window_count[slot] = 0
+                    self.window_notional[slot] = 0
+                    self.bucket_minute[slot] = minute
+            # Trades older than the minute now in their bucket fell out of the window
+            current = self.bucket_minute[slots] == minutes
+            index = (slots[current], ids[current])
+            np.add.at(self.window_volume, index, sizes[current])
+            np.add.at(self.window_count, index, 1)
+            np.add.at(self.window_notional, index, notional[current])
+            self.dirty[ids] = True
+
+    def drain(self):
+        """``(ids, rows)`` of the symbols that traded since the last call."""
+        with self.lock:
+            ids = np.flatnonzero(self.dirty)
+            self.dirty[ids] = False
+            return ids, self._rows(ids)
+
+    def snapshot(self, symbols=None):
+        """Rows for ``symbols`` (every traded symbol if None)."""
+        with self.lock:
+            if symbols is None:
+                ids = np.flatnonzero(self.count)
+            else:
+                ids = np.array(
+                    [
+                        symbol_id
+                        for symbol_id in map(symbol_table.find, symbols)
+                        if symbol_id is not None and symbol_id < len(self.count)
+                    ],
+                    dtype=np.int64,
+                )
+                ids = ids[self.count[ids] > 0]
+            return self._rows(ids)
+
+    def _rows(self, ids):
+        latest = self.bucket_minute.max()
+        in_window = self.bucket_minute > latest - self.window_minutes
+        window_volume = self.window_volume[in_window][:, ids].sum(axis=0)
+        window_count = self.window_count[in_window][:, ids].sum(axis=0)
+        window_notional = self.window_notional[in_window][:, ids].sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.round(self.notional[ids] / self.volume[ids], 4)
+            window_vwap = np.round(window_notional / window_volume, 4)
+        names = symbol_table.names
+        return [
+            [names[symbol_id], *values]
+            for symbol_id, *values in zip(
+                ids.tolist(),
+                self.tracking_id[ids].tolist(),
+                self.volume[ids].tolist(),
+                self.count[ids].tolist(),
+                np.nan_to_num(vwap).tolist(),
+                self.high[ids].tolist(),
+                self.low[ids].tolist(),
+                window_volume.tolist(),
+                window_count.tolist(),
+                np.nan_to_num(window_vwap).tolist(),
+            )
+        ]
+
+
+window_minutes = int(os.getenv("ANALYTICS_WINDOW_MINUTES", "5"))
+trade_analytics = {}
+
+
+def trade_analytics_store(topic):
+    store = trade_analytics.get(topic)
+    if store is None:
+        store = trade_analytics.setdefault(topic, TradeAnalytics(window_minutes))
+    return store
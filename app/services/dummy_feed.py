@@ -0,0 +1,60 @@
+import csv
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+DUMMY_DATA_CSV = "app/routers/dummy_data.csv"
+DUMMY_DATA_NPZ = "app/routers/dummy_data.npz"
+
+
+class DummyPriceTable(NamedTuple):
+    """Per-symbol price and size ranges the off-hours feed draws from, one row per symbol."""
+
+    symbols: list
+    lower_price: np.ndarray
+    higher_price: np.ndarray
+    lower_size: np.ndarray
+    higher_size: np.ndarray
+
+
+def read_dummy_csv(path=DUMMY_DATA_CSV):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return {
+        "symbols": np.array([row["symbol"] for row in rows], dtype=str),
+        **{
+            column: np.array([int(row[column]) for row in rows], dtype=np.int64)
+            for column in DummyPriceTable._fields[1:]
+        },
+    }
+
+
+def build_dummy_npz(csv_path=DUMMY_DATA_CSV, npz_path=DUMMY_DATA_NPZ):
+    """Convert the CSV into the binary table loaded at runtime."""
+    np.savez_compressed(npz_path, **read_dummy_csv(csv_path))
+
+
+@lru_cache(maxsize=1)
+def dummy_price_table():
+    """
+    Load the price table on first use.
+
+    The compressed ``.npz`` copy loads in a few milliseconds without pandas. The
+    CSV is only parsed when the binary copy is missing; rebuild it with
+    ``python -m app.services.dummy_feed`` after editing the CSV.
+    """
+    if os.path.exists(DUMMY_DATA_NPZ):
+        with np.load(DUMMY_DATA_NPZ, allow_pickle=False) as npz:
+            columns = {name: npz[name] for name in npz.files}
+    else:
+        columns = read_dummy_csv()
+    # Symbols go into JSON frames as-is, so convert them to str once
+    columns["symbols"] = columns["symbols"].tolist()
+    return DummyPriceTable(**columns)
+
+
+if __name__ == "__main__":
+    build_dummy_npz()
+    print(f"Wrote {DUMMY_DATA_NPZ}")
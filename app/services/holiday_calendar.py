@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import httpx
+
+from app.application_logger import get_logger
+
+logger = get_logger(__name__)
+
+HOLIDAY_URL = "https://www.nyse.com/markets/hours-calendars"
+# Shipped with the app so the calendar works before the first successful fetch
+BUNDLED_HOLIDAYS = os.path.join(os.path.dirname(__file__), "nyse_holidays.json")
+
+
+def parse_holidays(html):
+    """Extract the holiday table of the NYSE hours page into one dict per holiday and year."""
+    # Imported here because BeautifulSoup is slow to load and only the refresh needs it
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Locate the holiday table using the provided class name
+    holiday_table = soup.find(
+        "table", {"class": "table-data w-full table-fixed table-border-rows"}
+    )
+    if not holiday_table:
+        raise ValueError("Holiday table not found on the page.")
+
+    # Extract header and rows
+    headers = holiday_table.find("thead").find_all("td")
+    years = [
+        header.get_text(strip=True) for header in headers[1:]
+    ]  # Skip the first header, which is "Holiday"
+
+    holidays = []
+    for row in holiday_table.find("tbody").find_all("tr"):
+        columns = row.find_all("td")
+        holiday_name = columns[0].get_text(strip=True)
+        dates = [col.get_text(strip=True) for col in columns[1:]]
+
+        for year, date_str in zip(years, dates):
+            date_parts = date_str.split(",")
+            month_day = (
+                date_parts[1].strip().split("*")[0].split("(")[0]
+            ).strip()  # Clean extra symbols like *, ()
+            month, day = month_day.split(" ")
+            date_time = datetime.strptime(f"{year} {month} {day.strip()}", "%Y %B %d")
+            holidays.append(
+                {
+                    "year": year,
+                    "holiday_name": holiday_name,
+                    "date": date_str,
+                    "date_time": date_time.strftime("%Y-%m-%d"),
+                }
+            )
+    return holidays
+
+
+class HolidayCalendar:
+    """
+    NYSE holidays served from memory and refreshed from nyse.com in the background.
+
+    :meth:`load` reads the last fetched calendar from ``cache_path`` or, when
+    there is none, the bundled ``nyse_holidays.json``. :meth:`refresh` fetches
+    and parses the NYSE page off the event loop. The result replaces the served
+    copy and is written to disk only when parsing succeeded, so a site outage
+    leaves the previous calendar in place.
+
+    Attributes:
+        cache_path (str): JSON file holding the last successful fetch
+        max_age (float): seconds after which a fetched calendar is refreshed
+    """
+
+    def __init__(self, cache_path, max_age=86400):
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self.holidays = []
+        self.fetched_at = None
+        self._body = b"[]"
+        self._etag = None
+
+    def load(self):
+        for path in (self.cache_path, BUNDLED_HOLIDAYS):
+            try:
+                with open(path) as f:
+                    cached = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.error(f"Ignoring unreadable holiday calendar {path}: {e}")
+                continue
+            if isinstance(cached, list):
+                # The bundled calendar is the bare list the endpoint returns
+                cached = {"fetched_at": None, "holidays": cached}
+            self._set(cached["holidays"], cached["fetched_at"])
+            logger.info(f"Loaded {len(self.holidays)} holidays from {path}")
+            return
+        logger.error("No holiday calendar available")
+
+    def is_stale(self):
+        return self.fetched_at is None or time.time() - self.fetched_at >= self.max_age
+
+    def get(self):
+        """Return ``(body, etag)`` for the current holiday list."""
+        return self._body, self._etag
+
+    async def refresh(self):
+        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+            response = await client.get(HOLIDAY_URL)
+            response.raise_for_status()
+        holidays = await asyncio.to_thread(parse_holidays, response.text)
+        if not holidays:
+            raise ValueError("Holiday table is empty")
+        self._set(holidays, time.time())
+        await asyncio.to_thread(self._save)
+        logger.info(f"Fetched {len(holidays)} holidays from {HOLIDAY_URL}")
+
+    def _set(self, holidays, fetched_at):
+        self.holidays = holidays
+        self.fetched_at = fetched_at
+        self._body = json.dumps(holidays).encode()
+        self._etag = f'"{hashlib.blake2b(self._body, digest_size=12).hexdigest()}"'
+
+    def _save(self):
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename so a crash never leaves a truncated cache behind
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": self.fetched_at, "holidays": self.holidays}, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+holiday_calendar = HolidayCalendar(
+    cache_path=os.getenv("HOLIDAY_CACHE_PATH", "nyse_holidays_cache.json"),
+    max_age=float(os.getenv("HOLIDAY_REFRESH_SECONDS", "86400")),
+)
+
+
+async def refresh_holidays_periodically(retry_interval=900):
+    while True:
+        if holiday_calendar.is_stale():
+            try:
+                await holiday_calendar.refresh()
+            except Exception as e:
+                logger.error(
+                    f"Error refreshing holidays, serving the cached calendar: {e}"
+                )
+                await asyncio.sleep(retry_interval)
+                continue
+        await asyncio.sleep(
+            max(holiday_calendar.fetched_at + holiday_calendar.max_age - time.time(), 1)
+        )
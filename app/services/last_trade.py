@@ -0,0 +1,97 @@
+from threading import Lock
+
+import numpy as np
+
+from app.services.symbols import grow, symbol_table
+
+SNAPSHOT_HEADERS = ["trackingID", "symbol", "price", "size", "volume"]
+
+
+class LastTradeStore:
+    """
+    Last trade and cumulative volume per symbol for one topic.
+
+    Columns are int64 arrays indexed by symbol ID, so a consumed batch is
+    folded in with a handful of vectorized operations and a snapshot of
+    thousands of symbols is a gather plus one ``tolist`` per column. A
+    ``trackingID`` of 0 marks a symbol without trades.
+
+    Volume counts the trades consumed since :meth:`start_day` switched to the
+    current trading day.
+    """
+
+    def __init__(self, capacity=1024):
+        self.lock = Lock()
+        self.day = None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.price = np.zeros(capacity, dtype=np.int64)
+        self.size = np.zeros(capacity, dtype=np.int64)
+        self.tracking_id = np.zeros(capacity, dtype=np.int64)
+        self.volume = np.zeros(capacity, dtype=np.int64)
+
+    def start_day(self, day):
+        """Forget the previous trading day's trades when ``day`` is a new one."""
+        with self.lock:
+            if day != self.day:
+                self.day = day
+                self._allocate(len(self.price))
+
+    def update(self, symbols, prices, sizes, tracking_ids, ids=None):
+        """
+        Fold one batch of trades, in feed order, into the store. ``ids`` are the symbols' IDs
+        when the decoder already assigned them.
+        """
+        if not symbols:
+            return
+        if ids is None:
+            ids = symbol_table.ids(symbols)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        with self.lock:
+            for name in ("price", "size", "tracking_id", "volume"):
+                setattr(self, name, grow(getattr(self, name), len(symbol_table)))
+            np.add.at(self.volume, ids, sizes)
+            # Later trades overwrite earlier ones; keep the last per symbol
+            unique, first_from_end = np.unique(ids[::-1], return_index=True)
+            last = len(ids) - 1 - first_from_end
+            self.price[unique] = np.asarray(prices, dtype=np.int64)[last]
+            self.size[unique] = sizes[last]
+            self.tracking_id[unique] = np.asarray(tracking_ids, dtype=np.int64)[last]
+
+    def snapshot(self, symbols=None):
+        """Rows for ``symbols`` (every traded symbol if None), leaving out those without trades."""
+        with self.lock:
+            if symbols is None:
+                ids = np.flatnonzero(self.tracking_id)
+            else:
+                ids = np.array(
+                    [
+                        symbol_id
+                        for symbol_id in map(symbol_table.find, symbols)
+                        if symbol_id is not None and symbol_id < len(self.tracking_id)
+                    ],
+                    dtype=np.int64,
+                )
+                ids = ids[self.tracking_id[ids] > 0]
+            names = symbol_table.names
+            return [
+                [tracking_id, names[symbol_id], price, size, volume]
+                for symbol_id, tracking_id, price, size, volume in zip(
+                    ids.tolist(),
+                    self.tracking_id[ids].tolist(),
+                    self.price[ids].tolist(),
+                    self.size[ids].tolist(),
+                    self.volume[ids].tolist(),
+                )
+            ]
+
+
+last_trades = {}
+
+
+def last_trade_store(topic):
+    store = last_trades.get(topic)
+    if store is None:
+        store = last_trades.setdefault(topic, LastTradeStore())
+    return store
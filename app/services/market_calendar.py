@@ -0,0 +1,167 @@
+import threading
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+
+import pytz
+
+from app.application_logger import get_logger
+from app.services.holiday_calendar import holiday_calendar
+
+logger = get_logger(__name__)
+
+eastern = pytz.timezone("America/New_York")
+
+CLOSED = "closed"
+PRE_MARKET = "pre_market"
+REGULAR = "regular"
+POST_MARKET = "post_market"
+
+# Nasdaq sessions in Eastern time: (state, start) in order, the last one ends the day
+FULL_DAY = [
+    (PRE_MARKET, time(4, 0)),
+    (REGULAR, time(9, 30)),
+    (POST_MARKET, time(16, 0)),
+    (CLOSED, time(20, 0)),
+]
+EARLY_CLOSE_DAY = [
+    (PRE_MARKET, time(4, 0)),
+    (REGULAR, time(9, 30)),
+    (POST_MARKET, time(13, 0)),
+    (CLOSED, time(17, 0)),
+]
+
+
+def early_close_days(first_day, last_day, holidays):
+    """The 1 PM closes NYSE applies by rule: the eves of Independence Day and Christmas
+    when they fall on a trading weekday, and the day after Thanksgiving."""
+    days = set()
+    for year in range(first_day.year, last_day.year + 1):
+        july_4 = date(year, 7, 4)
+        if july_4.weekday() < 5 and july_4.weekday() != 0:
+            days.add(date(year, 7, 3))
+        # Thanksgiving is the fourth Thursday of November
+        november_1 = date(year, 11, 1)
+        thanksgiving = november_1 + timedelta(days=(3 - november_1.weekday()) % 7 + 21)
+        days.add(thanksgiving + timedelta(days=1))
+        days.add(date(year, 12, 24))
+    return {
+        day
+        for day in days
+        if first_day <= day <= last_day and day.weekday() < 5 and day not in holidays
+    }
+
+
+class SessionCalendar:
+    """
+    Session transitions of every day from ``first_day`` to ``last_day``.
+
+    All transitions are kept in one ascending list of epoch seconds with the
+    state each one starts, plus the index of the first transition of every day.
+    A lookup jumps to the day's index and steps over at most four transitions,
+    so :meth:`state_at` and :meth:`next_transition` are O(1).
+
+    Attributes:
+        first_day (date): first Eastern calendar day covered
+        last_day (date): last Eastern calendar day covered
+    """
+
+    def __init__(self, holidays, first_day, last_day):
+        self.first_day = first_day
+        self.last_day = last_day
+        early_closes = early_close_days(first_day, last_day, holidays)
+
+        self._times = []
+        self._states = []
+        day = first_day
+        while day <= last_day:
+            if day.weekday() < 5 and day not in holidays:
+                sessions = EARLY_CLOSE_DAY if day in early_closes else FULL_DAY
+                for state, start in sessions:
+                    self._times.append(
+                        eastern.localize(datetime.combine(day, start)).timestamp()
+                    )
+                    self._states.append(state)
+            day += timedelta(days=1)
+
+        self._day_index = {}
+        day = first_day
+        while day <= last_day:
+            midnight = eastern.localize(datetime.combine(day, time())).timestamp()
+            self._day_index[day] = bisect_left(self._times, midnight)
+            day += timedelta(days=1)
+
+    def covers(self, timestamp):
+        return self.first_day <= self._day(timestamp) <= self.last_day
+
+    def state_at(self, timestamp):
+        """Session state at ``timestamp`` (epoch seconds)."""
+        index = self._next_index(timestamp)
+        return self._states[index - 1] if index > 0 else CLOSED
+
+    def is_open(self, timestamp):
+        """True from the start of pre-market to the end of post-market."""
+        return self.state_at(timestamp) != CLOSED
+
+    def next_transition(self, timestamp):
+        """``(epoch seconds, state)`` of the first transition after ``timestamp``, or None past the range."""
+        index = self._next_index(timestamp)
+        if index == len(self._times):
+            return None
+        return self._times[index], self._states[index]
+
+    def _day(self, timestamp):
+        return datetime.fromtimestamp(timestamp, eastern).date()
+
+    def _next_index(self, timestamp):
+        index = self._day_index[self._day(timestamp)]
+        while index < len(self._times) and self._times[index] <= timestamp:
+            index += 1
+        return index
+
+
+def session_days(first_day, last_day):
+    """Every day in [first_day, last_day] with a Nasdaq session."""
+    holidays = {
+        date.fromisoformat(holiday["date_time"])
+        for holiday in holiday_calendar.holidays
+    }
+    days = []
+    day = first_day
+    while day <= last_day:
+        if day.weekday() < 5 and day not in holidays:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+_calendar = None
+_calendar_etag = None
+_calendar_lock = threading.Lock()
+
+
+def session_calendar(now=None):
+    """
+    The calendar covering a year from yesterday, rebuilt when the holidays change
+    or the current day leaves the covered range.
+    """
+    global _calendar, _calendar_etag
+    now = now if now is not None else datetime.now(eastern).timestamp()
+    _, etag = holiday_calendar.get()
+    calendar = _calendar
+    if calendar is None or etag != _calendar_etag or not calendar.covers(now):
+        with _calendar_lock:
+            if _calendar is None or etag != _calendar_etag or not _calendar.covers(now):
+                today = datetime.fromtimestamp(now, eastern).date()
+                holidays = {
+                    date.fromisoformat(holiday["date_time"])
+                    for holiday in holiday_calendar.holidays
+                }
+                _calendar = SessionCalendar(
+                    holidays, today - timedelta(days=1), today + timedelta(days=366)
+                )
+                _calendar_etag = etag
+                logger.info(
+                    f"Built session calendar {_calendar.first_day} to {_calendar.last_day}"
+                )
+            calendar = _calendar
+    return calendar
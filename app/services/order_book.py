@@ -0,0 +1,265 @@
+import threading
+from bisect import bisect_left, insort
+
+# Cut-off key of a side with fewer levels than the depth: every level is in view
+NO_CUTOFF = float("-inf")
+
+
+class BookSide:
+    """
+    Price levels of one side of a book.
+
+    Levels are kept in a sorted list of keys plus dicts of aggregate quantity and
+    order count per key. Ask keys are negated prices, so on both sides the best
+    level is the last key and the inserts and deletes that cluster around the
+    touch only shift the tail of the list.
+
+    Keys of levels changed since the last :meth:`changes` are kept in ``dirty``,
+    and ``cutoff`` is the key of the worst level in view at that call.
+    """
+
+    __slots__ = ("is_bid", "keys", "quantities", "counts", "dirty", "cutoff")
+
+    def __init__(self, is_bid):
+        self.is_bid = is_bid
+        self.keys = []
+        self.quantities = {}
+        self.counts = {}
+        self.dirty = set()
+        self.cutoff = NO_CUTOFF
+
+    def key(self, price):
+        return price if self.is_bid else -price
+
+    def add(self, key, quantity):
+        self.dirty.add(key)
+        total = self.quantities.get(key)
+        if total is None:
+            insort(self.keys, key)
+            self.quantities[key] = quantity
+            self.counts[key] = 1
+        else:
+            self.quantities[key] = total + quantity
+            self.counts[key] += 1
+
+    def reduce(self, key, quantity, removes_order):
+        self.dirty.add(key)
+        total = self.quantities[key] - quantity
+        count = self.counts[key] - removes_order
+        if total <= 0 or count <= 0:
+            del self.quantities[key]
+            del self.counts[key]
+            del self.keys[bisect_left(self.keys, key)]
+        else:
+            self.quantities[key] = total
+            self.counts[key] = count
+
+    def top(self, depth):
+        """``[price, quantity, orders]`` of the best ``depth`` levels, best first."""
+        sign = 1 if self.is_bid else -1
+        return [
+            [key * sign, self.quantities[key], self.counts[key]]
+            for key in self.keys[: -depth - 1 : -1]
+        ]
+
+    def _level(self, key):
+        quantity = self.quantities.get(key)
+        if quantity is None:
+            return self._removed(key)
+        return [key if self.is_bid else -key, quantity, self.counts[key]]
+
+    def changes(self, depth):
+        """
+        ``{price: [price, quantity, orders]}`` of the levels of the top ``depth``
+        that changed since the last call, a level that left the view having
+        quantity 0.
+
+        Only dirty levels and the levels between the previous and the new
+        cut-off are looked at: the first are emitted when they are at or above
+        either cut-off, the others entered the view when a level above them was
+        removed or left it when one was inserted.
+        """
+        keys = self.keys
+        cutoff = keys[-depth] if len(keys) >= depth else NO_CUTOFF
+        previous = self.cutoff
+        dirty = self.dirty
+        changed = {}
+        for key in dirty:
+            if key >= cutoff or key >= previous:
+                level = self._level(key) if key >= cutoff else self._removed(key)
+                changed[level[0]] = level
+        if cutoff != previous:
+            entered = cutoff < previous
+            low, high = (cutoff, previous) if entered else (previous, cutoff)
+            for key in keys[bisect_left(keys, low) : bisect_left(keys, high)]:
+                if key not in dirty:
+                    level = self._level(key) if entered else self._removed(key)
+                    changed[level[0]] = level
+        dirty.clear()
+        self.cutoff = cutoff
+        return changed
+
+    def _removed(self, key):
+        return [key if self.is_bid else -key, 0, 0]
+
+    def departures(self):
+        """Removals of every level that may be in the published view, for a side being discarded."""
+        keys = set(self.keys[bisect_left(self.keys, self.cutoff) :])
+        keys.update(key for key in self.dirty if key >= self.cutoff)
+        return {level[0]: level for level in map(self._removed, keys)}
+
+
+class OrderBook:
+    __slots__ = ("symbol", "bids", "asks")
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = BookSide(True)
+        self.asks = BookSide(False)
+
+    def depth(self, depth):
+        return {"bids": self.bids.top(depth), "asks": self.asks.top(depth)}
+
+
+class OrderBookEngine:
+    """
+    Per-symbol price-level books rebuilt from TOTALVIEW order messages.
+
+    Live orders are indexed by order ID in one dict holding
+    ``[side, key, quantity, symbol]``, so executions, cancels, deletes and
+    replaces find their level in O(1); creating or removing a level is a binary
+    search in the side's sorted keys.
+
+    After each batch :meth:`apply_batch` returns, for every touched book, only
+    the levels of the top ``depth`` that changed, a level that left the view
+    having quantity 0. Each side tracks the levels the batch changed and where
+    its view was cut off, so the cost follows the number of changed levels
+    rather than the depth. Subscribers holding the snapshot of the same view
+    therefore stay exact by applying the deltas in ``seq`` order.
+
+    Attributes:
+        depth (int): levels per side in snapshots and deltas
+        seq (int): number of batches applied
+        unknown_orders (int): messages referring to orders never added, e.g.
+            when consumption started after those orders were placed
+    """
+
+    def __init__(self, depth=10):
+        self.depth = depth
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.books = {}
+        self.orders = {}
+        self.seq = 0
+        self.unknown_orders = 0
+        self._cleared = {}
+
+    def clear_books(self):
+        """Empty every book; the next batch publishes the removal of all levels."""
+        for symbol, book in self.books.items():
+            cleared = self._cleared.setdefault(symbol, {"bids": {}, "asks": {}})
+            cleared["bids"].update(book.bids.departures())
+            cleared["asks"].update(book.asks.departures())
+        self.books = {}
+        self.orders = {}
+
+    def _book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        return book
+
+    def apply_batch(self, messages):
+        """
+        Apply decoded TOTALVIEW messages and return ``(seq, deltas)``, with one
+        ``{"symbol", "bids", "asks"}`` delta per book whose top levels changed.
+        """
+        with self.lock:
+            touched = set()
+            for message in messages:
+                symbol = self.apply(message)
+                if symbol is not None:
+                    touched.add(symbol)
+            touched.update(self._cleared)
+            self.seq += 1
+            return self.seq, self._deltas(touched)
+
+    def apply(self, msg):
+        """Apply one message; returns the symbol whose book changed, if any."""
+        msg_type = msg["msgType"]
+        orders = self.orders
+        if msg_type == "A" or msg_type == "F":
+            book = self._book(msg["symbol"])
+            side = book.bids if msg["side"] == "B" else book.asks
+            key = side.key(msg["price"])
+            side.add(key, msg["quantity"])
+            orders[msg["orderId"]] = [side, key, msg["quantity"], book.symbol]
+            return book.symbol
+        if msg_type == "E" or msg_type == "C" or msg_type == "X":
+            order = orders.get(msg["orderId"])
+            if order is None:
+                self.unknown_orders += 1
+                return None
+            quantity = min(msg["quantity"], order[2])
+            order[2] -= quantity
+            if order[2] <= 0:
+                del orders[msg["orderId"]]
+            order[0].reduce(order[1], quantity, order[2] <= 0)
+            return order[3]
+        if msg_type == "D":
+            order = orders.pop(msg["orderId"], None)
+            if order is None:
+                self.unknown_orders += 1
+                return None
+            order[0].reduce(order[1], order[2], True)
+            return order[3]
+        if msg_type == "U":
+            order = orders.pop(msg["orderId"], None)
+            if order is None:
+                self.unknown_orders += 1
+                return None
+            side = order[0]
+            side.reduce(order[1], order[2], True)
+            # The replacement keeps the side and symbol of the original order
+            key = side.key(msg["price"])
+            side.add(key, msg["quantity"])
+            orders[msg["newOrderId"]] = [side, key, msg["quantity"], order[3]]
+            return order[3]
+        if msg_type == "S" and msg.get("event") == "O":
+            # Start of messages: a new trading day begins with empty books
+            self.clear_books()
+        return None
+
+    def _deltas(self, symbols):
+        deltas = []
+        for symbol in symbols:
+            book = self.books.get(symbol)
+            cleared = self._cleared.pop(symbol, None)
+            delta = {"symbol": symbol}
+            changed = False
+            for side in ("bids", "asks"):
+                levels = cleared[side] if cleared else {}
+                if book:
+                    levels.update(getattr(book, side).changes(self.depth))
+                delta[side] = list(levels.values())
+                changed = changed or bool(levels)
+            if changed:
+                deltas.append(delta)
+        return deltas
+
+    def snapshot(self, symbol):
+        """``(seq, view)`` of the top levels as of ``seq``; deltas after ``seq`` apply on top."""
+        with self.lock:
+            book = self.books.get(symbol)
+            view = book.depth(self.depth) if book else {"bids": [], "asks": []}
+            return self.seq, view
+
+    def depth_snapshot(self, symbol, depth):
+        """Current top ``depth`` levels of any depth, for REST callers."""
+        with self.lock:
+            book = self.books.get(symbol)
+            if book is None:
+                return None
+            return {"symbol": symbol, "seq": self.seq, **book.depth(depth)}
@@ -0,0 +1,181 @@
+from threading import Lock
+
+import numpy as np
+
+from app.services.symbols import grow, symbol_table
+
+# QBBO topics are QBBO-<tape>-<venue>; the tapes split the symbols, the venues quote them
+VENUES = ("CORE", "BSX", "PSX")
+QUOTE_HEADERS = [
+    "symbol",
+    "bidPrice",
+    "bidQuantity",
+    "askPrice",
+    "askQuantity",
+    "trackingID",
+]
+NO_ASK = np.iinfo(np.int64).max
+
+
+def topic_venue(topic):
+    return topic.rsplit("-", 1)[-1]
+
+
+class QuoteEngine:
+    """
+    Best bid and offer per symbol across the QBBO venues.
+
+    Each venue's latest quote lives in ``(venue, symbol ID)`` arrays, and the
+    consolidated quote in per-symbol arrays: the highest bid and lowest ask of
+    any venue, with the quantities of every venue at that price summed. A price
+    of 0 means the venue has no quote on that side.
+
+    :meth:`apply_batch` only keeps the last quote per symbol of a batch and
+    recomputes the consolidated quote for those symbols in one vectorized
+    pass. A venue's quotes come from one topic per tape, so each topic's
+    start of day only clears the symbols that topic has quoted. Symbols whose consolidated quote changed are marked dirty until the
+    next :meth:`drain`, so a publisher draining at a fixed interval sends each
+    changed symbol once however often it was quoted in between.
+    """
+
+    def __init__(self, venues=VENUES, capacity=1024):
+        self.venues = venues
+        self.lock = Lock()
+        venue_shape = (len(venues), capacity)
+        self.venue_bid = np.zeros(venue_shape, dtype=np.int64)
+        self.venue_bid_quantity = np.zeros(venue_shape, dtype=np.int64)
+        self.venue_ask = np.zeros(venue_shape, dtype=np.int64)
+        self.venue_ask_quantity = np.zeros(venue_shape, dtype=np.int64)
+        self.bid = np.zeros(capacity, dtype=np.int64)
+        self.bid_quantity = np.zeros(capacity, dtype=np.int64)
+        self.ask = np.zeros(capacity, dtype=np.int64)
+        self.ask_quantity = np.zeros(capacity, dtype=np.int64)
+        self.tracking_id = np.zeros(capacity, dtype=np.int64)
+        self.dirty = np.zeros(capacity, dtype=bool)
+        # Per topic, which symbol IDs it has quoted since its start of day
+        self.quoted = {}
+
+    def _reserve(self, size):
+        for name in (
+            "venue_bid",
+            "venue_bid_quantity",
+            "venue_ask",
+            "venue_ask_quantity",
+            "bid",
+            "bid_quantity",
+            "ask",
+            "ask_quantity",
+            "tracking_id",
+            "dirty",
+        ):
+            setattr(self, name, grow(getattr(self, name), size))
+        for topic, quoted in self.quoted.items():
+            self.quoted[topic] = grow(quoted, size)
+
+    def apply_batch(self, topic, messages):
+        """
+        Apply decoded QBBO messages from ``topic``; returns how many consolidated
+        quotes changed.
+        """
+        row = self.venues.index(topic_venue(topic))
+        clear = False
+        quotes = []
+        for msg in messages:
+            if "askPrice" in msg:
+                quotes.append(msg)
+            elif msg["msgType"] == "S" and msg.get("event") == "O":
+                # Start of messages: yesterday's quotes of this venue no longer stand
+                clear = True
+                quotes = []
+        ids = symbol_table.message_ids(quotes)
+        with self.lock:
+            self._reserve(len(symbol_table))
+            quoted = self.quoted.get(topic)
+            if quoted is None:
+                quoted = self.quoted[topic] = np.zeros(len(self.bid), dtype=bool)
+            if clear:
+                # The venue's other tapes quote other symbols; leave those be
+                cleared = np.flatnonzero(quoted)
+                for array in (
+                    self.venue_bid,
+                    self.venue_bid_quantity,
+                    self.venue_ask,
+                    self.venue_ask_quantity,
+                ):
+                    array[row, cleared] = 0
+                quoted[:] = False
+            # Only the last quote of each symbol in the batch matters
+            unique, first_from_end = np.unique(ids[::-1], return_index=True)
+            last = [quotes[index] for index in (len(ids) - 1 - first_from_end).tolist()]
+            for array, field in (
+                (self.venue_bid[row], "bidPrice"),
+                (self.venue_bid_quantity[row], "bidQuantity"),
+                (self.venue_ask[row], "askPrice"),
+                (self.venue_ask_quantity[row], "askQuantity"),
+                (self.tracking_id, "trackingID"),
+            ):
+                array[unique] = [msg[field] for msg in last]
+            quoted[unique] = True
+            if clear:
+                unique = np.union1d(unique, cleared)
+            return self._consolidate(unique)
+
+    def _consolidate(self, ids):
+        bids = self.venue_bid[:, ids]
+        bid = bids.max(axis=0)
+        bid_quantity = np.where(
+            (bids == bid) & (bid > 0), self.venue_bid_quantity[:, ids], 0
+        ).sum(axis=0)
+        asks = self.venue_ask[:, ids]
+        ask = np.where(asks > 0, asks, NO_ASK).min(axis=0)
+        ask_quantity = np.where(
+            (asks == ask) & (ask != NO_ASK), self.venue_ask_quantity[:, ids], 0
+        ).sum(axis=0)
+        ask[ask == NO_ASK] = 0
+        changed = (
+            (bid != self.bid[ids])
+            | (bid_quantity != self.bid_quantity[ids])
+            | (ask != self.ask[ids])
+            | (ask_quantity != self.ask_quantity[ids])
+        )
+        ids = ids[changed]
+        self.bid[ids] = bid[changed]
+        self.bid_quantity[ids] = bid_quantity[changed]
+        self.ask[ids] = ask[changed]
+        self.ask_quantity[ids] = ask_quantity[changed]
+        self.dirty[ids] = True
+        return len(ids)
+
+    def drain(self):
+        """``(ids, rows)`` of the symbols whose consolidated quote changed since the last call."""
+        with self.lock:
+            ids = np.flatnonzero(self.dirty)
+            self.dirty[ids] = False
+            return ids, self._rows(ids)
+
+    def snapshot(self, symbols):
+        """Rows of the consolidated quotes of ``symbols``; unquoted symbols are left out."""
+        ids = [symbol_table.find(symbol) for symbol in symbols]
+        with self.lock:
+            ids = np.array(
+                [i for i in ids if i is not None and i < len(self.bid)], dtype=np.int64
+            )
+            quoted = (self.bid[ids] > 0) | (self.ask[ids] > 0)
+            return self._rows(ids[quoted])
+
+    def _rows(self, ids):
+        names = symbol_table.names
+        return [
+            [names[symbol_id], *values]
+            for symbol_id, *values in zip(
+                ids.tolist(),
+                self.bid[ids].tolist(),
+                self.bid_quantity[ids].tolist(),
+                self.ask[ids].tolist(),
+                self.ask_quantity[ids].tolist(),
+                self.tracking_id[ids].tolist(),
+            )
+        ]
+
+
+quote_engine = QuoteEngine()
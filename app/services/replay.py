@@ -0,0 +1,289 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, time as day_start, timedelta
+
+import numpy as np
+import pytz
+
+from app.application_logger import get_logger
+from app.services.tick_archive import ArchiveDay
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+eastern = pytz.timezone("America/New_York")
+
+# Replays starting within this many seconds after an open feed's start share its consumer
+share_window_seconds = float(os.getenv("REPLAY_SHARE_WINDOW_SECONDS", "60"))
+max_replay_feeds = int(os.getenv("REPLAY_MAX_FEEDS", "4"))
+max_replay_sessions = int(os.getenv("REPLAY_MAX_SESSIONS", "20"))
+# How many batches a fast subscriber may read ahead of the slowest on its feed
+max_buffered_batches = int(os.getenv("REPLAY_MAX_BUFFERED_BATCHES", "50"))
+# Empty polls after which a feed is considered caught up with the live stream
+idle_polls = 3
+# Same columns as the live stream responses
+REPLAY_HEADERS = ["trackingID", "date", "msgType", "symbol", "price", "size"]
+
+
+def parse_start(value):
+    """Milliseconds since the epoch from epoch milliseconds or an ISO datetime, naive meaning Eastern."""
+    if value.isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = eastern.localize(moment)
+    return int(moment.timestamp() * 1000)
+
+
+def tracking_time(timestamp_ms):
+    """The trackingID, nanoseconds since Eastern midnight, of an epoch time."""
+    moment = datetime.fromtimestamp(timestamp_ms / 1000, eastern)
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return int((moment - midnight).total_seconds() * 10**9)
+
+
+def epoch_ns(day, tracking_ids):
+    """
+    Nanoseconds since the epoch of trackingIDs from ``day``; trackingIDs start
+    over every midnight, so only these compare across days.
+    """
+    midnight = eastern.localize(datetime.combine(day, day_start()))
+    return int(midnight.timestamp()) * 10**9 + np.asarray(tracking_ids, dtype=np.int64)
+
+
+def tracking_day(timestamp_ms, tracking_id):
+    """
+    Eastern day of a message from its Kafka timestamp. A message published
+    just after midnight may carry a trackingID from the day before.
+    """
+    day = datetime.fromtimestamp(timestamp_ms / 1000, eastern).date()
+    if tracking_id - tracking_time(timestamp_ms) > 12 * 3600 * 10**9:
+        day -= timedelta(days=1)
+    return day
+
+
+class ArchiveReplaySource:
+    """
+    Trades of one topic read from the tick archive, from a start time to the
+    newest archived trade.
+
+    Reads continue into the following archived days and pick up rows the live
+    listener appends to the current one, so the source runs up to the live
+    stream like a seeked consumer does. Only trades are archived, so only
+    trades are replayed.
+
+    Like every replay source, responses carry the epoch nanoseconds of their
+    rows under ``times``, which replays filter and pace on.
+    """
+
+    def __init__(self, archive, topic, start_ms, batch_rows=10000):
+        self.archive = archive
+        self.topic = topic
+        self.batch_rows = batch_rows
+        moment = datetime.fromtimestamp(start_ms / 1000, eastern)
+        self.day = moment.date()
+        # Empty when no session was archived that day; reads move on to the next one
+        archive_day = ArchiveDay(
+            os.path.join(archive.root, topic, self.day.isoformat())
+        )
+        self.position = int(
+            np.searchsorted(archive_day.column("trackingid"), tracking_time(start_ms))
+        )
+
+    def read(self, timeout=1):
+        """The next response batch, or None after ``timeout`` seconds without new trades."""
+        while True:
+            # Reopened each read to see the rows appended since
+            archive_day = ArchiveDay(
+                os.path.join(self.archive.root, self.topic, self.day.isoformat())
+            )
+            end = min(archive_day.rows, self.position + self.batch_rows)
+            if end > self.position:
+                rows = slice(self.position, end)
+                self.position = end
+                return self._response(archive_day, rows)
+            later = [day for day in self.archive.days(self.topic) if day > self.day]
+            if not later:
+                time.sleep(timeout)
+                return None
+            self.day = later[0]
+            self.position = 0
+
+    @staticmethod
+    def _response(archive_day, rows):
+        names = archive_day.symbols
+        return {
+            "headers": REPLAY_HEADERS,
+            "times": epoch_ns(archive_day.day, archive_day.column("trackingid")[rows]),
+            "data": [
+                [tracking_id, str(moment), chr(msg_type), names[symbol_id], price, size]
+                for tracking_id, moment, msg_type, symbol_id, price, size in zip(
+                    archive_day.column("trackingid")[rows].tolist(),
+                    archive_day.dates(rows).tolist(),
+                    archive_day.column("msgtype")[rows].tolist(),
+                    archive_day.column("symbol")[rows].tolist(),
+                    archive_day.column("price")[rows].tolist(),
+                    archive_day.column("size")[rows].tolist(),
+                )
+            ],
+        }
+
+    def close(self):
+        pass
+
+
+class ReplayFeed:
+    """
+    One replay source shared by the replays of a topic that start close together.
+
+    Batches are kept in order, with the epoch time they start at, and numbered
+    from the feed start. Each replay holds a cursor into them and reads at its
+    own pace; batches every cursor has passed are dropped, and a replay that
+    gets ``max_buffered_batches`` ahead of the slowest one waits for it, so a
+    feed holds a bounded window of the topic however far apart its replays'
+    speeds are.
+
+    Attributes:
+        topic (str): NCDS topic
+        start_ms (int): epoch milliseconds the source starts at
+        exhausted (bool): set once the feed has caught up with the live stream
+    """
+
+    def __init__(self, topic, start_ms, open_source):
+        self.topic = topic
+        self.start_ms = start_ms
+        self._open_source = open_source
+        self._source = None
+        # Reads run on worker threads; close must not overlap them
+        self._source_lock = threading.Lock()
+        self._closed = False
+        self._batches = []
+        self._offset = 0
+        self._cursors = {}
+        self._fetch_lock = asyncio.Lock()
+        self.exhausted = False
+
+    def can_share(self, topic, start_ms):
+        if topic != self.topic or self.exhausted:
+            return False
+        if not 0 <= start_ms - self.start_ms <= share_window_seconds * 1000:
+            return False
+        # The batches up to the new start must still be buffered
+        if self._offset == 0:
+            return True
+        return bool(self._batches) and self._batches[0][1] <= start_ms * 10**6
+
+    def join(self, session):
+        self._cursors[session] = self._offset
+
+    def leave(self, session):
+        if self._cursors.pop(session, None) is None:
+            return False
+        self._trim()
+        return True
+
+    @property
+    def idle(self):
+        return not self._cursors
+
+    async def next_batch(self, session):
+        """The session's next response batch, or None once the feed is exhausted."""
+        index = self._cursors[session]
+        while index - min(self._cursors.values()) >= max_buffered_batches:
+            await asyncio.sleep(0.05)
+        while index >= self._offset + len(self._batches):
+            if self.exhausted:
+                return None
+            async with self._fetch_lock:
+                if index >= self._offset + len(self._batches):
+                    await self._fetch()
+        self._cursors[session] = index + 1
+        batch = self._batches[index - self._offset][0]
+        self._trim()
+        return batch
+
+    def _read(self):
+        with self._source_lock:
+            if self._closed:
+                return None
+            if self._source is None:
+                self._source = self._open_source(self.topic, self.start_ms)
+            return self._source.read()
+
+    async def _fetch(self):
+        for _ in range(idle_polls):
+            response = await asyncio.to_thread(self._read)
+            if response:
+                self._batches.append((response, int(response["times"][0])))
+                return
+        self.exhausted = True
+
+    def _trim(self):
+        if not self._cursors:
+            return
+        passed = min(self._cursors.values()) - self._offset
+        if passed > 0:
+            del self._batches[:passed]
+            self._offset += passed
+
+    def close(self):
+        with self._source_lock:
+            self._closed = True
+            if self._source is None:
+                return
+            try:
+                self._source.close()
+            except Exception as e:
+                logger.error(f"Error closing replay source for {self.topic}: {e}")
+            self._source = None
+
+
+class ReplayRegistry:
+    """Open replay feeds, capped in number, with at most ``max_replay_sessions`` replays on them."""
+
+    def __init__(self, open_source):
+        self._open_source = open_source
+        self.feeds = []
+        self.sessions = 0
+
+    def acquire(self, session, topic, start_ms):
+        """The feed ``session`` should read, or None when replay capacity is used up."""
+        if self.sessions >= max_replay_sessions:
+            return None
+        feed = next(
+            (feed for feed in self.feeds if feed.can_share(topic, start_ms)), None
+        )
+        if feed is None:
+            if len(self.feeds) >= max_replay_feeds:
+                return None
+            feed = ReplayFeed(topic, start_ms, self._open_source)
+            self.feeds.append(feed)
+        feed.join(session)
+        self.sessions += 1
+        return feed
+
+    def release(self, session, feed):
+        """Give back the session's place; safe to call more than once."""
+        if not feed.leave(session):
+            return
+        self.sessions -= 1
+        if feed.idle:
+            self.feeds.remove(feed)
+            # Closing a consumer waits for librdkafka to leave the group; keep it off the loop
+            asyncio.get_running_loop().run_in_executor(None, feed.close)
+
+
+def pace_chunks(times, speed, tick_seconds=0.1):
+    """
+    Split a batch into ``(start, end, time)`` row ranges of ``tick_seconds`` of
+    replayed wall time each, ``times`` being the rows' epoch nanoseconds, so a
+    paced replay sends small frames on time instead of one large frame per
+    consumed batch.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if not len(times):
+        return []
+    ticks = (times - times[0]) // int(tick_seconds * speed * 10**9)
+    bounds = [0, *(np.flatnonzero(np.diff(ticks)) + 1).tolist(), len(times)]
+    return [(start, end, int(times[start])) for start, end in zip(bounds, bounds[1:])]
@@ -0,0 +1,151 @@
+import json
+import re
+
+import numpy as np
+
+from app.services.symbols import symbol_table
+
+MAX_FILTER_CLAUSES = 8
+CLAUSE = re.compile(r"^(price|size|msgType|symbol)(>=|<=|\^=|=|>|<)(.+)$")
+COMPARISONS = {
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    ">": np.greater,
+    "<": np.less,
+    "=": np.equal,
+}
+
+# Per prefix, whether each symbol ID starts with it; extended as the table grows
+_prefix_masks = {}
+
+
+def parse_filter(expression):
+    """
+    Parse a stream filter such as ``size>=10000,price<=1500000,msgType=T|U`` into
+    a hashable predicate, or None when ``expression`` is empty.
+
+    Clauses are comma-separated and must all hold. ``price`` and ``size``
+    compare with ``>=``, ``<=``, ``>``, ``<`` or ``=`` against integers in feed
+    units; ``msgType=A|B`` and ``symbol=A|B`` match one of the listed values;
+    ``symbol^=AB`` matches a prefix. Equal filters parse to equal predicates
+    whatever the clause order, which is what lets subscribers share them.
+
+    Raises:
+        ValueError: if a clause is malformed or there are too many
+    """
+    clauses = set()
+    for part in expression.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = CLAUSE.match(part)
+        if not match:
+            raise ValueError(f"Invalid filter clause: {part}")
+        field, op, value = match.groups()
+        if field in ("price", "size"):
+            if op not in COMPARISONS:
+                raise ValueError(f"Invalid operator for {field}: {op}")
+            value = int(value)
+        elif op == "=":
+            value = tuple(sorted(set(value.split("|"))))
+        elif not (field == "symbol" and op == "^="):
+            raise ValueError(f"Invalid operator for {field}: {op}")
+        clauses.add((field, op, value))
+    if len(clauses) > MAX_FILTER_CLAUSES:
+        raise ValueError(f"At most {MAX_FILTER_CLAUSES} filter clauses")
+    return tuple(sorted(clauses, key=repr)) or None
+
+
+def symbol_prefix_mask(prefix):
+    mask = _prefix_masks.get(prefix)
+    names = symbol_table.names
+    if mask is None or len(mask) < len(names):
+        start = 0 if mask is None else len(mask)
+        extension = np.fromiter(
+            (name.startswith(prefix) for name in names[start:]),
+            dtype=bool,
+            count=len(names) - start,
+        )
+        mask = extension if mask is None else np.concatenate([mask, extension])
+        if len(_prefix_masks) >= 1024:
+            _prefix_masks.clear()
+        _prefix_masks[prefix] = mask
+    return mask
+
+
+class FilterBatch:
+    """
+    One response batch as columns for filtering.
+
+    Columns and clause masks are built on first use and kept for the whole
+    batch, so a clause shared by many predicates, and a predicate shared by
+    many subscribers, is evaluated once per batch.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self._columns = {}
+        self._masks = {}
+
+    def column(self, name):
+        column = self._columns.get(name)
+        if column is None and name == "symbol":
+            # Live batches carry the IDs the decoder assigned
+            column = self._columns[name] = self.response.get("symbol_ids")
+        if column is None:
+            index = self.response["headers"].index(name)
+            values = [row[index] for row in self.response["data"]]
+            if name == "symbol":
+                column = symbol_table.ids(values)
+            elif name == "msgType":
+                column = np.array(values, dtype=str)
+            else:
+                # Messages without a price or size never match a comparison on it
+                column = np.array(
+                    [-1 if value is None else value for value in values],
+                    dtype=np.int64,
+                )
+            self._columns[name] = column
+        return column
+
+    def clause_mask(self, clause):
+        mask = self._masks.get(clause)
+        if mask is None:
+            field, op, value = clause
+            if field == "symbol" and op == "^=":
+                # Look the IDs up first so the prefix mask covers any new symbols
+                ids = self.column("symbol")
+                mask = symbol_prefix_mask(value)[ids]
+            elif field == "symbol":
+                wanted = [symbol_table.find(symbol) for symbol in value]
+                mask = np.isin(
+                    self.column("symbol"), [i for i in wanted if i is not None]
+                )
+            elif field == "msgType":
+                mask = np.isin(self.column("msgType"), value)
+            else:
+                mask = COMPARISONS[op](self.column(field), value)
+            self._masks[clause] = mask
+        return mask
+
+    def frame(self, symbol_ids, predicate):
+        """
+        ``(body, records)`` of the JSON frame for a subscriber to ``symbol_ids``
+        (all symbols if empty) with ``predicate`` (no filter if None).
+        """
+        data = self.response["data"]
+        if len(symbol_ids) or predicate:
+            mask = np.ones(len(data), dtype=bool)
+            if len(symbol_ids):
+                mask &= np.isin(self.column("symbol"), symbol_ids)
+            for clause in predicate or ():
+                mask &= self.clause_mask(clause)
+            data = [row for row, keep in zip(data, mask.tolist()) if keep]
+        if not data:
+            return None, 0
+        body = json.dumps(
+            {"headers": self.response["headers"], "data": data},
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return body, len(data)
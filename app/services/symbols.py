@@ -0,0 +1,91 @@
+import sys
+from threading import Lock
+
+import numpy as np
+
+# Messages that announce the day's symbols before any quote or trade
+DIRECTORY_SCHEMAS = ("SeqDirectoryMessage", "SeqSymbolDirectoryMessage")
+
+
+class SymbolTable:
+    """
+    Process-wide map of symbols to small dense integer IDs.
+
+    IDs are handed out in order of first sight and never reused, so engines can
+    keep per-symbol state in arrays indexed by ID and grow them to ``len(table)``.
+    Lookups of known symbols are a plain dict read; only new symbols take the
+    lock, which keeps concurrent ingest threads from assigning one ID twice.
+
+    Names are interned, as the SDK decoder interns the symbols it decodes, so
+    the table, the decoded messages and the frames share one string per symbol.
+    The live consumers hand :meth:`id` to the decoder, which then adds each
+    message's ID as ``symbolId``.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self.names = []
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, symbol):
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            with self._lock:
+                symbol_id = self._ids.get(symbol)
+                if symbol_id is None:
+                    symbol = sys.intern(symbol)
+                    symbol_id = len(self.names)
+                    self.names.append(symbol)
+                    self._ids[symbol] = symbol_id
+        return symbol_id
+
+    def ids(self, symbols):
+        """IDs of ``symbols`` as an int64 array, assigning new ones as needed."""
+        return np.fromiter(
+            (self.id(symbol) for symbol in symbols), dtype=np.int64, count=len(symbols)
+        )
+
+    def message_ids(self, messages):
+        """IDs of the symbols of decoded ``messages``, as assigned at decode time when they were."""
+        return np.fromiter(
+            (
+                msg["symbolId"] if "symbolId" in msg else self.id(msg["symbol"])
+                for msg in messages
+            ),
+            dtype=np.int64,
+            count=len(messages),
+        )
+
+    def seed(self, symbols):
+        for symbol in symbols:
+            self.id(symbol)
+
+    def seed_from_directory(self, messages):
+        """Assign IDs to the symbols announced by directory messages among decoded ``messages``."""
+        self.seed(
+            msg["symbol"]
+            for msg in messages
+            if msg.get("schema_name") in DIRECTORY_SCHEMAS and msg.get("symbol")
+        )
+
+    def find(self, symbol):
+        """ID of ``symbol``, or None if it was never seen."""
+        return self._ids.get(symbol)
+
+
+symbol_table = SymbolTable()
+
+
+def grow(array, size, fill=0):
+    """``array`` with its last axis extended to at least ``size``, doubling to amortize copies."""
+    capacity = array.shape[-1]
+    if size <= capacity:
+        return array
+    grown = np.full(
+        array.shape[:-1] + (max(size, capacity * 2),), fill, dtype=array.dtype
+    )
+    grown[..., :capacity] = array
+    return grown
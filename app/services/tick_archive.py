@@ -0,0 +1,340 @@
+import os
+from datetime import date, datetime, timedelta
+from threading import Lock
+
+import numpy as np
+import pytz
+
+from app.application_logger import get_logger
+from app.services.market_calendar import FULL_DAY, session_days
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+# One append-only file per column and trading day: <root>/<topic>/<YYYY-MM-DD>/<column>.bin
+ARCHIVE_COLUMNS = {
+    "trackingid": np.int64,
+    "price": np.int64,
+    "size": np.int64,
+    "symbol": np.int32,
+    "msgtype": np.uint8,
+}
+SYMBOLS_FILE = "symbols.txt"
+# Written when a day is sealed: row numbers grouped by symbol, and where each symbol's group starts
+INDEX_ORDER_FILE = "index_order.bin"
+INDEX_OFFSETS_FILE = "index_offsets.bin"
+# Markers: trades may be missing from the day / the day was sealed at the end of its session
+GAP_FILE = "gap"
+COMPLETE_FILE = "complete"
+
+archive_root = os.getenv("TICK_ARCHIVE_DIR", "tick_archive")
+eastern = pytz.timezone("America/New_York")
+
+
+def _map(path, dtype, count=None):
+    """Read-only memory map of a column file, empty when the file is."""
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    length = size // np.dtype(dtype).itemsize if count is None else count
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+
+class TickArchiveWriter:
+    """
+    Appends one topic's trades to the current trading day's column files.
+
+    Each batch adds a block to every column with ``ndarray.tofile``, so
+    writing costs a few appends per consumed batch. Symbols are coded with IDs
+    private to the day, listed in ``symbols.txt`` in ID order, which keeps the
+    files readable by any process whatever its own symbol table holds.
+
+    Rows at or before the last archived ``trackingID`` are skipped, so batches
+    consumed again after a restart from committed offsets are not archived
+    twice. A day is sealed, which writes its per-symbol row index, when the
+    writer moves to the next day or is closed at the end of the session.
+
+    A day is marked complete only when it is closed at the end of its session
+    and every consumer that fed it started at the session open or resumed from
+    committed offsets; any other start marks the day as having a gap.
+    """
+
+    def __init__(self, root, topic):
+        self.root = root
+        self.topic = topic
+        self.day = None
+        self._files = {}
+        self._symbol_ids = {}
+        self._symbols_file = None
+        self._last_tracking_id = -1
+
+    def start_session(self, day, continuous):
+        """
+        Called when a consumer starts feeding ``day``; ``continuous`` when it
+        starts at the session open or resumes from committed offsets.
+        """
+        if day != self.day:
+            self.close()
+            self._open(day)
+        if not continuous:
+            open(os.path.join(self._path, GAP_FILE), "a").close()
+
+    def append(self, day, tracking_ids, msg_types, symbols, prices, sizes):
+        if day != self.day:
+            self.start_session(day, continuous=False)
+        tracking_ids = np.asarray(tracking_ids, dtype=np.int64)
+        new = tracking_ids > self._last_tracking_id
+        if not new.any():
+            return
+        if not new.all():
+            keep = new.tolist()
+            msg_types, symbols, prices, sizes = (
+                [value for value, wanted in zip(column, keep) if wanted]
+                for column in (msg_types, symbols, prices, sizes)
+            )
+            tracking_ids = tracking_ids[new]
+        columns = {
+            "trackingid": tracking_ids,
+            "price": prices,
+            "size": sizes,
+            "symbol": [self._symbol_id(symbol) for symbol in symbols],
+            "msgtype": [ord(msg_type[:1] or " ") for msg_type in msg_types],
+        }
+        self._symbols_file.flush()
+        for name, dtype in ARCHIVE_COLUMNS.items():
+            np.asarray(columns[name], dtype=dtype).tofile(self._files[name])
+            self._files[name].flush()
+        self._last_tracking_id = int(tracking_ids.max())
+
+    def _symbol_id(self, symbol):
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids[symbol] = len(self._symbol_ids)
+            self._symbols_file.write(symbol + "\n")
+        return symbol_id
+
+    def _open(self, day):
+        path = self._path = os.path.join(self.root, self.topic, day.isoformat())
+        os.makedirs(path, exist_ok=True)
+        self.day = day
+        symbols_path = os.path.join(path, SYMBOLS_FILE)
+        if os.path.exists(symbols_path):
+            with open(symbols_path) as f:
+                self._symbol_ids = {
+                    line.rstrip("\n"): index for index, line in enumerate(f)
+                }
+        else:
+            self._symbol_ids = {}
+        tracking_ids = _map(os.path.join(path, "trackingid.bin"), np.int64)
+        self._last_tracking_id = int(tracking_ids[-1]) if len(tracking_ids) else -1
+        del tracking_ids
+        # Appending invalidates an index and completeness written by an earlier close
+        for name in (INDEX_ORDER_FILE, INDEX_OFFSETS_FILE, COMPLETE_FILE):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+        self._symbols_file = open(symbols_path, "a")
+        self._files = {
+            name: open(os.path.join(path, f"{name}.bin"), "ab")
+            for name in ARCHIVE_COLUMNS
+        }
+
+    def close(self, session_ended=False):
+        """
+        Close the current day's files and seal it; ``session_ended`` when the
+        day's session is over, which marks it complete unless it has a gap.
+        """
+        if self.day is None:
+            return
+        for f in self._files.values():
+            f.close()
+        self._symbols_file.close()
+        self._files = {}
+        try:
+            seal_day(self._path)
+            if session_ended and not os.path.exists(os.path.join(self._path, GAP_FILE)):
+                open(os.path.join(self._path, COMPLETE_FILE), "a").close()
+        except Exception as e:
+            logger.error(f"Error sealing tick archive of {self.topic} {self.day}: {e}")
+        self.day = None
+
+
+def seal_day(path):
+    """Write the per-symbol row index of a day directory."""
+    day = ArchiveDay(path)
+    symbols = day.column("symbol")
+    with open(os.path.join(path, SYMBOLS_FILE)) as f:
+        symbol_count = sum(1 for _ in f)
+    # Stable, so each symbol's rows stay in feed order
+    order = np.argsort(symbols, kind="stable").astype(np.int64)
+    counts = np.bincount(symbols, minlength=symbol_count)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    order.tofile(os.path.join(path, INDEX_ORDER_FILE))
+    offsets.tofile(os.path.join(path, INDEX_OFFSETS_FILE))
+
+
+class ArchiveDay:
+    """
+    Read-only view of one archived topic and day.
+
+    Columns are memory maps cut to the rows present in every column, so a
+    reader never sees a half-appended batch. Time ranges are located by binary
+    search on ``trackingid`` and come back as views without copying; a
+    symbol's rows come from the sealed index when there is one and from a
+    scan of the symbol column otherwise.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.day = date.fromisoformat(os.path.basename(path))
+        self.rows = min(
+            (
+                os.path.getsize(os.path.join(path, f"{name}.bin"))
+                // np.dtype(dtype).itemsize
+                if os.path.exists(os.path.join(path, f"{name}.bin"))
+                else 0
+            )
+            for name, dtype in ARCHIVE_COLUMNS.items()
+        )
+        self._columns = {}
+        self._symbols = None
+
+    def column(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = _map(
+                os.path.join(self.path, f"{name}.bin"), ARCHIVE_COLUMNS[name], self.rows
+            )
+        return column
+
+    @property
+    def symbols(self):
+        if self._symbols is None:
+            with open(os.path.join(self.path, SYMBOLS_FILE)) as f:
+                self._symbols = [line.rstrip("\n") for line in f]
+        return self._symbols
+
+    def select(self, symbol=None, start_tracking_id=0, msg_types=None):
+        """
+        Row numbers, as a slice or an index array, of the trades of ``symbol``
+        (every symbol if None) from ``start_tracking_id`` on whose message type
+        is in ``msg_types`` (any if None).
+        """
+        tracking_ids = self.column("trackingid")
+        first = int(np.searchsorted(tracking_ids, start_tracking_id))
+        if symbol is None:
+            rows = slice(first, self.rows)
+        else:
+            try:
+                symbol_id = self.symbols.index(symbol)
+            except ValueError:
+                return np.empty(0, dtype=np.int64)
+            order_path = os.path.join(self.path, INDEX_ORDER_FILE)
+            offsets = _map(os.path.join(self.path, INDEX_OFFSETS_FILE), np.int64)
+            if symbol_id + 1 < len(offsets) and offsets[-1] == self.rows:
+                order = _map(order_path, np.int64)
+                rows = np.asarray(order[offsets[symbol_id] : offsets[symbol_id + 1]])
+                rows = rows[rows >= first]
+            else:
+                rows = first + np.flatnonzero(
+                    self.column("symbol")[first:] == symbol_id
+                )
+        if msg_types is not None:
+            codes = [ord(msg_type) for msg_type in msg_types]
+            if isinstance(rows, slice):
+                rows = first + np.flatnonzero(
+                    np.isin(self.column("msgtype")[rows], codes)
+                )
+            else:
+                rows = rows[np.isin(self.column("msgtype")[rows], codes)]
+        return rows
+
+    def dates(self, rows):
+        """Wall-clock datetimes of ``rows``; trackingIDs count nanoseconds from midnight."""
+        midnight = np.datetime64(self.day.isoformat(), "us")
+        return midnight + self.column("trackingid")[rows] // 1000
+
+
+class TickArchive:
+    """The archive under ``root``: a writer per topic and readers per day."""
+
+    def __init__(self, root):
+        self.root = root
+        self._writers = {}
+        self._lock = Lock()
+
+    def writer(self, topic):
+        with self._lock:
+            writer = self._writers.get(topic)
+            if writer is None:
+                writer = self._writers[topic] = TickArchiveWriter(self.root, topic)
+            return writer
+
+    def days(self, topic):
+        path = os.path.join(self.root, topic)
+        if not os.path.isdir(path):
+            return []
+        return sorted(date.fromisoformat(name) for name in os.listdir(path))
+
+    def day(self, topic, day):
+        path = os.path.join(self.root, topic, day.isoformat())
+        return ArchiveDay(path) if os.path.isdir(path) else None
+
+    def covers(self, topics, day, now=None):
+        """
+        Whether every one of ``topics`` has every trade from ``day`` to now.
+        Each session day since ``day`` must be marked complete, except a
+        session in progress, which must be being archived without a gap.
+        """
+        now = now or datetime.now(eastern)
+        today = now.date()
+        for topic in topics:
+            if not self.days(topic):
+                return False
+            for session_day in session_days(day, today):
+                path = os.path.join(self.root, topic, session_day.isoformat())
+                if os.path.exists(os.path.join(path, COMPLETE_FILE)):
+                    continue
+                if session_day != today:
+                    return False
+                if now.time() < FULL_DAY[0][1]:
+                    # Today's session has not started yet
+                    continue
+                writer = self._writers.get(topic)
+                if (
+                    writer is None
+                    or writer.day != today
+                    or os.path.exists(os.path.join(path, GAP_FILE))
+                ):
+                    return False
+        return True
+
+    def trades_since(self, topics, start, symbol=None, msg_types=("T", "h")):
+        """
+        ``{"date", "symbol", "size"}`` rows of the trades from ``start`` (a naive
+        Eastern datetime) on, across ``topics``, day by day.
+        """
+        records = []
+        for topic in topics:
+            for day in self.days(topic):
+                if day < start.date():
+                    continue
+                archive_day = self.day(topic, day)
+                start_tracking_id = 0
+                if day == start.date():
+                    since_midnight = start - datetime.combine(day, datetime.min.time())
+                    start_tracking_id = (
+                        since_midnight // timedelta(microseconds=1) * 1000
+                    )
+                rows = archive_day.select(symbol, start_tracking_id, msg_types)
+                names = archive_day.symbols
+                records.extend(
+                    {"date": moment, "symbol": names[symbol_id], "size": size}
+                    for moment, symbol_id, size in zip(
+                        archive_day.dates(rows).tolist(),
+                        archive_day.column("symbol")[rows].tolist(),
+                        archive_day.column("size")[rows].tolist(),
+                    )
+                )
+        return records
+
+
+tick_archive = TickArchive(archive_root)
@@ -0,0 +1,306 @@
+import asyncio
+import queue
+import time
+from datetime import datetime, timedelta
+from threading import Lock, Thread
+
+import asyncpg
+import pytz
+
+from app.application_logger import get_logger
+from app.metrics import TICK_SINK_REWINDS
+from app.models.database import db_params
+from app.models.stock_data import STOCK_DATA_TABLE, ensure_stock_data_partitions
+
+logger = get_logger(__name__, rate_limit=(10, 60))
+
+TICK_COLUMNS = ["trackingid", "date", "msgtype", "symbol", "price", "size"]
+
+eastern = pytz.timezone("America/New_York")
+
+
+def market_midnight():
+    """Naive midnight of the current trading day; trackingIDs count nanoseconds from it."""
+    now = datetime.now(eastern)
+    return datetime.combine(now.date(), datetime.min.time())
+
+
+class TickSink:
+    """
+    Persists decoded trades from one Kafka topic into ``stock_data_partitioned``.
+
+    The listener thread hands every consumed batch to :meth:`add`. Trades are
+    buffered and shipped as binary COPY batches by a dedicated writer thread once
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed.
+    Offsets become committable only once the batch that contains them is in
+    Postgres, so an uncommitted tick is consumed again after a restart.
+
+    At most ``max_pending_batches`` batches wait for the writer. When the
+    queue is full :meth:`throttle` pauses the consumer until it drains, rather
+    than dropping rows. A batch that still fails after ``max_attempts`` writes
+    is discarded along with the batches queued after it, and :meth:`throttle`
+    seeks the consumer back to the last committed offsets to consume them
+    again; :meth:`add` keeps such redelivered messages from the live streams.
+
+    Attributes:
+        topic (str): the NCDS stream name, e.g. ``NLSUTP``
+        batch_size (int): row count that triggers a flush
+        flush_interval (float): maximum age of a buffered row in seconds
+        max_pending_batches (int): bound of the writer queue
+        max_attempts (int): writes of one batch before the sink rewinds
+    """
+
+    def __init__(
+        self,
+        topic,
+        batch_size=5000,
+        flush_interval=1.0,
+        max_pending_batches=8,
+        max_attempts=5,
+    ):
+        self.topic = topic
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.pending = queue.Queue(maxsize=max_pending_batches)
+
+        self._rows = []
+        self._offsets = {}
+        self._oldest_row_at = None
+        # A flushed batch waiting for room in the queue
+        self._held = None
+        self._paused = []
+        # Highest offset handed to the listener per partition, to spot redeliveries
+        self._delivered = {}
+        self._committable = {}
+        self._lock = Lock()
+        # Batches are tagged with the generation they were consumed in; a
+        # failed write discards its generation and the listener starts the next
+        self._generation = 0
+        self._failed_generation = -1
+        self._midnight = market_midnight()
+        self._thread = Thread(target=self._run, name=f"tick-sink-{topic}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Tick sink started for topic {self.topic}")
+        return self
+
+    def add(self, messages):
+        """
+        Buffer the trades of a consumed batch and remember the batch offsets.
+
+        Returns:
+            list: the messages the listener has not been handed before; after a
+            rewind the ones consumed again are only persisted
+        """
+        midnight = self._midnight
+        rows = self._rows
+        delivered = self._delivered
+        fresh = []
+        for message in messages:
+            key = (message.topic(), message.partition())
+            offset = message.offset()
+            self._offsets[key] = offset
+            if offset > delivered.get(key, -1):
+                delivered[key] = offset
+                fresh.append(message)
+            msg = message.value()
+            if "price" not in msg or "size" not in msg:
+                continue
+            tracking_id = int(msg["trackingID"])
+            rows.append(
+                (
+                    tracking_id,
+                    midnight + timedelta(microseconds=tracking_id // 1000),
+                    msg["msgType"],
+                    msg["symbol"],
+                    int(msg["price"]),
+                    int(msg["size"]),
+                )
+            )
+        if self._oldest_row_at is None and self._offsets:
+            self._oldest_row_at = time.monotonic()
+        self.flush_if_due()
+        return fresh
+
+    def flush_if_due(self):
+        """Hand the buffer to the writer when it is full or old enough."""
+        if self._oldest_row_at is None:
+            return
+        if (
+            len(self._rows) >= self.batch_size
+            or time.monotonic() - self._oldest_row_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self, wait=False):
+        """
+        Hand the buffer to the writer. Without ``wait`` a batch that finds the
+        queue full is held until :meth:`throttle` finds room, and the buffer
+        keeps growing meanwhile; with ``wait`` block until every queued batch
+        is written or discarded, so a following :meth:`commit` covers them.
+        """
+        if self._held is not None:
+            if wait:
+                self.pending.put(self._held)
+            else:
+                try:
+                    self.pending.put_nowait(self._held)
+                except queue.Full:
+                    return
+            self._held = None
+        if self._offsets:
+            batch = (self._generation, self._rows, self._offsets)
+            self._rows = []
+            self._offsets = {}
+            self._oldest_row_at = None
+            self._midnight = market_midnight()
+            if wait:
+                self.pending.put(batch)
+            else:
+                try:
+                    self.pending.put_nowait(batch)
+                except queue.Full:
+                    self._held = batch
+        if wait:
+            self.pending.join()
+
+    def throttle(self, consumer):
+        """
+        Called by the listener after every consume: pause ``consumer`` while a
+        batch is held back by a full queue, resume it once the batch is queued,
+        and rewind it after a write failed for good.
+        """
+        if self._failed_generation == self._generation:
+            self._rewind(consumer)
+            return
+        if self._held is not None:
+            self.flush()
+        if self._held is not None and not self._paused:
+            self._paused = consumer.assignment()
+            consumer.pause(self._paused)
+            logger.warning(
+                f"Tick sink for {self.topic} is behind; pausing the consumer"
+            )
+        elif self._held is None and self._paused:
+            self._resume(consumer)
+            logger.info(f"Tick sink for {self.topic} caught up; resuming the consumer")
+
+    def _resume(self, consumer):
+        consumer.resume(self._paused)
+        self._paused = []
+
+    def _rewind(self, consumer):
+        # The failed batch and everything consumed after it is consumed again
+        self._generation += 1
+        self._rows = []
+        self._offsets = {}
+        self._oldest_row_at = None
+        self._held = None
+        if self._paused:
+            self._resume(consumer)
+        self.commit(consumer)
+        TICK_SINK_REWINDS.labels(self.topic).inc()
+        if not seek_to_committed(consumer, self.topic):
+            logger.error(
+                f"No committed offsets to rewind {self.topic} to; unwritten ticks are lost"
+            )
+
+    def commit(self, consumer):
+        """Commit the offsets of every batch the writer has made durable."""
+        with self._lock:
+            committable = self._committable
+            self._committable = {}
+        if not committable:
+            return
+        # Only needed once the live feed is consuming; keeps confluent_kafka off the boot path
+        from confluent_kafka import TopicPartition
+
+        offsets = [
+            TopicPartition(topic, partition, offset + 1)
+            for (topic, partition), offset in committable.items()
+        ]
+        try:
+            consumer.commit(offsets=offsets, asynchronous=False)
+        except Exception as e:
+            logger.error(f"Error committing offsets for {self.topic}: {e}")
+            with self._lock:
+                for key, offset in committable.items():
+                    self._committable[key] = max(offset, self._committable.get(key, -1))
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._write_batches())
+        finally:
+            loop.close()
+
+    async def _write_batches(self):
+        conn = None
+        partitioned_days = set()
+        while True:
+            # Blocking is fine: this loop runs nothing but the writer
+            generation, rows, offsets = self.pending.get()
+            if generation <= self._failed_generation:
+                # Queued behind a failed batch; consumed again after the rewind
+                self.pending.task_done()
+                continue
+            retry_delay = 0.5
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    if conn is None or conn.is_closed():
+                        conn = await asyncpg.connect(**db_params)
+                    if rows:
+                        days = {row[1].date() for row in rows} - partitioned_days
+                        if days:
+                            # Create tomorrow's partition ahead of the overnight roll
+                            await ensure_stock_data_partitions(
+                                conn, min(days), max(days) + timedelta(days=1)
+                            )
+                            partitioned_days.update(days)
+                        async with conn.transaction():
+                            await conn.copy_records_to_table(
+                                STOCK_DATA_TABLE, records=rows, columns=TICK_COLUMNS
+                            )
+                    with self._lock:
+                        self._committable.update(offsets)
+                    break
+                except Exception as e:
+                    logger.error(
+                        f"Error writing {len(rows)} ticks for {self.topic} "
+                        f"(attempt {attempt} of {self.max_attempts}): {e}"
+                    )
+                    if conn is not None and not conn.is_closed():
+                        await conn.close()
+                    conn = None
+                    if attempt < self.max_attempts:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay = min(retry_delay * 2, 30)
+            else:
+                logger.error(
+                    f"Giving up writing {len(rows)} ticks for {self.topic}; "
+                    "rewinding to the last committed offsets"
+                )
+                self._failed_generation = generation
+            self.pending.task_done()
+
+
+def seek_to_committed(consumer, topic, timeout=10):
+    """
+    Resume a freshly created consumer from the offsets the sink last committed.
+
+    Returns:
+        bool: whether any partition had a committed offset to resume from
+    """
+    resumed = False
+    partitions = consumer.committed(consumer.assignment(), timeout=timeout)
+    for partition in partitions:
+        if partition.offset >= 0:
+            consumer.seek(partition)
+            resumed = True
+            logger.info(
+                f"Resuming {topic} partition {partition.partition} at committed offset {partition.offset}"
+            )
+    return resumed
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import Counter, deque
+from threading import Lock
+
+from app.application_logger import get_logger
+from app.models.database import get_pool
+from app.models.nasdaq import fetch_all_tickers
+
+logger = get_logger(__name__)
+
+SYMBOL_COUNT_VIEW = "mv_stock_data_symbol_count"
+VIEW_REFRESH_TABLE = "materialized_view_refresh"
+# Arbitrary key shared by all workers so only one of them refreshes the view at a time
+REFRESH_LOCK_KEY = 0x6D765F73796D
+# Message types the view counts
+COUNTED_MSG_TYPES = ("T", "h")
+
+
+class TickerCache:
+    """
+    In-process copy of ``mv_stock_data_symbol_count`` served to the symbol picker.
+
+    The view is loaded once and reloaded after ``ttl`` seconds. In between, the
+    Kafka listener threads report every persisted trade through :meth:`observe`
+    and the counts are folded into the served list at most every
+    ``publish_interval`` seconds, so the JSON body and its ETag stay stable long
+    enough for ``If-None-Match`` revalidation to pay off.
+
+    Observed counts stay on top of the view until any worker refreshes it.
+    Running totals of the observed counts are snapshotted with the database
+    time, and once the view is seen to have been refreshed at some time, the
+    latest snapshot taken before then is what it includes; only the counts
+    observed since are added on top of it.
+
+    Attributes:
+        ttl (float): seconds before the view is read again
+        publish_interval (float): minimum seconds between two published versions
+    """
+
+    def __init__(self, ttl=900, publish_interval=5, max_snapshots=64):
+        self.ttl = ttl
+        self.publish_interval = publish_interval
+        self._rows = []
+        self._index = {}
+        self._body = b"[]"
+        self._etag = None
+        self._loaded_at = 0.0
+        self._published_at = 0.0
+        self._pending = Counter()
+        # Every count observed, and the part of it the view includes
+        self._observed = Counter()
+        self._in_view = Counter()
+        self._snapshots = deque(maxlen=max_snapshots)
+        self._view_refreshed_at = None
+        self._pending_lock = Lock()
+        self._load_lock = asyncio.Lock()
+
+    def observe(self, symbols):
+        """Count trades seen on the live stream; safe to call from any thread."""
+        symbols = list(symbols)
+        with self._pending_lock:
+            self._pending.update(symbols)
+            self._observed.update(symbols)
+
+    def snapshot(self, at):
+        """Remember the counts observed up to ``at``, a database timestamp."""
+        with self._pending_lock:
+            self._snapshots.append((at, Counter(self._observed)))
+
+    def view_refreshed(self, at):
+        """
+        The view was last refreshed as of ``at``; returns whether that is newer
+        than what this process knew, in which case it should be reloaded.
+        """
+        if at is None or (
+            self._view_refreshed_at is not None and at <= self._view_refreshed_at
+        ):
+            return False
+        self._view_refreshed_at = at
+        with self._pending_lock:
+            while self._snapshots and self._snapshots[0][0] <= at:
+                self._in_view = self._snapshots.popleft()[1]
+        return True
+
+    async def get(self):
+        """Return ``(body, etag)`` for the current ticker list."""
+        now = time.monotonic()
+        if self._etag is None or now - self._loaded_at >= self.ttl:
+            await self.reload()
+        elif now - self._published_at >= self.publish_interval:
+            self._publish_pending()
+        return self._body, self._etag
+
+    async def reload(self):
+        async with self._load_lock:
+            records = await fetch_all_tickers()
+            with self._pending_lock:
+                # The rebuilt rows carry every count the view is missing
+                self._pending = self._observed - self._in_view
+            self._rows = [dict(record) for record in records]
+            self._index = {row["symbol"]: row for row in self._rows}
+            self._loaded_at = time.monotonic()
+            self._publish_pending()
+            self._render()
+
+    def _publish_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            self._published_at = time.monotonic()
+            return
+        for symbol, count in pending.items():
+            row = self._index.get(symbol)
+            if row is None:
+                row = {"symbol": symbol, "count": 0}
+                self._rows.append(row)
+                self._index[symbol] = row
+            row["count"] = row.get("count", 0) + count
+        self._render()
+
+    def _render(self):
+        self._body = json.dumps(self._rows, default=str).encode()
+        self._etag = f'"{hashlib.blake2b(self._body, digest_size=12).hexdigest()}"'
+        self._published_at = time.monotonic()
+
+
+ticker_cache = TickerCache(
+    ttl=float(os.getenv("TICKER_CACHE_TTL_SECONDS", "900")),
+    publish_interval=float(os.getenv("TICKER_CACHE_PUBLISH_SECONDS", "5")),
+)
+
+
+async def refresh_symbol_count_view():
+    """
+    Refresh the materialized view concurrently unless another worker is already
+    doing it, and record when the refresh started for the other workers.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", REFRESH_LOCK_KEY):
+            return False
+        try:
+            # The refresh sees every trade committed before it starts
+            started_at = await conn.fetchval("SELECT clock_timestamp()")
+            ticker_cache.snapshot(started_at)
+            started = time.monotonic()
+            await conn.execute(
+                f"REFRESH MATERIALIZED VIEW CONCURRENTLY {SYMBOL_COUNT_VIEW}"
+            )
+            await conn.execute(
+                f"""
+                INSERT INTO {VIEW_REFRESH_TABLE} (view_name, refreshed_at)
+                VALUES ($1, $2)
+                ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+                """,
+                SYMBOL_COUNT_VIEW,
+                started_at,
+            )
+            logger.info(
+                f"Refreshed {SYMBOL_COUNT_VIEW} in {time.monotonic() - started:.2f}s"
+            )
+            return True
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", REFRESH_LOCK_KEY)
+
+
+async def symbol_count_view_refreshed_at():
+    """``(refreshed_at, now)``: when any worker last refreshed the view, by the database clock."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            f"""
+            SELECT (SELECT refreshed_at FROM {VIEW_REFRESH_TABLE} WHERE view_name = $1),
+                   clock_timestamp()
+            """,
+            SYMBOL_COUNT_VIEW,
+        )
+    return row[0], row[1]
+
+
+async def refresh_tickers_periodically(interval, check_interval=30):
+    """
+    Refresh the view every ``interval`` seconds, and every ``check_interval``
+    seconds snapshot the observed counts and reload once any worker refreshed it.
+    """
+    last_refresh = time.monotonic()
+    while True:
+        await asyncio.sleep(check_interval)
+        try:
+            if time.monotonic() - last_refresh >= interval:
+                last_refresh = time.monotonic()
+                await refresh_symbol_count_view()
+            refreshed_at, now = await symbol_count_view_refreshed_at()
+            ticker_cache.snapshot(now)
+            if ticker_cache.view_refreshed(refreshed_at):
+                await ticker_cache.reload()
+        except Exception as e:
+            logger.error(f"Error refreshing {SYMBOL_COUNT_VIEW}: {e}", exc_info=True)
@@ -1,4 +1,6 @@
 # settings.py
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -10,4 +12,7 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-settings = Settings()
+@lru_cache
+def get_settings():
+    # Built on first use so workers that never touch AWS do not read or validate it at boot
+    return Settings()
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+import websockets
+
+# Point --url at a running server and pass the credentials of an existing user.
+# The WebSocket probe sends "stop", which every stream endpoint echoes without
+# side effects, so its round trip measures how long the event loop was busy.
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(name, samples):
+    if not samples:
+        logging.info(f"{name}: no samples")
+        return
+    logging.info(
+        f"{name}: p50 {statistics.median(samples) * 1000:.1f} ms, "
+        f"p99 {percentile(samples, 0.99) * 1000:.1f} ms, "
+        f"max {max(samples) * 1000:.1f} ms over {len(samples)} samples"
+    )
+
+
+async def probe_websocket(ws_url, stop, interval):
+    """Echo round trips on the stream endpoint until ``stop`` is set."""
+    samples = []
+    async with websockets.connect(ws_url) as ws:
+        while not stop.is_set():
+            started = time.perf_counter()
+            await ws.send("stop")
+            await ws.recv()
+            samples.append(time.perf_counter() - started)
+            await asyncio.sleep(interval)
+    return samples
+
+
+async def login_burst(url, email, password, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/user/login/", json={"email": email, "password": password}
+                )
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+
+        await asyncio.gather(*(login() for _ in range(logins)))
+    return latencies, statuses
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        response = await client.post(
+            "/user/login/", json={"email": args.email, "password": args.password}
+        )
+        response.raise_for_status()
+        token = response.json()["access_token"]
+    ws_url = (
+        args.url.replace("http", "ws", 1) + f"/nasdaq/get_real_data_utp?token={token}"
+    )
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_websocket(ws_url, stop, args.probe_interval))
+    await asyncio.sleep(args.baseline_seconds)
+    stop.set()
+    report("WebSocket echo, idle", await probe)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_websocket(ws_url, stop, args.probe_interval))
+    started = time.perf_counter()
+    latencies, statuses = await login_burst(
+        args.url, args.email, args.password, args.logins, args.concurrency
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    report("WebSocket echo, during login burst", await probe)
+    report("login", latencies)
+    logging.info(
+        f"{args.logins} logins in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), "
+        f"status codes {statuses}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure stream endpoint latency while a burst of logins runs."
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--baseline-seconds", type=float, default=5)
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,128 @@
+import argparse
+import logging
+import random
+import time
+
+from app.services.order_book import OrderBookEngine
+
+# Rough share of each ITCH order message type in a TOTALVIEW session
+MESSAGE_MIX = {"A": 0.45, "D": 0.38, "U": 0.08, "E": 0.05, "X": 0.03, "C": 0.01}
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def synthetic_messages(count, symbols, seed=7):
+    """
+    Decoded TOTALVIEW-like messages. Prices random-walk around a per-symbol mid
+    in 1/10000 dollar ticks and orders rest within 50 ticks of it, so most
+    activity lands near the touch as on a real book. Executions, cancels,
+    deletes and replaces only refer to orders that are still resting.
+    """
+    rng = random.Random(seed)
+    names = [f"SYM{index:04d}" for index in range(symbols)]
+    mids = {name: rng.randint(100, 5000) * 10000 for name in names}
+    # [order ID, symbol, side, remaining quantity] of the orders still resting
+    live = []
+    next_order_id = 1
+    types = list(MESSAGE_MIX)
+    weights = list(MESSAGE_MIX.values())
+    messages = []
+    while len(messages) < count:
+        msg_type = rng.choices(types, weights)[0] if live else "A"
+        if msg_type == "A":
+            symbol = rng.choice(names)
+            mids[symbol] += rng.randint(-1, 1) * 100
+            side = rng.choice("BS")
+            offset = rng.randint(0, 50) * 100
+            price = mids[symbol] - offset if side == "B" else mids[symbol] + offset
+            quantity = rng.randint(1, 50) * 100
+            messages.append(
+                {
+                    "msgType": "A",
+                    "orderId": next_order_id,
+                    "side": side,
+                    "quantity": quantity,
+                    "symbol": symbol,
+                    "price": price,
+                }
+            )
+            live.append([next_order_id, symbol, side, quantity])
+            next_order_id += 1
+            continue
+        index = rng.randrange(len(live))
+        order = live[index]
+        order_id, symbol, side, remaining = order
+        if msg_type in ("E", "X", "C"):
+            quantity = min(100, remaining)
+            order[3] -= quantity
+            messages.append(
+                {"msgType": msg_type, "orderId": order_id, "quantity": quantity}
+            )
+            if order[3] > 0:
+                continue
+        # Swap-remove keeps picking random live orders O(1)
+        live[index] = live[-1]
+        live.pop()
+        if msg_type == "D":
+            messages.append({"msgType": "D", "orderId": order_id})
+        elif msg_type == "U":
+            offset = rng.randint(0, 50) * 100
+            price = mids[symbol] - offset if side == "B" else mids[symbol] + offset
+            quantity = rng.randint(1, 50) * 100
+            messages.append(
+                {
+                    "msgType": "U",
+                    "orderId": order_id,
+                    "newOrderId": next_order_id,
+                    "quantity": quantity,
+                    "price": price,
+                }
+            )
+            live.append([next_order_id, symbol, side, quantity])
+            next_order_id += 1
+    return messages
+
+
+def main(count, symbols, batch_size, depth):
+    started = time.perf_counter()
+    messages = synthetic_messages(count, symbols)
+    logging.info(
+        f"Generated {len(messages)} messages for {symbols} symbols in {time.perf_counter() - started:.1f}s"
+    )
+
+    engine = OrderBookEngine(depth=depth)
+    deltas = 0
+    batch_seconds = []
+    for offset in range(0, len(messages), batch_size):
+        batch = messages[offset : offset + batch_size]
+        started = time.perf_counter()
+        _, batch_deltas = engine.apply_batch(batch)
+        batch_seconds.append(time.perf_counter() - started)
+        deltas += len(batch_deltas)
+
+    total = sum(batch_seconds)
+    batch_seconds.sort()
+    logging.info(
+        f"Applied {len(messages)} messages in {total:.2f}s: "
+        f"{len(messages) / total:,.0f} msg/s, "
+        f"batch p50 {batch_seconds[len(batch_seconds) // 2] * 1000:.2f} ms, "
+        f"p99 {batch_seconds[int(len(batch_seconds) * 0.99)] * 1000:.2f} ms"
+    )
+    logging.info(
+        f"{len(engine.orders)} live orders, {len(engine.books)} books, "
+        f"{deltas} depth deltas, {engine.unknown_orders} unknown order references"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure order book engine throughput on a synthetic ITCH-like message mix."
+    )
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=10)
+    args = parser.parse_args()
+    main(args.messages, args.symbols, args.batch_size, args.depth)
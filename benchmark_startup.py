@@ -0,0 +1,117 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Modules that must stay off the import path of app.main; they are loaded on first use
+LAZY_MODULES = ["pandas", "bs4", "requests", "avro", "confluent_kafka", "ncdssdk"]
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+# Run from the repository root with the same .env as the app; time-to-first-request
+# includes the startup event, so it needs the database to be reachable.
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def time_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE % LAZY_MODULES],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_first_request(timeout):
+    """Seconds from spawning uvicorn until ``GET /`` answers."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, "SEND_DUMMY_DATA": os.getenv("SEND_DUMMY_DATA", "true")},
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def report(name, samples):
+    logging.info(
+        f"{name}: median {statistics.median(samples) * 1000:.0f} ms, "
+        f"min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms "
+        f"over {len(samples)} runs"
+    )
+
+
+def main(runs, skip_server, timeout):
+    imports = [time_import() for _ in range(runs)]
+    report("import app.main", [probe["seconds"] for probe in imports])
+    loaded = sorted({module for probe in imports for module in probe["loaded"]})
+    if loaded:
+        logging.warning(f"Loaded eagerly by import app.main: {', '.join(loaded)}")
+
+    if not skip_server:
+        report(
+            "time to first request",
+            [time_first_request(timeout) for _ in range(runs)],
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure app import time and uvicorn time-to-first-request."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument(
+        "--skip-server",
+        action="store_true",
+        help="only time the import, e.g. when no database is reachable",
+    )
+    args = parser.parse_args()
+    main(args.runs, args.skip_server, args.timeout)
@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+import asyncpg
+
+from app.models.database import db_params
+from app.models.stock_data import (
+    STOCK_DATA_TABLE,
+    create_stock_data_table,
+    ensure_stock_data_partitions,
+    is_partitioned,
+    partition_name,
+    trading_days,
+)
+
+LEGACY_TABLE = "stock_data_legacy"
+
+# Same shape as app.models.nasdaq.fetch_all_data for one symbol and trading day
+BENCHMARK_QUERY = """
+    SELECT date, symbol, size FROM {table}
+    WHERE msgType IN ('T', 'h') AND symbol = $1
+    AND date >= $2::timestamp AND date < $3::timestamp
+"""
+
+# Run "benchmark" before "migrate" and again before "--drop-legacy" to compare
+# the heap table with the partitioned layout on the same data.
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+async def table_columns(conn, table):
+    rows = await conn.fetch(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = $1",
+        table,
+    )
+    return {row["column_name"] for row in rows}
+
+
+async def migrate(days_ahead, drop_legacy):
+    conn = await asyncpg.connect(**db_params)
+    try:
+        if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", STOCK_DATA_TABLE):
+            if await is_partitioned(conn):
+                logging.info(f"{STOCK_DATA_TABLE} is already partitioned")
+            else:
+                logging.info(
+                    f"Renaming heap table {STOCK_DATA_TABLE} to {LEGACY_TABLE}"
+                )
+                await conn.execute(
+                    f"ALTER TABLE {STOCK_DATA_TABLE} RENAME TO {LEGACY_TABLE}"
+                )
+
+        # Also repairs earlier runs, which left the heap's indexes under their old names
+        await rename_legacy_indexes(conn)
+        await create_stock_data_table(conn)
+
+        today = date.today()
+        first_day, last_day = today, today + timedelta(days=days_ahead)
+        has_legacy = await conn.fetchval(
+            "SELECT to_regclass($1) IS NOT NULL", LEGACY_TABLE
+        )
+        if has_legacy:
+            bounds = await conn.fetchrow(
+                f"SELECT min(date)::date AS first, max(date)::date AS last FROM {LEGACY_TABLE}"
+            )
+            if bounds["first"]:
+                first_day = min(first_day, bounds["first"])
+                last_day = max(last_day, bounds["last"])
+
+        created = await ensure_stock_data_partitions(conn, first_day, last_day)
+        logging.info(
+            f"Created {len(created)} partitions from {first_day} to {last_day}"
+        )
+
+        if has_legacy:
+            await copy_legacy_rows(conn, first_day, last_day)
+            if drop_legacy:
+                await conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+                logging.info(f"Dropped {LEGACY_TABLE}")
+
+        await conn.execute(f"ANALYZE {STOCK_DATA_TABLE}")
+    finally:
+        await conn.close()
+
+
+async def rename_legacy_indexes(conn):
+    """
+    Move the heap's indexes out of the way: they keep their names through the
+    table rename, and the partitioned table's IF NOT EXISTS indexes would
+    otherwise find them and not be created.
+    """
+    names = await conn.fetch(
+        "SELECT indexname FROM pg_indexes WHERE tablename = $1", LEGACY_TABLE
+    )
+    for row in names:
+        name = row["indexname"]
+        if name.endswith("_legacy"):
+            continue
+        logging.info(f"Renaming index {name} to {name}_legacy")
+        await conn.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_legacy"')
+
+
+async def copy_legacy_rows(conn, first_day, last_day):
+    """Copy legacy rows one day per transaction so a crashed run can simply be restarted."""
+    size_column = (
+        "size" if "size" in await table_columns(conn, LEGACY_TABLE) else "NULL"
+    )
+    for day in trading_days(first_day, last_day):
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        if await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM {partition_name(day)})"):
+            continue
+        status = await conn.execute(
+            f"""
+            INSERT INTO {STOCK_DATA_TABLE} (trackingID, date, msgType, symbol, price, size)
+            SELECT trackingID::bigint, date, msgType, symbol, round(price)::bigint, {size_column}
+            FROM {LEGACY_TABLE}
+            WHERE date >= $1 AND date < $2
+            AND trackingID IS NOT NULL AND msgType IS NOT NULL AND symbol IS NOT NULL
+            """,
+            start,
+            end,
+        )
+        copied = int(status.split()[-1])
+        if copied:
+            logging.info(f"Copied {copied} rows for {day}")
+
+
+async def create_partitions(days_ahead):
+    conn = await asyncpg.connect(**db_params)
+    try:
+        today = date.today()
+        created = await ensure_stock_data_partitions(
+            conn, today, today + timedelta(days=days_ahead)
+        )
+        logging.info(f"Created partitions: {created or 'none needed'}")
+    finally:
+        await conn.close()
+
+
+async def benchmark(tables, symbol, day, runs):
+    conn = await asyncpg.connect(**db_params)
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    try:
+        for table in tables:
+            if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", table):
+                logging.warning(f"Skipping {table}: table does not exist")
+                continue
+            query = BENCHMARK_QUERY.format(table=table)
+            plan = await conn.fetchval(
+                f"EXPLAIN (FORMAT TEXT) {query}", symbol, start, end
+            )
+            timings = []
+            rows = 0
+            for _ in range(runs):
+                started = time.perf_counter()
+                rows = len(await conn.fetch(query, symbol, start, end))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(
+                f"{table}: {rows} rows, p50 {statistics.median(timings):.2f} ms, "
+                f"p95 {p95:.2f} ms, min {timings[0]:.2f} ms over {runs} runs "
+                f"(plan: {plan.strip()})"
+            )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=f"Manage the day-partitioned {STOCK_DATA_TABLE} table."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="convert the heap table into daily range partitions"
+    )
+    migrate_parser.add_argument("--days-ahead", type=int, default=7)
+    migrate_parser.add_argument(
+        "--drop-legacy", action="store_true", help=f"drop {LEGACY_TABLE} once copied"
+    )
+
+    partitions_parser = subparsers.add_parser(
+        "create-partitions", help="pre-create upcoming daily partitions"
+    )
+    partitions_parser.add_argument("--days-ahead", type=int, default=7)
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="time a symbol/day query on the legacy and partitioned tables"
+    )
+    benchmark_parser.add_argument("--symbol", required=True)
+    benchmark_parser.add_argument("--day", type=date.fromisoformat, required=True)
+    benchmark_parser.add_argument("--runs", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        asyncio.run(migrate(args.days_ahead, args.drop_legacy))
+    elif args.command == "create-partitions":
+        asyncio.run(create_partitions(args.days_ahead))
+    else:
+        asyncio.run(
+            benchmark(
+                [LEGACY_TABLE, STOCK_DATA_TABLE], args.symbol, args.day, args.runs
+            )
+        )
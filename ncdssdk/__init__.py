@@ -1,3 +1,4 @@
 # __docformat__ = "restructuredtext"
 
 from ncdssdk.src.main.python.ncdsclient.NCDSClient import NCDSClient
+from ncdssdk.src.main.python.ncdsclient.consumer.ReplayKafkaAvroConsumer import ReplayKafkaAvroConsumer
@@ -15,9 +15,10 @@ class NCDSClient:
     Attributes:
         security_cfg (dict): Authentication security configuration passed from the client
         kafka_cfg (dict): Kafka consume configuration settings passed in from the client
+        symbol_ids (callable): maps decoded symbols to integer IDs, added to messages as ``symbolId``; optional
     """
 
-    def __init__(self, security_cfg, kafka_cfg):
+    def __init__(self, security_cfg, kafka_cfg, symbol_ids=None):
         """
         This method creates a :class:`.NasdaqKafkaAvroConsumer` instance using the configuration info.
         """
@@ -34,10 +35,10 @@ class NCDSClient:
             auth_config_loader = AuthenticationConfigLoader()
             if security_cfg is not None and auth_config_loader.validate_security_config(security_cfg):
                 self.nasdaq_kafka_avro_consumer = NasdaqKafkaAvroConsumer(
-                    security_cfg, kafka_cfg)
+                    security_cfg, kafka_cfg, symbol_ids)
             elif IsItPyTest.is_py_test():
                 self.nasdaq_kafka_avro_consumer = NasdaqKafkaAvroConsumer(
-                    None, None)
+                    None, None, symbol_ids)
             else:
                 raise Exception("Authentication Config is missing")
         except:
@@ -67,21 +68,41 @@ class NCDSClient:
         kafka_schema = str(kafka_schema)
         return kafka_schema
 
-    def ncds_kafka_consumer(self, topic, timestamp=None):
+    def ncds_kafka_consumer(self, topic, timestamp=None, capture_dir=None):
         """
         Retrieves the apache kafka consumer. If the timestamp is not set, the consumer will
         start consuming at midnight of this day if auto.offset.reset in the kafka_cfg is set to
         earliest. If auto.offset.reset is set to some variation of 'latest', the consumer will
         start consuming at the end offset.
 
+        With capture_dir set, every consumed message is also recorded, undecoded and with the
+        stream schema, to compressed segment files that :class:`.ReplayKafkaAvroConsumer` replays offline.
+
         Args:
             topic (string): Topic/Stream name
             timestamp (int): timestamp in milliseconds since the UNIX epoch
+            capture_dir (string): directory to record the consumed messages to, optional
         Returns: 
             :class:`KafkaAvroConsumer` : Nasdaq's market data Kafka consumer
 
         """
-        return self.nasdaq_kafka_avro_consumer.get_kafka_consumer(topic, timestamp)
+        return self.nasdaq_kafka_avro_consumer.get_kafka_consumer(topic, timestamp, capture_dir)
+
+    def ncds_multi_topic_kafka_consumer(self, topics, timestamp=None, capture_dir=None):
+        """
+        Retrieves one apache kafka consumer for several topics, assigned to every partition of each.
+        Messages are decoded with the schema of their own topic; ``message.topic()`` tells them apart.
+        Offsets start as described in :meth:`ncds_kafka_consumer`.
+
+        Args:
+            topics (list): Topic/Stream names
+            timestamp (int): timestamp in milliseconds since the UNIX epoch
+            capture_dir (string): directory to record the consumed messages to, optional
+        Returns:
+            :class:`KafkaAvroConsumer` : Nasdaq's market data Kafka consumer
+
+        """
+        return self.nasdaq_kafka_avro_consumer.get_multi_topic_kafka_consumer(topics, timestamp, capture_dir)
 
     def top_messages(self, topic_name, timestamp=None):
         """
@@ -3,6 +3,7 @@ import sys
 from ncdssdk.src.main.python.ncdsclient.internal.utils.AuthenticationConfigLoader import AuthenticationConfigLoader
 from ncdssdk.src.main.python.ncdsclient.internal.ReadSchemaTopic import ReadSchemaTopic
 from ncdssdk.src.main.python.ncdsclient.internal.KafkaAvroConsumer import KafkaAvroConsumer
+from ncdssdk.src.main.python.ncdsclient.internal.FeedCapture import FeedRecorder
 from ncdssdk.src.main.python.ncdsclient.internal.utils.KafkaConfigLoader import KafkaConfigLoader
 from ncdssdk.src.main.python.ncdsclient.internal.utils import IsItPyTest, SeekToMidnight
 from confluent_kafka import TopicPartition, OFFSET_INVALID, OFFSET_END, OFFSET_BEGINNING
@@ -20,15 +21,17 @@ class NasdaqKafkaAvroConsumer():
     Attributes:
         security_cfg (dict): the JSON config dict with authentication configuration properties set
         kafka_cfg (dict): the JSON config dict with kafka configuration properties set
+        symbol_ids (callable): maps decoded symbols to integer IDs, added to messages as ``symbolId``; optional
     """
 
-    def __init__(self, security_cfg, kafka_cfg):
+    def __init__(self, security_cfg, kafka_cfg, symbol_ids=None):
         """
         Initializes security_cfg and kafka_cfg, and sets the variables for client_ID, 
         security_props, kafka_props, and read_schema_topic
         """
         self.security_cfg = security_cfg
         self.kafka_cfg = kafka_cfg
+        self.symbol_ids = symbol_ids
 
         self.client_ID = None
         self.security_props = None
@@ -64,13 +67,14 @@ class NasdaqKafkaAvroConsumer():
         self.logger.info("Consumer Config: ")
         self.logger.info(pformat(self.kafka_cfg))
 
-    def get_kafka_consumer(self, stream_name, timestamp=None):
+    def get_kafka_consumer(self, stream_name, timestamp=None, capture_dir=None):
         """
         This method returns the Kafka consumer.
 
         Args:
             stream_name (str): Kafka message series topic name
             timestamp (int): timestamp in milliseconds since the UNIX epoch
+            capture_dir (str): directory to record the consumed messages and the stream schema to, optional
         :rtype: `confluent_kafka.KafkaConsumer <https://docs.confluent.io/platform/current/clients/confluent-kafka-python/html/index.html#confluent_kafka.Consumer>`_ 
 
         """
@@ -79,6 +83,9 @@ class NasdaqKafkaAvroConsumer():
             raise Exception(
                 "Kafka Schema not found for stream: " + stream_name)
         kafka_consumer = self.get_consumer(kafka_schema, stream_name)
+        if capture_dir is not None:
+            kafka_consumer.recorder = FeedRecorder(
+                capture_dir, stream_name, {stream_name + ".stream": str(kafka_schema)})
         topic_partition = TopicPartition(
             topic=stream_name + ".stream", partition=0, offset=OFFSET_END)
         self.logger.debug(
@@ -124,16 +131,80 @@ class NasdaqKafkaAvroConsumer():
                     "No available offset. Continuing without seek")
             return kafka_consumer
 
+    def get_multi_topic_kafka_consumer(self, stream_names, timestamp=None, capture_dir=None):
+        """
+        This method returns one Kafka consumer assigned to every partition of each of the given streams,
+        so several streams share one set of broker connections, buffers and threads.
+        Each message is decoded with the schema of its own stream, chosen by the message topic.
+        Offsets are positioned as in :meth:`get_kafka_consumer`, on every partition.
+
+        Args:
+            stream_names (list): Kafka message series topic names
+            timestamp (int): timestamp in milliseconds since the UNIX epoch
+            capture_dir (str): directory to record the consumed messages and the stream schemas to, optional
+        :rtype: :class:`.KafkaAvroConsumer`
+        """
+        kafka_schemas = {}
+        for stream_name in stream_names:
+            kafka_schema = self.read_schema_topic.read_schema(stream_name)
+            if kafka_schema is None:
+                raise Exception(
+                    "Kafka Schema not found for stream: " + stream_name)
+            kafka_schemas[stream_name + ".stream"] = kafka_schema
+        kafka_consumer = self.get_consumer(kafka_schemas, ",".join(stream_names))
+        if capture_dir is not None:
+            kafka_consumer.recorder = FeedRecorder(
+                capture_dir, "_".join(stream_names),
+                {topic: str(kafka_schema) for topic, kafka_schema in kafka_schemas.items()})
+
+        timeout = self.kafka_props.get(self.kafka_config_loader.TIMEOUT)
+        cluster_metadata = kafka_consumer.list_topics(timeout=timeout)
+        topic_partitions = []
+        for topic in kafka_schemas:
+            topic_metadata = cluster_metadata.topics.get(topic)
+            if topic_metadata is None or topic_metadata.error is not None:
+                raise Exception("Kafka topic not found: " + topic)
+            topic_partitions.extend(
+                TopicPartition(topic=topic, partition=partition, offset=OFFSET_END)
+                for partition in sorted(topic_metadata.partitions))
+        self.logger.debug(
+            f"Assigning kafka consumer to topic partitions: {topic_partitions}")
+        kafka_consumer.assign(topic_partitions)
+
+        if timestamp is None:
+            auto_offset_cfg = self.kafka_props.get(self.kafka_config_loader.AUTO_OFFSET_RESET_CONFIG)
+            if auto_offset_cfg not in ("earliest", "smallest", "beginning"):
+                return kafka_consumer
+            seek_timestamp = SeekToMidnight.get_timestamp_at_midnight(0)
+            fallback_offset = OFFSET_BEGINNING
+        else:
+            seek_timestamp = timestamp
+            fallback_offset = None
+
+        for topic_partition in topic_partitions:
+            topic_partition.offset = seek_timestamp
+        offsets_for_times = kafka_consumer.offsets_for_times(topic_partitions, timeout)
+        for topic_partition in offsets_for_times:
+            if topic_partition.offset != OFFSET_INVALID and topic_partition.offset >= 0:
+                kafka_consumer.seek(topic_partition)
+            elif fallback_offset is not None:
+                topic_partition.offset = fallback_offset
+                kafka_consumer.seek(topic_partition)
+            else:
+                self.logger.warning(
+                    f"No available offset for {topic_partition}. Continuing without seek")
+        return kafka_consumer
+
     def get_consumer(self, avro_schema, stream_name):
         """
         Args:
-            avro_schema: schema for the topic
+            avro_schema: schema for the topic, or a dict of the schema of each topic
         Returns:
             a :class:`.KafkaAvroConsumer` instance with a key and value deserializer set through the avro_schema parameter
         """
         if 'group.id' not in self.kafka_props:
             self.kafka_props[self.kafka_config_loader.GROUP_ID_CONFIG] = f'{self.client_ID}'
-        return KafkaAvroConsumer(self.kafka_props, avro_schema)
+        return KafkaAvroConsumer(self.kafka_props, avro_schema, self.symbol_ids)
 
     def get_schema_for_topic(self, topic):
         """
@@ -0,0 +1,125 @@
+import logging
+import time
+import avro.schema
+from ncdssdk.src.main.python.ncdsclient.internal.AvroDeserializer import AvroDeserializer
+from ncdssdk.src.main.python.ncdsclient.internal.FeedCapture import read_segment, segment_paths
+
+
+class ReplayKafkaAvroConsumer():
+    """
+    Replays a capture recorded with ``capture_dir`` in place of a live :class:`.KafkaAvroConsumer`.
+
+    Messages come back from :meth:`consume` decoded with the schemas recorded
+    in the capture, in recording order, either as fast as they are asked for or
+    paced by their Kafka timestamps at ``speed`` times the original rate. Once
+    the capture is exhausted :meth:`consume` returns an empty list immediately.
+
+    Attributes:
+        directory (str): directory holding the capture segments
+        name (str): name the capture was recorded under, the stream name by default
+        speed (float): pace relative to the recording, None for no pacing
+        symbol_ids (callable): maps decoded symbols to integer IDs, added to messages as ``symbolId``; optional
+        last_poll_seconds (float): time the last :meth:`consume` call waited for messages to be due
+        last_decode_seconds (float): time the last :meth:`consume` call spent deserializing
+        exhausted (bool): True once every recorded message has been returned
+    """
+
+    def __init__(self, directory, name, speed=None, symbol_ids=None):
+        if speed is not None and speed <= 0:
+            raise ValueError("Replay speed must be positive")
+        self.directory = directory
+        self.name = name
+        self.speed = speed
+        self.symbol_ids = symbol_ids
+        self.logger = logging.getLogger(__name__)
+        paths = segment_paths(directory, name)
+        if not paths:
+            raise Exception(f"No capture segments for {name} in {directory}")
+        self.last_poll_seconds = 0.0
+        self.last_decode_seconds = 0.0
+        self.exhausted = False
+        self._deserializers = {}
+        self._records = self._read(paths)
+        self._pending = None
+        self._origin = None
+
+    def _read(self, paths):
+        """
+        Yields ``(message, deserializer)`` pairs, each message paired with the
+        deserializer of the schema recorded in its own segment, as a batch may
+        span segments recorded with different schemas.
+        """
+        for path in paths:
+            schemas, records = read_segment(path)
+            for topic, schema in schemas.items():
+                if self._deserializers.get(topic, (None,))[0] != schema:
+                    self._deserializers[topic] = (schema, AvroDeserializer(
+                        avro.schema.parse(schema), symbol_ids=self.symbol_ids))
+            deserializers = {topic: self._deserializers[topic][1] for topic in schemas}
+            self.logger.debug(f"Replaying capture segment {path}")
+            for message in records:
+                yield message, deserializers[message.topic()]
+
+    def _peek(self):
+        if self._pending is None and not self.exhausted:
+            self._pending = next(self._records, None)
+            if self._pending is None:
+                self.exhausted = True
+        return self._pending
+
+    def _due(self, message):
+        if self.speed is None:
+            return 0.0
+        timestamp = message.timestamp()[1]
+        if self._origin is None:
+            self._origin = (time.perf_counter(), timestamp)
+        started, first_timestamp = self._origin
+        return started + (timestamp - first_timestamp) / 1000 / self.speed
+
+    def consume(self, num_messages=1, timeout=-1):
+        """
+        Consume up to the number of messages specified, waiting up to ``timeout`` for the next one to be due
+
+        Args:
+            num_messages (int): The maximum number of messages to return.
+            timeout (float): Maximum time to block waiting for a message (Seconds), -1 for no limit.
+        Returns:
+            list: decoded :class:`.RecordedMessage` objects, empty on timeout or once the capture is exhausted
+        Raises:
+            RuntimeError: if the number of messages is less than 1
+        """
+        if num_messages < 1:
+            raise RuntimeError(
+                "The maximum number of messages must be greater than or equal to 1.")
+
+        started = time.perf_counter()
+        deadline = None if timeout < 0 else started + timeout
+        messages = []
+        while len(messages) < num_messages:
+            pending = self._peek()
+            if pending is None:
+                break
+            due = self._due(pending[0])
+            now = time.perf_counter()
+            if due > now:
+                if messages or (deadline is not None and deadline <= now):
+                    break
+                time.sleep((due if deadline is None else min(due, deadline)) - now)
+                continue
+            messages.append(pending)
+            self._pending = None
+        polled = time.perf_counter()
+        self.last_poll_seconds = polled - started
+
+        for message, deserializer in messages:
+            key = message.key()
+            if key is not None:
+                message.set_key(key.decode("utf_8"))
+            if message.value() is not None:
+                message.set_value(deserializer.decode(message.value(), None))
+        self.last_decode_seconds = time.perf_counter() - polled
+        return [message for message, _ in messages]
+
+    def close(self):
+        self._records.close()
+        self.exhausted = True
@@ -1,4 +1,5 @@
 import io
+import sys
 from avro.io import DatumReader, BinaryDecoder
 import json
 import logging
@@ -10,16 +11,30 @@ class AvroDeserializer():
     Decodes the given schema for the user and returns the decoded data.
     Wrapper for the AvroDeserializer.
 
+    String fields are stripped of their padding and interned, so the same
+    symbol decoded from different messages is one shared object. Each distinct
+    raw value is stripped once and then found in a cache; past
+    ``max_cached_strings`` distinct values new ones are only stripped.
+
+    With ``symbol_ids`` set, every message with a ``symbol`` field also gets
+    the integer ID that callable returns for it, as ``symbolId``.
+
     Attributes:
         schema (Schema): the schema loaded from a schema file
+        max_cached_strings (int): bound on the stripped string cache
+        symbol_ids (callable): maps a decoded symbol to an integer ID, optional
     """
 
-    def __init__(self, schema):
+    def __init__(self, schema, max_cached_strings=1 << 16, symbol_ids=None):
         self.schema = schema
+        self.max_cached_strings = max_cached_strings
+        self.symbol_ids = symbol_ids
+        self._strings = {}
+        self._reader = DatumReader(schema)
         self.logger = logging.getLogger(__name__)
 
     def decode(self, msg_value, ctx):
-        reader = DatumReader(self.schema)
+        reader = self._reader
         message_bytes = io.BytesIO(msg_value)
         decoder = BinaryDecoder(message_bytes)
         try:
@@ -39,9 +54,18 @@ class AvroDeserializer():
             union_schema = False
             pass
 
-        for key in event_dict:
-            if type(event_dict[key]) == str:
-                event_dict[key] = event_dict[key].strip()
+        strings = self._strings
+        for key, value in event_dict.items():
+            if type(value) == str:
+                cached = strings.get(value)
+                if cached is None:
+                    cached = value.strip()
+                    if len(strings) < self.max_cached_strings:
+                        cached = sys.intern(cached)
+                        strings[value] = cached
+                event_dict[key] = cached
+        if self.symbol_ids is not None and "symbol" in event_dict:
+            event_dict["symbolId"] = self.symbol_ids(event_dict["symbol"])
 
         # Initialize schema name in the message based on type of schema
         if union_schema:
@@ -50,3 +74,24 @@ class AvroDeserializer():
             event_dict["schema_name"] = reader.readers_schema.name
 
         return event_dict
+
+
+class TopicAvroDeserializer():
+    """
+    Decodes messages from several topics, each with the :class:`.AvroDeserializer`
+    of its own schema, chosen by the topic of the message being decoded.
+
+    Attributes:
+        schemas (dict): the schema of each Kafka topic
+        symbol_ids (callable): passed to each :class:`.AvroDeserializer`, optional
+    """
+
+    def __init__(self, schemas, symbol_ids=None):
+        self.deserializers = {
+            topic: AvroDeserializer(schema, symbol_ids=symbol_ids) for topic, schema in schemas.items()}
+
+    def decode(self, msg_value, ctx):
+        deserializer = self.deserializers.get(ctx.topic)
+        if deserializer is None:
+            raise Exception(f"No schema for topic: {ctx.topic}")
+        return deserializer.decode(msg_value, ctx)
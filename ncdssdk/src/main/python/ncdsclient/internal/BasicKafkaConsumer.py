@@ -4,6 +4,7 @@ from confluent_kafka.error import (KeyDeserializationError,
 from confluent_kafka.serialization import (SerializationContext,
                                            MessageField)
 import logging
+import time
 
 from ncdssdk.src.main.python.ncdsclient.internal.utils.KafkaConfigLoader import KafkaConfigLoader
 
@@ -17,6 +18,9 @@ class BasicKafkaConsumer(DeserializingConsumer):
         config (dict): stores dict that stores configuration properties for the confluent-kafka Python `DeserializingConsumer <https://docs.confluent.io/platform/current/clients/confluent-kafka-python/html/index.html#confluent_kafka.DeserializingConsumer>`_
         key_deserializer (Deserializer): deserializer used for message keys
         value_deserializer (func): decode function used to deserialize message values
+        last_poll_seconds (float): time the last :meth:`consume` call waited on the broker
+        last_decode_seconds (float): time the last :meth:`consume` call spent deserializing
+        recorder (:class:`.FeedRecorder`): when set, receives every consumed message before it is deserialized
     """
 
     def __init__(self, config, key_deserializer, value_deserializer):
@@ -27,6 +31,9 @@ class BasicKafkaConsumer(DeserializingConsumer):
         del kafka_config[KafkaConfigLoader().NUM_MESSAGES]
 
         self.logger = logging.getLogger(__name__)
+        self.last_poll_seconds = 0.0
+        self.last_decode_seconds = 0.0
+        self.recorder = None
         super(BasicKafkaConsumer, self).__init__(kafka_config)
 
     def ensure_assignment(self):
@@ -58,20 +65,36 @@ class BasicKafkaConsumer(DeserializingConsumer):
             raise RuntimeError(
                 "The maximum number of messages must be greater than or equal to 1.")
 
+        started = time.perf_counter()
         messages = super(DeserializingConsumer, self).consume(
             num_messages, timeout)
+        polled = time.perf_counter()
+        self.last_poll_seconds = polled - started
+        self.last_decode_seconds = 0.0
 
         if messages is None:
             return []
 
+        if self.recorder is not None:
+            self.recorder.record(messages)
+
         deserialized_messages = []
 
         for message in messages:
             deserialized_messages.append(
                 self._parse_deserialize_message(message))
 
+        self.last_decode_seconds = time.perf_counter() - polled
         return deserialized_messages
 
+    def close(self):
+        """
+        Closes the consumer, and the recording if one is being made.
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+        super(BasicKafkaConsumer, self).close()
+
     def _parse_deserialize_message(self, message):
         """
         Internal class method for deserializing and maintaining consistency between poll and consume classes.
@@ -0,0 +1,189 @@
+import gzip
+import json
+import logging
+import os
+import struct
+
+SEGMENT_MAGIC = b"NCDSCAP1"
+SEGMENT_SUFFIX = ".ncds.gz"
+# topic index, partition, offset, timestamp, timestamp type, key length, value length
+RECORD_HEADER = struct.Struct("<Hiqqbii")
+
+logger = logging.getLogger(__name__)
+
+
+class RecordedMessage():
+    """
+    A Kafka message read back from a capture segment.
+    Offers the accessors of a confluent-kafka `Message <https://docs.confluent.io/platform/current/clients/confluent-kafka-python/html/index.html#message>`_
+    that the SDK and its users call.
+    """
+
+    __slots__ = ("_topic", "_partition", "_offset", "_timestamp", "_key", "_value")
+
+    def __init__(self, topic, partition, offset, timestamp, key, value):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._timestamp = timestamp
+        self._key = key
+        self._value = value
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def timestamp(self):
+        return self._timestamp
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return None
+
+    def error(self):
+        return None
+
+    def set_key(self, key):
+        self._key = key
+
+    def set_value(self, value):
+        self._value = value
+
+
+class FeedRecorder():
+    """
+    Writes raw Kafka messages, before decoding, to gzip-compressed segment files.
+
+    Each segment starts with a header holding the Avro schema of every recorded
+    topic, as read from the control topic, so a capture decodes the same way
+    offline as it did live. Records keep the partition, offset, timestamp, key
+    and value bytes. A new segment is started once ``max_segment_bytes`` of
+    records have been written to the current one.
+
+    Attributes:
+        directory (str): directory the segments are written to
+        name (str): prefix of the segment file names
+        schemas (dict): Avro schema JSON per recorded Kafka topic
+        max_segment_bytes (int): uncompressed size at which a segment is closed
+    """
+
+    def __init__(self, directory, name, schemas, max_segment_bytes=1 << 28):
+        self.directory = directory
+        self.name = name
+        self.schemas = dict(schemas)
+        self.max_segment_bytes = max_segment_bytes
+        self._topics = {topic: index for index, topic in enumerate(self.schemas)}
+        self._file = None
+        self._segment_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._segment_index = len(segment_paths(directory, name))
+
+    def record(self, messages):
+        """
+        Appends raw messages as returned by the consumer; error events are skipped.
+
+        Args:
+            messages (list): undecoded confluent-kafka messages
+        """
+        for message in messages:
+            if message.error() is not None:
+                continue
+            topic_index = self._topics.get(message.topic())
+            if topic_index is None:
+                continue
+            if self._file is None or self._segment_bytes >= self.max_segment_bytes:
+                self._open_segment()
+            key = message.key()
+            value = message.value()
+            if isinstance(key, str):
+                key = key.encode("utf_8")
+            timestamp_type, timestamp = message.timestamp()
+            self._file.write(RECORD_HEADER.pack(
+                topic_index, message.partition(), message.offset(), timestamp, timestamp_type,
+                -1 if key is None else len(key), -1 if value is None else len(value)))
+            if key:
+                self._file.write(key)
+            if value:
+                self._file.write(value)
+            self._segment_bytes += RECORD_HEADER.size + len(key or b"") + len(value or b"")
+
+    def _open_segment(self):
+        self.close()
+        path = os.path.join(self.directory, f"{self.name}-{self._segment_index:06d}{SEGMENT_SUFFIX}")
+        self._segment_index += 1
+        header = json.dumps({"version": 1, "schemas": self.schemas}).encode("utf_8")
+        self._file = gzip.open(path, "wb")
+        self._file.write(SEGMENT_MAGIC + struct.pack("<I", len(header)) + header)
+        self._segment_bytes = 0
+        logger.info(f"Recording {', '.join(self.schemas)} to {path}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def segment_paths(directory, name):
+    """
+    Returns:
+        list: the paths of the segments recorded as ``name`` in ``directory``, in recording order
+    """
+    prefix = f"{name}-"
+    return sorted(
+        os.path.join(directory, file_name) for file_name in os.listdir(directory)
+        if file_name.startswith(prefix) and file_name.endswith(SEGMENT_SUFFIX)
+        and file_name[len(prefix):-len(SEGMENT_SUFFIX)].isdigit())
+
+
+def read_segment(path):
+    """
+    Reads a capture segment. A segment cut short, as when the recording process
+    was killed, ends at its last complete record.
+
+    Args:
+        path (str): segment file path
+    Returns:
+        tuple: the schemas dict of the header and an iterator of :class:`RecordedMessage` with raw keys and values
+    """
+    f = gzip.open(path, "rb")
+    if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+        f.close()
+        raise ValueError(f"Not a capture segment: {path}")
+    header_length, = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(header_length))
+    if header.get("version") != 1:
+        f.close()
+        raise ValueError(f"Unsupported capture segment version in {path}")
+    schemas = header["schemas"]
+    return schemas, _read_records(f, path, list(schemas))
+
+
+def _read_records(f, path, topics):
+    with f:
+        try:
+            while True:
+                head = f.read(RECORD_HEADER.size)
+                if len(head) < RECORD_HEADER.size:
+                    if head:
+                        logger.warning(f"Capture segment {path} ends mid-record")
+                    return
+                topic_index, partition, offset, timestamp, timestamp_type, key_length, value_length = \
+                    RECORD_HEADER.unpack(head)
+                key = f.read(key_length) if key_length > 0 else (None if key_length < 0 else b"")
+                value = f.read(value_length) if value_length > 0 else (None if value_length < 0 else b"")
+                if (key_length > 0 and len(key) < key_length) or (value_length > 0 and len(value) < value_length):
+                    logger.warning(f"Capture segment {path} ends mid-record")
+                    return
+                yield RecordedMessage(topics[topic_index], partition, offset, (timestamp_type, timestamp), key, value)
+        except EOFError:
+            logger.warning(f"Capture segment {path} is truncated")
@@ -1,5 +1,5 @@
 from ncdssdk.src.main.python.ncdsclient.internal.BasicKafkaConsumer import BasicKafkaConsumer
-from ncdssdk.src.main.python.ncdsclient.internal.AvroDeserializer import AvroDeserializer
+from ncdssdk.src.main.python.ncdsclient.internal.AvroDeserializer import AvroDeserializer, TopicAvroDeserializer
 from confluent_kafka.serialization import StringDeserializer
 
 
@@ -10,12 +10,18 @@ class KafkaAvroConsumer(BasicKafkaConsumer):
 
     Attributes:
         config (dict): dict that stores configuration properties for the `DeserializingConsumer <https://docs.confluent.io/platform/current/clients/confluent-kafka-python/html/index.html#confluent_kafka.DeserializingConsumer>`_
-        message_schema (Schema): schema used for decoding in :class:`.AvroDeserializer` class
+        message_schema (Schema or dict): schema used for decoding in :class:`.AvroDeserializer` class,
+            or a dict of the schema of each topic for a consumer assigned to several topics
+        symbol_ids (callable): maps decoded symbols to integer IDs, added to messages as ``symbolId``; optional
     """
 
-    def __init__(self, config, message_schema):
+    def __init__(self, config, message_schema, symbol_ids=None):
+        if isinstance(message_schema, dict):
+            value_deserializer = TopicAvroDeserializer(message_schema, symbol_ids)
+        else:
+            value_deserializer = AvroDeserializer(message_schema, symbol_ids=symbol_ids)
         super(KafkaAvroConsumer, self).__init__(
-            config, StringDeserializer('utf_8'), AvroDeserializer(message_schema))
+            config, StringDeserializer('utf_8'), value_deserializer)
 
     def assign(self, partitions):
         super(KafkaAvroConsumer, self).assign(partitions)
@@ -0,0 +1,99 @@
+from ncdssdk.src.main.python.ncdsclient.internal.FeedCapture import FeedRecorder, RecordedMessage, segment_paths
+from ncdssdk.src.main.python.ncdsclient.consumer.ReplayKafkaAvroConsumer import ReplayKafkaAvroConsumer
+from ncdssdk.src.tests.utils.AvroSerializer import AvroSerializer
+import avro.schema as schema
+import json
+import pytest
+
+schema_file = "../resources/testNLSUTP.avsc"
+
+
+def record_messages(directory, count, max_segment_bytes=1 << 28):
+    schema_str = open(schema_file, 'r').read()
+    serializer = AvroSerializer(schema.parse(schema_str))
+    recorder = FeedRecorder(directory, "NLSUTP", {"NLSUTP.stream": schema_str}, max_segment_bytes)
+    records = []
+    for i in range(count):
+        record = {"SoupPartition": 0, "SoupSequence": i, "trackingID": 1000 + i, "msgType": "X",
+                  "symbol": "AAPL    ", "securityClass": "Q", "adjClosingPrice": 100 * i}
+        records.append(record)
+        # Raw messages, as the consumer gets them before deserializing
+        recorder.record([RecordedMessage("NLSUTP.stream", 0, 50 + i, (1, 1700000000000 + 100 * i),
+                                         b"key", serializer.encode(record, None))])
+    recorder.close()
+    return records
+
+
+def test_capture_replays_recorded_messages(tmp_path):
+    records = record_messages(str(tmp_path), 10, max_segment_bytes=200)
+    assert len(segment_paths(str(tmp_path), "NLSUTP")) > 1
+
+    consumer = ReplayKafkaAvroConsumer(str(tmp_path), "NLSUTP")
+    messages = consumer.consume(4, 0) + consumer.consume(100, 0)
+    assert consumer.consume(1, 0) == []
+    assert consumer.exhausted
+    assert [message.offset() for message in messages] == list(range(50, 60))
+    assert messages[0].key() == "key"
+    assert messages[3].timestamp() == (1, 1700000000300)
+    for message, record in zip(messages, records):
+        value = message.value()
+        assert value["schema_name"] == "SeqAdjClosingPrice"
+        assert value["symbol"] == record["symbol"].strip()
+        assert value["adjClosingPrice"] == record["adjClosingPrice"]
+
+
+class FakeTime:
+    """Stands in for the ``time`` module of the replay consumer: sleeping only advances the clock."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_replay_paces_by_timestamp(tmp_path, monkeypatch):
+    record_messages(str(tmp_path), 5)
+    clock = FakeTime()
+    monkeypatch.setattr(ReplayKafkaAvroConsumer.__module__ + ".time", clock)
+
+    # 400 ms of recorded time at four times the pace
+    consumer = ReplayKafkaAvroConsumer(str(tmp_path), "NLSUTP", speed=4)
+    messages = consumer.consume(100, 1)
+    assert len(messages) == 1 and clock.sleeps == []
+    # The next message is due in 25 ms, after the timeout
+    assert consumer.consume(100, 0.01) == []
+    assert clock.sleeps == pytest.approx([0.01])
+    while not consumer.exhausted:
+        messages += consumer.consume(100, 1)
+    assert len(messages) == 5
+    assert clock.sleeps == pytest.approx([0.01, 0.015, 0.025, 0.025, 0.025])
+    assert clock.now == pytest.approx(100.1)
+    assert consumer.consume(1, 0.05) == []
+    assert len(clock.sleeps) == 5
+
+
+def test_batch_spanning_segments_decodes_with_each_segment_schema(tmp_path):
+    schema_str = open(schema_file, 'r').read()
+    changed = json.loads(schema_str)
+    changed["fields"].append({"name": "lotSize", "type": "int"})
+    changed["version"] = "2"
+    changed_str = json.dumps(changed)
+    for offset, (recorded_schema, extra) in enumerate([(schema_str, {}), (changed_str, {"lotSize": 100})]):
+        serializer = AvroSerializer(schema.parse(recorded_schema))
+        recorder = FeedRecorder(str(tmp_path), "NLSUTP", {"NLSUTP.stream": recorded_schema})
+        record = {"SoupPartition": 0, "SoupSequence": offset, "trackingID": 1000 + offset, "msgType": "X",
+                  "symbol": "AAPL    ", "securityClass": "Q", "adjClosingPrice": 100 + offset, **extra}
+        recorder.record([RecordedMessage("NLSUTP.stream", 0, offset, (1, 1700000000000 + offset),
+                                         None, serializer.encode(record, None))])
+        recorder.close()
+
+    messages = ReplayKafkaAvroConsumer(str(tmp_path), "NLSUTP").consume(100, 0)
+    assert [message.value()["adjClosingPrice"] for message in messages] == [100, 101]
+    assert "lotSize" not in messages[0].value()
+    assert messages[1].value()["lotSize"] == 100
@@ -0,0 +1,37 @@
+from ncdssdk.src.main.python.ncdsclient.internal.AvroDeserializer import TopicAvroDeserializer
+from ncdssdk.src.tests.utils.AvroSerializer import AvroSerializer
+from confluent_kafka.serialization import SerializationContext, MessageField
+import avro.schema as schema
+import pytest
+
+
+def test_decodes_with_schema_of_message_topic():
+    nls_schema = schema.parse(open("../resources/testNLSUTP.avsc", 'r').read())
+    gids_schema = schema.parse(open("../resources/testGIDS.avsc", 'r').read())
+    deserializer = TopicAvroDeserializer({"NLSUTP.stream": nls_schema, "GIDS.stream": gids_schema})
+
+    record = {"SoupPartition": 0, "SoupSequence": 1, "trackingID": 1000, "msgType": "X",
+              "symbol": "AAPL    ", "securityClass": "Q", "adjClosingPrice": 100}
+    encoded = AvroSerializer(nls_schema).encode(record, None)
+    value = deserializer.decode(encoded, SerializationContext("NLSUTP.stream", MessageField.VALUE))
+    assert value["schema_name"] == "SeqAdjClosingPrice"
+    assert value["symbol"] == "AAPL"
+    assert deserializer.deserializers["NLSUTP.stream"].schema == nls_schema
+
+    with pytest.raises(Exception):
+        deserializer.decode(encoded, SerializationContext("MOCK.stream", MessageField.VALUE))
+
+
+def test_assigns_symbol_ids_at_decode():
+    nls_schema = schema.parse(open("../resources/testNLSUTP.avsc", 'r').read())
+    ids = {}
+    deserializer = TopicAvroDeserializer({"NLSUTP.stream": nls_schema}, symbol_ids=lambda symbol: ids.setdefault(symbol, len(ids)))
+    serializer = AvroSerializer(nls_schema)
+    values = []
+    for symbol in ["AAPL    ", "MSFT    ", "AAPL    "]:
+        record = {"SoupPartition": 0, "SoupSequence": 1, "trackingID": 1000, "msgType": "X",
+                  "symbol": symbol, "securityClass": "Q", "adjClosingPrice": 100}
+        encoded = serializer.encode(record, None)
+        values.append(deserializer.decode(encoded, SerializationContext("NLSUTP.stream", MessageField.VALUE)))
+    assert [value["symbolId"] for value in values] == [0, 1, 0]
+    assert ids == {"AAPL": 0, "MSFT": 1}
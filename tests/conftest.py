@@ -0,0 +1,4 @@
+import os
+
+# Required by app.routers.user at import time
+os.environ.setdefault("SECRET_KEY", "test")
@@ -0,0 +1,44 @@
+from app.services.analytics import (
+    ANALYTICS_HEADERS,
+    NANOSECONDS_PER_MINUTE,
+    TradeAnalytics,
+)
+
+
+def minute(m, offset=0):
+    return m * NANOSECONDS_PER_MINUTE + offset
+
+
+def row(analytics, symbol):
+    (values,) = analytics.snapshot([symbol])
+    return dict(zip(ANALYTICS_HEADERS, values))
+
+
+def test_minute_buckets_roll_out_of_the_window():
+    analytics = TradeAnalytics(window_minutes=2)
+    analytics.update(
+        ["ANAA", "ANAA"], [100, 200], [10, 30], [minute(600), minute(600, 5)]
+    )
+    analytics.update(["ANAA"], [300], [20], [minute(601)])
+    values = row(analytics, "ANAA")
+    assert values["volume"] == 60 and values["count"] == 3
+    assert values["windowVolume"] == 60 and values["windowCount"] == 3
+    assert values["windowVwap"] == round((1000 + 6000 + 6000) / 60, 4)
+
+    # Minute 602 takes minute 600's bucket; session totals keep every trade
+    analytics.update(["ANAA"], [400], [40], [minute(602)])
+    values = row(analytics, "ANAA")
+    assert values["volume"] == 100 and values["high"] == 400 and values["low"] == 100
+    assert values["windowVolume"] == 60 and values["windowCount"] == 2
+    assert values["windowVwap"] == round((6000 + 16000) / 60, 4)
+
+
+def test_trade_older_than_its_bucket_only_counts_in_session_totals():
+    analytics = TradeAnalytics(window_minutes=2)
+    analytics.update(["ANAB"], [100], [10], [minute(602)])
+    # Minute 600 shares the bucket minute 602 now holds
+    analytics.update(["ANAB"], [50], [5], [minute(600)])
+    values = row(analytics, "ANAB")
+    assert values["volume"] == 15 and values["low"] == 50
+    assert values["windowVolume"] == 10 and values["windowCount"] == 1
+    assert values["trackingID"] == minute(602)
@@ -0,0 +1,64 @@
+import random
+
+from app.services.order_book import OrderBookEngine
+from benchmark_order_book import synthetic_messages
+
+
+def apply_deltas(views, deltas):
+    for delta in deltas:
+        view = views.setdefault(delta["symbol"], {"bids": {}, "asks": {}})
+        for side in ("bids", "asks"):
+            for price, quantity, orders in delta[side]:
+                if quantity == 0:
+                    view[side].pop(price, None)
+                else:
+                    view[side][price] = [quantity, orders]
+
+
+def recomputed(engine, symbol, depth):
+    book = engine.books.get(symbol)
+    view = book.depth(depth) if book else {"bids": [], "asks": []}
+    return {side: {level[0]: level[1:] for level in view[side]} for side in view}
+
+
+def test_deltas_match_full_recompute_across_start_of_day_clears():
+    depth = 3
+    messages = synthetic_messages(20000, 5, seed=1)
+    rng = random.Random(1)
+    for _ in range(3):
+        messages.insert(rng.randrange(len(messages)), {"msgType": "S", "event": "O"})
+    engine = OrderBookEngine(depth=depth)
+    views = {}
+    for offset in range(0, len(messages), 50):
+        seq, deltas = engine.apply_batch(messages[offset : offset + 50])
+        apply_deltas(views, deltas)
+        for symbol in set(views) | set(engine.books):
+            view = views.get(symbol, {"bids": {}, "asks": {}})
+            assert view == recomputed(engine, symbol, depth), (symbol, seq)
+
+
+def test_start_of_day_clear_publishes_removal_of_every_level():
+    engine = OrderBookEngine(depth=2)
+    engine.apply_batch(
+        [
+            {
+                "msgType": "A",
+                "orderId": 1,
+                "side": "B",
+                "quantity": 100,
+                "symbol": "OBAA",
+                "price": 10,
+            },
+            {
+                "msgType": "A",
+                "orderId": 2,
+                "side": "S",
+                "quantity": 200,
+                "symbol": "OBAA",
+                "price": 12,
+            },
+        ]
+    )
+    _, deltas = engine.apply_batch([{"msgType": "S", "event": "O"}])
+    assert deltas == [{"symbol": "OBAA", "bids": [[10, 0, 0]], "asks": [[12, 0, 0]]}]
+    assert engine.snapshot("OBAA")[1] == {"bids": [], "asks": []}
@@ -0,0 +1,50 @@
+from app.services.quotes import QuoteEngine
+
+
+def quote(symbol, bid, bid_quantity, ask, ask_quantity, tracking_id=1):
+    return {
+        "msgType": "Q",
+        "symbol": symbol,
+        "bidPrice": bid,
+        "bidQuantity": bid_quantity,
+        "askPrice": ask,
+        "askQuantity": ask_quantity,
+        "trackingID": tracking_id,
+    }
+
+
+def consolidated(engine, *symbols):
+    return {row[0]: row[1:5] for row in engine.snapshot(symbols)}
+
+
+def test_best_bid_and_ask_across_venues():
+    engine = QuoteEngine()
+    engine.apply_batch("QBBO-A-CORE", [quote("QTAA", 100, 5, 110, 7)])
+    engine.apply_batch("QBBO-A-BSX", [quote("QTAA", 101, 3, 110, 2)])
+    engine.apply_batch("QBBO-A-PSX", [quote("QTAA", 101, 4, 0, 0)])
+    # Highest bid and lowest ask, with the quantities of every venue at that price
+    assert consolidated(engine, "QTAA") == {"QTAA": [101, 7, 110, 9]}
+
+    # Only the last quote of a symbol in a batch counts
+    engine.apply_batch(
+        "QBBO-A-BSX", [quote("QTAA", 102, 1, 109, 1), quote("QTAA", 99, 1, 112, 1)]
+    )
+    assert consolidated(engine, "QTAA") == {"QTAA": [101, 4, 110, 7]}
+
+    ids, rows = engine.drain()
+    assert [row[0] for row in rows] == ["QTAA"]
+    assert engine.drain()[1] == []
+
+
+def test_start_of_day_clears_only_the_topics_symbols():
+    engine = QuoteEngine()
+    engine.apply_batch("QBBO-A-CORE", [quote("QTAB", 100, 5, 110, 7)])
+    engine.apply_batch("QBBO-C-CORE", [quote("QTCB", 200, 5, 210, 7)])
+    engine.apply_batch("QBBO-C-BSX", [quote("QTCB", 199, 1, 211, 1)])
+
+    engine.apply_batch("QBBO-C-CORE", [{"msgType": "S", "event": "O"}])
+    # Tape A's symbol keeps its CORE quote; tape C's falls back to the other venue
+    assert consolidated(engine, "QTAB", "QTCB") == {
+        "QTAB": [100, 5, 110, 7],
+        "QTCB": [199, 1, 211, 1],
+    }
@@ -0,0 +1,104 @@
+import asyncio
+import json
+from datetime import date, datetime
+
+import app.routers.replay as replay_router
+from app.services.replay import (
+    ArchiveReplaySource,
+    ReplayRegistry,
+    eastern,
+    epoch_ns,
+    tracking_day,
+)
+from app.services.tick_archive import TickArchive
+
+FIRST_DAY = date(2026, 10, 15)
+SECOND_DAY = date(2026, 10, 16)
+SECOND = 10**9
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+
+def archive_across_midnight(root):
+    archive = TickArchive(str(root))
+    writer = archive.writer("NLSUTP")
+    late = [86399 * SECOND, 86399 * SECOND + SECOND // 2]
+    writer.append(FIRST_DAY, late, ["T", "T"], ["AAPL", "MSFT"], [100, 101], [1, 2])
+    early = [SECOND // 5, 2 * SECOND // 5, SECOND]
+    writer.append(
+        SECOND_DAY, early, ["T"] * 3, ["AAPL"] * 3, [102, 103, 104], [3, 4, 5]
+    )
+    writer.close()
+    return archive
+
+
+def replay(monkeypatch, archive, start_ms, speed):
+    def open_source(topic, start_ms):
+        source = ArchiveReplaySource(archive, topic, start_ms, batch_rows=2)
+        read = source.read
+        source.read = lambda: read(timeout=0)
+        return source
+
+    registry = ReplayRegistry(open_source)
+    monkeypatch.setattr(replay_router, "replays", registry)
+    monkeypatch.setattr(replay_router.manager_replay, "active_connections", [])
+    websocket = RecordingWebSocket()
+    replay_router.manager_replay.active_connections.append(
+        {"socket": websocket, "symbol_ids": [], "filter": None}
+    )
+    sleeps = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(seconds):
+        sleeps.append(seconds)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", recording_sleep)
+
+    async def run():
+        session = object()
+        feed = registry.acquire(session, "NLSUTP", start_ms)
+        await replay_router.run_replay(websocket, session, feed, start_ms, speed)
+
+    asyncio.run(run())
+    assert websocket.frames[-1] == "Replay:end"
+    rows = [row for frame in websocket.frames[:-1] for row in json.loads(frame)["data"]]
+    return rows, sleeps
+
+
+def test_epoch_ns_orders_trackingids_across_days():
+    assert epoch_ns(SECOND_DAY, 0) - epoch_ns(FIRST_DAY, 86399 * SECOND) == SECOND
+
+
+def test_tracking_day_of_message_published_after_midnight():
+    published = eastern.localize(datetime(2026, 10, 16, 0, 0, 0, 300000))
+    published_ms = int(published.timestamp() * 1000)
+    assert tracking_day(published_ms, 86399 * SECOND) == FIRST_DAY
+    assert tracking_day(published_ms, SECOND // 5) == SECOND_DAY
+
+
+def test_replay_keeps_rows_after_midnight(monkeypatch, tmp_path):
+    archive = archive_across_midnight(tmp_path)
+    start = eastern.localize(datetime(2026, 10, 15, 23, 59, 59, 200000))
+    start_ms = int(start.timestamp() * 1000)
+
+    rows, _ = replay(monkeypatch, archive, start_ms, None)
+    assert [row[4] for row in rows] == [101, 102, 103, 104]
+    assert rows[1][1].startswith("2026-10-16 00:00:00.2")
+
+
+def test_paced_replay_waits_across_midnight(monkeypatch, tmp_path):
+    archive = archive_across_midnight(tmp_path)
+    start = eastern.localize(datetime(2026, 10, 15, 23, 59, 59, 200000))
+    start_ms = int(start.timestamp() * 1000)
+
+    rows, sleeps = replay(monkeypatch, archive, start_ms, 1)
+    assert len(rows) == 4
+    # The last trade is 1.8 s of feed time after the start
+    assert 1.7 < max(sleeps) <= 1.8
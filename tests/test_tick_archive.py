@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+from app.services.tick_archive import TickArchive, eastern
+
+WEDNESDAY, THURSDAY, FRIDAY = date(2026, 10, 14), date(2026, 10, 15), date(2026, 10, 16)
+HOUR = 3600 * 10**9
+
+
+def archive_day(archive, day, continuous=True, session_ended=True):
+    writer = archive.writer("NLSUTP")
+    writer.start_session(day, continuous)
+    writer.append(
+        day, [10 * HOUR, 11 * HOUR], ["T", "T"], ["TAAA", "TAAB"], [100, 200], [1, 2]
+    )
+    if session_ended:
+        writer.close(session_ended=True)
+
+
+def friday_at(hour):
+    return eastern.localize(datetime(2026, 10, 16, hour))
+
+
+def test_covers_complete_days_and_a_session_in_progress(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    archive_day(archive, WEDNESDAY)
+    archive_day(archive, THURSDAY)
+    assert archive.covers(["NLSUTP"], WEDNESDAY, now=friday_at(3))
+    # Friday's session has started and nothing archives it
+    assert not archive.covers(["NLSUTP"], WEDNESDAY, now=friday_at(10))
+
+    archive_day(archive, FRIDAY, session_ended=False)
+    assert archive.covers(["NLSUTP"], WEDNESDAY, now=friday_at(10))
+    assert not archive.covers(["NLSUTP", "NLSCTA"], WEDNESDAY, now=friday_at(10))
+
+
+def test_gap_days_are_not_covered(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    archive_day(archive, WEDNESDAY, continuous=False)
+    archive_day(archive, THURSDAY)
+    assert not archive.covers(["NLSUTP"], WEDNESDAY, now=friday_at(3))
+    assert archive.covers(["NLSUTP"], THURSDAY, now=friday_at(3))
+
+    # A consumer that joined Friday's session late leaves a gap in it
+    archive_day(archive, FRIDAY, continuous=False, session_ended=False)
+    assert not archive.covers(["NLSUTP"], THURSDAY, now=friday_at(10))
+
+
+def test_trades_since_spans_days(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    archive_day(archive, WEDNESDAY)
+    archive_day(archive, THURSDAY)
+    records = archive.trades_since(["NLSUTP"], datetime(2026, 10, 14, 10, 30))
+    assert records == [
+        {"date": datetime(2026, 10, 14, 11), "symbol": "TAAB", "size": 2},
+        {"date": datetime(2026, 10, 15, 10), "symbol": "TAAA", "size": 1},
+        {"date": datetime(2026, 10, 15, 11), "symbol": "TAAB", "size": 2},
+    ]
+    assert archive.trades_since(["NLSUTP"], datetime(2026, 10, 14), symbol="TAAA") == [
+        {"date": datetime(2026, 10, 14, 10), "symbol": "TAAA", "size": 1},
+        {"date": datetime(2026, 10, 15, 10), "symbol": "TAAA", "size": 1},
+    ]
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import app.services.tick_sink as tick_sink
+from app.services.tick_sink import TickSink
+
+
+class Message:
+    def __init__(self, offset, partition=0):
+        self._offset = offset
+        self._partition = partition
+
+    def topic(self):
+        return "NLSUTP.stream"
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def value(self):
+        return {
+            "trackingID": 34200000000000 + self._offset,
+            "msgType": "T",
+            "symbol": "AAPL",
+            "price": 1000000,
+            "size": 100,
+        }
+
+
+class Consumer:
+    def __init__(self, committed_offset=None):
+        self.paused = []
+        self.commits = []
+        self.seeks = []
+        self.committed_offset = committed_offset
+
+    def assignment(self):
+        return [SimpleNamespace(topic="NLSUTP.stream", partition=0, offset=-1001)]
+
+    def pause(self, partitions):
+        self.paused = partitions
+
+    def resume(self, partitions):
+        self.paused = []
+
+    def commit(self, offsets, asynchronous):
+        self.commits.append({(o.topic, o.partition): o.offset for o in offsets})
+
+    def committed(self, partitions, timeout):
+        return [
+            SimpleNamespace(partition=p.partition, offset=self.committed_offset)
+            for p in partitions
+        ]
+
+    def seek(self, partition):
+        self.seeks.append(partition.offset)
+
+
+def test_full_queue_pauses_the_consumer_instead_of_dropping():
+    # Not started: nothing drains the queue until the test does
+    sink = TickSink("NLSUTP", batch_size=1, max_pending_batches=1)
+    consumer = Consumer()
+    sink.add([Message(0)])
+    sink.add([Message(1)])
+    sink.throttle(consumer)
+    assert consumer.paused
+
+    _, rows, offsets = sink.pending.get()
+    sink.pending.task_done()
+    assert offsets == {("NLSUTP.stream", 0): 0}
+    sink.throttle(consumer)
+    assert not consumer.paused
+    _, rows, offsets = sink.pending.get()
+    assert offsets == {("NLSUTP.stream", 0): 1} and len(rows) == 1
+    # Nothing was written, so nothing is committed
+    sink.commit(consumer)
+    assert consumer.commits == []
+
+
+def test_failed_write_rewinds_without_committing(monkeypatch):
+    async def unreachable(**kwargs):
+        raise OSError("database unreachable")
+
+    monkeypatch.setattr(tick_sink.asyncpg, "connect", unreachable)
+    sink = TickSink("NLSUTP", batch_size=1, max_attempts=1).start()
+    consumer = Consumer(committed_offset=10)
+    assert len(sink.add([Message(10), Message(11)])) == 2
+    sink.flush(wait=True)
+    sink.throttle(consumer)
+    assert consumer.commits == []
+    assert consumer.seeks == [10]
+
+    # Consumed again after the seek: persisted, but not streamed twice
+    fresh = sink.add([Message(10), Message(11), Message(12)])
+    assert [message.offset() for message in fresh] == [12]
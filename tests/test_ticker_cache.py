@@ -0,0 +1,50 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import app.services.ticker_cache as ticker_cache_module
+from app.services.ticker_cache import TickerCache
+
+T0 = datetime(2026, 10, 15, 10, 0)
+
+
+def served(cache, view_rows, monkeypatch):
+    async def fetch_all_tickers():
+        return view_rows
+
+    monkeypatch.setattr(ticker_cache_module, "fetch_all_tickers", fetch_all_tickers)
+    asyncio.run(cache.reload())
+    return {row["symbol"]: row["count"] for row in json.loads(cache._body)}
+
+
+def test_refresh_by_another_worker_is_not_counted_twice(monkeypatch):
+    cache = TickerCache()
+    cache.observe(["AAPL"] * 5)
+    cache.snapshot(T0)
+    cache.observe(["AAPL"] * 3)
+    cache.snapshot(T0 + timedelta(seconds=30))
+    assert served(cache, [{"symbol": "AAPL", "count": 100}], monkeypatch) == {
+        "AAPL": 108
+    }
+
+    # Another worker's refresh started between the snapshots: the view has the first 5
+    assert cache.view_refreshed(T0 + timedelta(seconds=10))
+    assert served(cache, [{"symbol": "AAPL", "count": 105}], monkeypatch) == {
+        "AAPL": 108
+    }
+    assert not cache.view_refreshed(T0 + timedelta(seconds=10))
+
+    cache.observe(["MSFT"])
+    assert cache.view_refreshed(T0 + timedelta(seconds=40))
+    assert served(
+        cache,
+        [{"symbol": "AAPL", "count": 108}, {"symbol": "MSFT", "count": 7}],
+        monkeypatch,
+    ) == {"AAPL": 108, "MSFT": 8}
+
+
+def test_view_never_refreshed_keeps_every_observed_count(monkeypatch):
+    cache = TickerCache()
+    cache.observe(["AAPL", "AAPL"])
+    assert not cache.view_refreshed(None)
+    assert served(cache, [], monkeypatch) == {"AAPL": 2}
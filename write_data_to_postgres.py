@@ -1,113 +1,267 @@
 import os
+import json
+import argparse
 import aioboto3
 import asyncio
-import psycopg2
+import asyncpg
 import logging
+from datetime import datetime
+from boto3.dynamodb.types import TypeDeserializer
 from tqdm import tqdm
 
-# Database connection parameters
-db_params = {
-    "dbname": os.getenv("dbname"),
-    "user": os.getenv("user"),
-    "password": os.getenv("password"),
-    "host": os.getenv("host"),
-    "port": "5432",
-}
+from app.migrations import apply_migrations
+from app.models.database import db_params
+from app.models.stock_data import STOCK_DATA_TABLE, ensure_stock_data_partitions
 
 # DynamoDB table name
 table_name = "NASDAQ2"
 
+TICK_COLUMNS = ["trackingid", "date", "msgtype", "symbol", "price", "size"]
+REQUIRED_ATTRIBUTES = ("trackingID", "date", "msgType", "symbol", "price")
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+deserializer = TypeDeserializer()
 
-# Function to insert a batch of records into the database
-def insert_batch(batch):
-    try:
-        conn = psycopg2.connect(**db_params)
-        cursor = conn.cursor()
-        args_str = ",".join(
-            cursor.mogrify(
-                "(%s,%s,%s,%s,%s)",
-                (
-                    item.get("trackingID"),
-                    item.get("date"),
-                    item.get("msgType"),
-                    item.get("symbol"),
-                    item.get("price"),
-                ),
-            ).decode("utf-8")
-            for item in batch
-            if "trackingID" in item
-            and "date" in item
-            and "msgType" in item
-            and "symbol" in item
-            and "price" in item
+
+def to_record(item):
+    """Convert a raw DynamoDB item into a stock_data_partitioned row, or None if incomplete."""
+    if any(attribute not in item for attribute in REQUIRED_ATTRIBUTES):
+        return None
+    values = {key: deserializer.deserialize(value) for key, value in item.items()}
+    size = values.get("size")
+    return (
+        int(values["trackingID"]),
+        datetime.fromisoformat(str(values["date"])),
+        str(values["msgType"]),
+        str(values["symbol"]),
+        int(values["price"]),
+        int(size) if size is not None else None,
+    )
+
+
+async def reset_backfill(conn):
+    """
+    Delete the rows the backfill copied and its checkpoints. The live tick sink
+    writes to the same table, so only the date range the backfill recorded
+    copying is deleted.
+    """
+    copied, first_date, last_date = await conn.fetchrow(
+        """
+        SELECT coalesce(sum(rows_copied), 0), min(first_date), max(last_date)
+        FROM dynamodb_backfill_checkpoint
+        WHERE source_table = $1
+        """,
+        table_name,
+    )
+    if copied and first_date is None:
+        raise SystemExit(
+            f"The checkpoints of {table_name} do not record which dates were copied; "
+            f"delete the backfilled rows of {STOCK_DATA_TABLE} by hand, then discard "
+            "the checkpoints"
         )
-        if args_str:
-            cursor.execute(
-                "INSERT INTO stock_data_partitioned (trackingID, date, msgType, symbol, price) VALUES "
-                + args_str
+    async with conn.transaction():
+        if first_date is not None:
+            logging.info(
+                f"Resetting backfill: deleting {STOCK_DATA_TABLE} rows from {first_date} to {last_date}"
             )
-            conn.commit()
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        logging.error(f"Error inserting batch: {e}")
+            await conn.execute(
+                f"DELETE FROM {STOCK_DATA_TABLE} WHERE date BETWEEN $1 AND $2",
+                first_date,
+                last_date,
+            )
+        await conn.execute(
+            "DELETE FROM dynamodb_backfill_checkpoint WHERE source_table = $1",
+            table_name,
+        )
+
+
+async def prepare_tables(pool, total_segments, reset):
+    async with pool.acquire() as conn:
+        # Creates the tick and checkpoint tables if this database was never migrated
+        await apply_migrations(conn)
+        if reset:
+            await reset_backfill(conn)
+
+        existing = await conn.fetchval(
+            "SELECT max(total_segments) FROM dynamodb_backfill_checkpoint WHERE source_table = $1",
+            table_name,
+        )
+        if existing is not None and existing != total_segments:
+            raise SystemExit(
+                f"Checkpoint was written with {existing} segments; rerun with --segments {existing} or --reset --confirm-reset"
+            )
+        await conn.executemany(
+            """
+            INSERT INTO dynamodb_backfill_checkpoint (source_table, segment, total_segments)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (source_table, segment) DO NOTHING
+            """,
+            [
+                (table_name, segment, total_segments)
+                for segment in range(total_segments)
+            ],
+        )
+        return await conn.fetch(
+            """
+            SELECT segment, last_evaluated_key, done, rows_copied
+            FROM dynamodb_backfill_checkpoint
+            WHERE source_table = $1
+            ORDER BY segment
+            """,
+            table_name,
+        )
+
+
+async def copy_page(pool, segment, records, last_key, partitioned_days):
+    """COPY one scan page and advance the segment checkpoint in the same transaction."""
+    async with pool.acquire() as conn:
+        days = {record[1].date() for record in records} - partitioned_days
+        if days:
+            await ensure_stock_data_partitions(conn, min(days), max(days))
+            partitioned_days.update(days)
+        async with conn.transaction():
+            if records:
+                await conn.copy_records_to_table(
+                    STOCK_DATA_TABLE, records=records, columns=TICK_COLUMNS
+                )
+            await conn.execute(
+                """
+                UPDATE dynamodb_backfill_checkpoint
+                SET last_evaluated_key = $3::jsonb,
+                    done = $4,
+                    rows_copied = rows_copied + $5,
+                    first_date = least(first_date, $6),
+                    last_date = greatest(last_date, $7),
+                    updated_at = now()
+                WHERE source_table = $1 AND segment = $2
+                """,
+                table_name,
+                segment,
+                json.dumps(last_key) if last_key else None,
+                last_key is None,
+                len(records),
+                min(record[1] for record in records) if records else None,
+                max(record[1] for record in records) if records else None,
+            )
+
+
+async def scan_segment(
+    client, pool, checkpoint, total_segments, page_size, pbar, partitioned_days
+):
+    segment = checkpoint["segment"]
+    if checkpoint["done"]:
+        return
+    start_key = (
+        json.loads(checkpoint["last_evaluated_key"])
+        if checkpoint["last_evaluated_key"]
+        else None
+    )
+    scan_kwargs = {
+        "TableName": table_name,
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "Limit": page_size,
+    }
+
+    async def scan(key):
+        kwargs = dict(scan_kwargs, ExclusiveStartKey=key) if key else scan_kwargs
+        return await client.scan(**kwargs)
+
+    response = await scan(start_key)
+    while True:
+        last_key = response.get("LastEvaluatedKey")
+        # Fetch the next page while the current one is being copied
+        next_page = asyncio.create_task(scan(last_key)) if last_key else None
+        items = response.get("Items", [])
+        records = [record for record in map(to_record, items) if record]
+        try:
+            await copy_page(pool, segment, records, last_key, partitioned_days)
+        except Exception:
+            if next_page:
+                next_page.cancel()
+            raise
+        pbar.update(len(items))
+        if next_page is None:
+            logging.info(f"Segment {segment} finished")
+            return
+        response = await next_page
 
 
 # Asynchronous function to fetch data from DynamoDB and insert into PostgreSQL in batches
-async def fetch_and_insert():
+async def fetch_and_insert(total_segments=8, page_size=1000, reset=False):
+    pool = await asyncpg.create_pool(**db_params, min_size=1, max_size=total_segments)
     session = aioboto3.Session(
         aws_access_key_id=os.getenv("NASDQA_ACCESS_KEY_ID"),
         aws_secret_access_key=os.getenv("NASDQA_SECRET_ACCESS_KEY"),
         region_name=os.getenv("NASDQA_DEFAULT_REGION"),
     )
-    async with session.resource("dynamodb") as dynamodb:
-        table = await dynamodb.Table(table_name)
-        scan_kwargs = {}
-        done = False
-        start_key = None
-        total_items = 0
-
-        # Determine total number of items for progress tracking
-        count_response = await table.scan(Select="COUNT")
-        total_items = count_response["Count"]
-
-        with tqdm(total=total_items, desc="Processing records") as pbar:
-            while not done:
-                if start_key:
-                    scan_kwargs["ExclusiveStartKey"] = start_key
-                response = await table.scan(**scan_kwargs)
-                items = response.get("Items", [])
-                if items:
-                    insert_batch(items)
-                start_key = response.get("LastEvaluatedKey", None)
-                done = start_key is None
-                pbar.update(len(items))
+    partitioned_days = set()
+    try:
+        checkpoints = await prepare_tables(pool, total_segments, reset)
+        copied = sum(checkpoint["rows_copied"] for checkpoint in checkpoints)
+        remaining = [checkpoint for checkpoint in checkpoints if not checkpoint["done"]]
+        if copied:
+            logging.info(
+                f"Resuming backfill: {copied} rows already copied, {len(remaining)} segments left"
+            )
+
+        async with session.client("dynamodb") as client:
+            # ItemCount is refreshed by DynamoDB every few hours; good enough for progress
+            description = await client.describe_table(TableName=table_name)
+            total_items = description["Table"]["ItemCount"]
+
+            with tqdm(
+                total=total_items, initial=copied, desc="Processing records"
+            ) as pbar:
+                await asyncio.gather(
+                    *(
+                        scan_segment(
+                            client,
+                            pool,
+                            checkpoint,
+                            total_segments,
+                            page_size,
+                            pbar,
+                            partitioned_days,
+                        )
+                        for checkpoint in remaining
+                    )
+                )
+    finally:
+        await pool.close()
 
 
 if __name__ == "__main__":
-    # Connect to the database to drop the table if it exists and create a new one
-    conn = psycopg2.connect(**db_params)
-    cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS stock_data_partitioned")
-    cursor.execute("""
-        CREATE TABLE stock_data_partitioned (
-            trackingID VARCHAR(30),
-            date TIMESTAMP,
-            msgType VARCHAR(20),
-            symbol VARCHAR(10),
-            price FLOAT
+    parser = argparse.ArgumentParser(
+        description=f"Copy the DynamoDB {table_name} table into stock_data_partitioned."
+    )
+    parser.add_argument(
+        "--segments", type=int, default=8, help="number of parallel scan segments"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=1000, help="items per DynamoDB scan page"
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="delete the rows of the dates already backfilled and discard checkpoints before starting",
+    )
+    parser.add_argument(
+        "--confirm-reset",
+        action="store_true",
+        help="required with --reset; the live ticks of those dates are deleted too",
+    )
+    args = parser.parse_args()
+    if args.reset and not args.confirm_reset:
+        parser.error(
+            "--reset deletes rows from the live tick table; add --confirm-reset"
         )
-    """)
-    conn.commit()
-    cursor.close()
-    conn.close()
 
     # Start the asynchronous fetching and inserting process
-    asyncio.run(fetch_and_insert())
+    asyncio.run(fetch_and_insert(args.segments, args.page_size, args.reset))
 
     logging.info("All batches have been inserted.")